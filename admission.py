@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+
+"""Admission control for conversion requests.
+
+Limits the work that conversion requests can cause, so that a few
+large or numerous requests cannot take all of the CPU and memory of
+the server:
+
+* request bodies larger than the maximum size for their content type
+  are rejected with 413 (Request Entity Too Large), before they are
+  read if the Content-Length header is given and otherwise as soon as
+  more than the maximum size has been read;
+* the cost of converting a body (roughly, its number of statements or
+  JSON objects) is estimated by counting characters that mark them,
+  and bodies costing more than MAX_COST are rejected with 413;
+* at most MAX_IN_FLIGHT conversions with a total estimated cost of at
+  most MAX_IN_FLIGHT_COST run at a time. Other requests wait in a
+  queue of at most MAX_QUEUED requests for up to QUEUE_TIMEOUT
+  seconds, and are rejected with 503 (Service Unavailable) and a
+  Retry-After header if the queue is full or the wait times out;
+* if MAX_PER_CLIENT is set, each client (by IP address, or by
+  CLIENT_HEADER behind a reverse proxy) can have at most that many
+  requests running or waiting, with further requests rejected with
+  503, so that one client cannot fill the queue.
+
+Streamed responses count as running until they have been sent.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import time
+import threading
+
+from collections import deque
+from functools import wraps
+
+import flask
+
+from werkzeug.exceptions import ServiceUnavailable
+
+import spool
+import timing
+import tools
+
+# Maximum request body size, in bytes, by MIME type. Formats parsed
+# with rdflib are slower to convert than N-Quads and JSON. The limits
+# apply before spooling (see spool.py): larger bodies are rejected,
+# with those given a Content-Length not read at all and others read
+# only until they exceed the limit, and bodies within the limits are
+# spooled if larger than spool.MAX_MEMORY_SIZE. Keep the limits above
+# spool.MAX_MEMORY_SIZE for bodies to be spooled.
+MAX_BODY_SIZE = {
+    'application/n-quads': 256 * 1024 * 1024,
+    'application/n-triples': 256 * 1024 * 1024,
+    'application/ld+json': 64 * 1024 * 1024,
+    'application/json': 64 * 1024 * 1024,
+    'application/x-ndjson': 64 * 1024 * 1024,
+}
+DEFAULT_MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# Strings counted to estimate the cost of converting a body, by MIME
+# type: line ends for line-based formats, ends of statements and of
+# predicate and object lists for Turtle-like formats, ends of elements
+# for XML formats and starts of objects for JSON. Bodies of other
+# types cost one for every DEFAULT_BYTES_PER_COST bytes.
+COST_MARKERS = {
+    'application/n-quads': ['\n'],
+    'application/n-triples': ['\n'],
+    'text/turtle': ['.\n', ';', ','],
+    'text/n3': ['.\n', ';', ','],
+    'application/trig': ['.\n', ';', ','],
+    'application/rdf+xml': ['</', '/>'],
+    'application/trix': ['</triple>'],
+    'application/ld+json': ['{'],
+    'application/json': ['{'],
+    'application/x-ndjson': ['{'],
+}
+DEFAULT_BYTES_PER_COST = 100
+
+# Maximum estimated cost of a request.
+MAX_COST = 1000000
+
+# Maximum number and total estimated cost of requests running at once.
+# A request is run regardless of cost if no others are running.
+MAX_IN_FLIGHT = 8
+MAX_IN_FLIGHT_COST = 4 * MAX_COST
+
+# Maximum number of requests waiting to run, and maximum time to wait,
+# in seconds.
+MAX_QUEUED = 32
+QUEUE_TIMEOUT = 10.0
+
+# Maximum number of requests running or waiting per client, or None
+# for no limit. Behind a reverse proxy, all requests come from the
+# address of the proxy, so set CLIENT_HEADER as well.
+MAX_PER_CLIENT = None
+
+# Request header identifying the client, e.g. 'X-Forwarded-For' behind
+# a reverse proxy, or None to use the address the request comes from.
+# The last of comma-separated values (the address seen by the proxy)
+# is used. Only set this if a trusted proxy sets the header, as
+# clients can send any value.
+CLIENT_HEADER = None
+
+# Seconds after which clients are asked to retry rejected requests.
+RETRY_AFTER = 5
+
+# Number of bytes of non-string bodies to scan at a time.
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+def estimate_cost(data, mimetype):
+    """Return estimated cost of converting data.
+
+    Args:
+        data: string, or object supporting len() and slicing into
+            strings (e.g. spool.MappedFile).
+        mimetype: MIME type of data.
+    """
+    markers = COST_MARKERS.get(mimetype)
+    if markers is None:
+        return len(data) // DEFAULT_BYTES_PER_COST
+    if isinstance(data, basestring):
+        return sum(data.count(m) for m in markers)
+    cost = 0
+    overlap = max(len(m) for m in markers) - 1
+    for start in xrange(0, len(data), SCAN_CHUNK_SIZE):
+        # Extend the chunk to count markers starting in it but ending
+        # in the next one.
+        chunk = data[start:start+SCAN_CHUNK_SIZE+overlap]
+        for m in markers:
+            cost += chunk.count(m, 0, SCAN_CHUNK_SIZE + len(m) - 1)
+    return cost
+
+class WorkQueue(object):
+    """Bounded queue of requests admitted to run in arrival order."""
+
+    def __init__(self, max_in_flight=None, max_in_flight_cost=None,
+                 max_queued=None, timeout=None):
+        """Initialize queue.
+
+        Args:
+            max_in_flight: maximum number of requests running at once
+                (default MAX_IN_FLIGHT).
+            max_in_flight_cost: maximum total estimated cost of
+                requests running at once (default MAX_IN_FLIGHT_COST).
+            max_queued: maximum number of requests waiting (default
+                MAX_QUEUED).
+            timeout: maximum time to wait, in seconds (default
+                QUEUE_TIMEOUT).
+        """
+        self.max_in_flight = max_in_flight if max_in_flight is not None \
+            else MAX_IN_FLIGHT
+        self.max_in_flight_cost = max_in_flight_cost \
+            if max_in_flight_cost is not None else MAX_IN_FLIGHT_COST
+        self.max_queued = max_queued if max_queued is not None \
+            else MAX_QUEUED
+        self.timeout = timeout if timeout is not None else QUEUE_TIMEOUT
+        self.in_flight = 0
+        self.in_flight_cost = 0
+        self._waiting = deque()
+        self._condition = threading.Condition()
+
+    def _fits(self, cost):
+        return self.in_flight == 0 or (
+            self.in_flight < self.max_in_flight and
+            self.in_flight_cost + cost <= self.max_in_flight_cost)
+
+    def acquire(self, cost):
+        """Wait for a request of given cost to be admitted.
+
+        Returns:
+            True if admitted, False if the queue is full or the wait
+            timed out.
+        """
+        with self._condition:
+            if not self._waiting and self._fits(cost):
+                self._admit(cost)
+                return True
+            if len(self._waiting) >= self.max_queued:
+                return False
+            ticket = object()
+            self._waiting.append(ticket)
+            deadline = time.time() + self.timeout
+            try:
+                while not (self._waiting[0] is ticket and self._fits(cost)):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self._admit(cost)
+                return True
+            finally:
+                self._waiting.remove(ticket)
+                # The next request may fit now.
+                self._condition.notify_all()
+
+    def _admit(self, cost):
+        self.in_flight += 1
+        self.in_flight_cost += cost
+
+    def release(self, cost):
+        """Mark an admitted request of given cost finished."""
+        with self._condition:
+            self.in_flight -= 1
+            self.in_flight_cost -= cost
+            self._condition.notify_all()
+
+class AdmissionControl(object):
+    """Admission control for Flask views converting request bodies."""
+
+    def __init__(self, queue=None, max_body_size=None,
+                 default_max_body_size=None, max_cost=None,
+                 max_per_client=None, client_header=None):
+        """Initialize admission control.
+
+        Args:
+            queue: WorkQueue, or None for one with default settings.
+            max_body_size: dict mapping MIME types to maximum body
+                sizes (default MAX_BODY_SIZE).
+            default_max_body_size: maximum body size for other MIME
+                types (default DEFAULT_MAX_BODY_SIZE).
+            max_cost: maximum estimated cost of a request (default
+                MAX_COST).
+            max_per_client: maximum number of requests running or
+                waiting per client (default MAX_PER_CLIENT, None for
+                no limit).
+            client_header: request header identifying the client
+                (default CLIENT_HEADER, None for the remote address).
+        """
+        self.queue = queue if queue is not None else WorkQueue()
+        self._max_body_size = max_body_size if max_body_size is not None \
+            else MAX_BODY_SIZE
+        self._default_max_body_size = default_max_body_size \
+            if default_max_body_size is not None else DEFAULT_MAX_BODY_SIZE
+        self.max_cost = max_cost if max_cost is not None else MAX_COST
+        self.max_per_client = max_per_client if max_per_client is not None \
+            else MAX_PER_CLIENT
+        self.client_header = client_header if client_header is not None \
+            else CLIENT_HEADER
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def max_body_size(self, mimetype):
+        return self._max_body_size.get(mimetype, self._default_max_body_size)
+
+    def declared_too_large(self, request):
+        """Return True if the Content-Length of Flask request exceeds
+        the maximum size for its MIME type."""
+        return (request.content_length is not None and
+                request.content_length > self.max_body_size(request.mimetype))
+
+    def client(self, request):
+        """Return identifier of the client of Flask request."""
+        if self.client_header is None:
+            return request.remote_addr
+        value = request.headers.get(self.client_header)
+        if not value:
+            return request.remote_addr
+        return value.split(',')[-1].strip()
+
+    def controlled(self, view):
+        """Return Flask view admitting requests to view."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = flask.request
+            max_size = self.max_body_size(request.mimetype)
+            if self.declared_too_large(request):
+                _too_large(request.mimetype, max_size)
+            client = self.client(request)
+            if not self._add_client(client):
+                raise ServiceUnavailable('too many requests from client',
+                                         retry_after=RETRY_AFTER)
+            cost = None
+            try:
+                cost = self._admit(max_size)
+                response = flask.make_response(view(*args, **kwargs))
+            except:
+                self._release(client, cost)
+                raise
+            _release_when_sent(response, lambda: self._release(client, cost))
+            return response
+        return wrapper
+
+    def _admit(self, max_size):
+        """Wait for the request to be admitted, return its cost.
+
+        Raises:
+            HTTPException: if the request is rejected.
+        """
+        with timing.stage('read'):
+            try:
+                data, mimetype, charset = tools.get_request_data(
+                    flask.request, max_size)
+            except spool.TooLargeError:
+                _too_large(flask.request.mimetype, max_size)
+        with timing.stage('estimate'):
+            cost = estimate_cost(data, mimetype)
+        if cost > self.max_cost:
+            flask.abort(413, 'estimated conversion cost %d exceeds '
+                        'maximum %d' % (cost, self.max_cost))
+        with timing.stage('queue'):
+            admitted = self.queue.acquire(cost)
+        if not admitted:
+            raise ServiceUnavailable('server busy', retry_after=RETRY_AFTER)
+        return cost
+
+    def _release(self, client, cost):
+        """Release request of client, and its work if admitted."""
+        if cost is not None:
+            self.queue.release(cost)
+        self._remove_client(client)
+
+    def _add_client(self, client):
+        """Count request of client, return False if over the limit."""
+        if self.max_per_client is None:
+            return True
+        with self._lock:
+            count = self._clients.get(client, 0)
+            if count >= self.max_per_client:
+                return False
+            self._clients[client] = count + 1
+            return True
+
+    def _remove_client(self, client):
+        if self.max_per_client is None:
+            return
+        with self._lock:
+            count = self._clients.pop(client) - 1
+            if count > 0:
+                self._clients[client] = count
+
+def _release_when_sent(response, release):
+    """Call release once, when response has been generated."""
+    if not response.is_streamed:
+        release()
+        return
+    released = []
+    def release_once():
+        if not released:
+            released.append(True)
+            release()
+    response.response = _released(response.response, release_once)
+    # In case the response is closed before it is generated.
+    response.call_on_close(release_once)
+
+def _released(chunks, release):
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        release()
+
+def _too_large(mimetype, max_size):
+    flask.abort(413, 'maximum size of %s request body is %d bytes' % (
+        mimetype, max_size))
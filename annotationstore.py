@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+"""SQLite-backed store of annotations.
+
+Stores annotations in expanded JSON-LD form (as given by
+oajson.expand()) and indexes them by @id, target, body and motivation
+IRIs, so that annotations can be looked up without fetching and
+converting whole collections.
+
+For targets and bodies that are specific resources, the IRI of the
+source (oa:hasSource) is indexed in addition to the IRI of the
+resource itself, so that e.g. all annotations on a document can be
+found.
+
+Run this module to load JSON-LD files into a store:
+
+    python annotationstore.py annotations.db FILE [FILE ...]
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import sys
+import uuid
+import sqlite3
+import threading
+
+import oajson
+import jsoncodec
+
+# Open Annotation namespace and the indexed properties.
+OA = 'http://www.w3.org/ns/oa#'
+HAS_TARGET = OA + 'hasTarget'
+HAS_BODY = OA + 'hasBody'
+HAS_SOURCE = OA + 'hasSource'
+MOTIVATED_BY = OA + 'motivatedBy'
+
+# Names of the indexed fields, and the properties indexed for them.
+TARGET = 'target'
+BODY = 'body'
+MOTIVATION = 'motivation'
+INDEXED_PROPERTIES = {
+    TARGET: HAS_TARGET,
+    BODY: HAS_BODY,
+    MOTIVATION: MOTIVATED_BY,
+}
+
+# Default number of annotations returned by query(), and the maximum
+# number that can be requested at once from the server.
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+  id TEXT NOT NULL UNIQUE,
+  data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+  field TEXT NOT NULL,
+  iri TEXT NOT NULL,
+  annotation INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS terms_iri ON terms (field, iri, annotation);
+CREATE INDEX IF NOT EXISTS terms_annotation ON terms (annotation);
+CREATE TABLE IF NOT EXISTS renditions (
+  annotation INTEGER NOT NULL,
+  key TEXT NOT NULL,
+  content_type TEXT NOT NULL,
+  body BLOB NOT NULL,
+  PRIMARY KEY (annotation, key)
+);
+"""
+
+def _ids(values, follow_source=False):
+    """Return IRIs of the given JSON-LD property values."""
+    iris = []
+    for value in values:
+        if not isinstance(value, dict):
+            continue
+        iri = value.get('@id')
+        if iri is not None and not iri.startswith('_:'):
+            iris.append(iri)
+        if follow_source:
+            iris.extend(_ids(value.get(HAS_SOURCE, [])))
+    return iris
+
+def index_terms(node):
+    """Return (field, IRI) pairs to index for expanded JSON-LD node."""
+    terms = set()
+    for field, property_ in INDEXED_PROPERTIES.iteritems():
+        values = node.get(property_, [])
+        for iri in _ids(values, follow_source=(field != MOTIVATION)):
+            terms.add((field, iri))
+    return sorted(terms)
+
+def _nodes(data):
+    """Return the top-level nodes of expanded JSON-LD."""
+    if isinstance(data, dict):
+        data = data.get('@graph', [data])
+    return data
+
+class AnnotationStore(object):
+    """Store of annotations in an SQLite database.
+
+    A single connection is shared by all threads. SQLite serializes
+    writes in any case, and indexed lookups are fast enough that
+    serializing them is not a bottleneck.
+    """
+
+    def __init__(self, path=':memory:'):
+        """Open store in given database file, creating it if necessary."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ':memory:':
+                self._connection.execute('PRAGMA journal_mode=WAL')
+                self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(_SCHEMA)
+
+    def add(self, data):
+        """Add or replace annotations.
+
+        Nodes without an @id or with a blank node identifier are given
+        a new urn:uuid: identifier.
+
+        Args:
+            data: expanded JSON-LD, a list of nodes or a single node.
+
+        Returns:
+            list of the identifiers of the added annotations.
+        """
+        ids = []
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.cursor()
+                for node in _nodes(data):
+                    id_ = node.get('@id')
+                    if id_ is None or id_.startswith('_:'):
+                        id_ = node['@id'] = uuid.uuid4().urn
+                    self._add(cursor, id_, node)
+                    ids.append(id_)
+        return ids
+
+    def _add(self, cursor, id_, node):
+        serialized = jsoncodec.dumps(node)
+        cursor.execute('SELECT rowid FROM annotations WHERE id = ?', (id_,))
+        row = cursor.fetchone()
+        if row is not None:
+            rowid = row[0]
+            cursor.execute('UPDATE annotations SET data = ? WHERE rowid = ?',
+                           (serialized, rowid))
+            cursor.execute('DELETE FROM terms WHERE annotation = ?', (rowid,))
+            cursor.execute('DELETE FROM renditions WHERE annotation = ?',
+                           (rowid,))
+        else:
+            cursor.execute('INSERT INTO annotations (id, data) VALUES (?, ?)',
+                           (id_, serialized))
+            rowid = cursor.lastrowid
+        cursor.executemany(
+            'INSERT INTO terms (field, iri, annotation) VALUES (?, ?, ?)',
+            [(field, iri, rowid) for field, iri in index_terms(node)])
+
+    def get(self, id_):
+        """Return annotation with given @id, or None if not found."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM annotations WHERE id = ?', (id_,)).fetchone()
+        return jsoncodec.loads(row[0]) if row is not None else None
+
+    def get_serialized(self, id_):
+        """Return annotation with given @id as JSON string, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM annotations WHERE id = ?', (id_,)).fetchone()
+        return row[0] if row is not None else None
+
+    def get_rendition(self, id_, key):
+        """Return (content type, body) of stored rendition, or None.
+
+        Renditions are rendered representations of single annotations,
+        identified by a key (see materialize.py).
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT r.content_type, r.body FROM annotations a '
+                'JOIN renditions r ON r.annotation = a.rowid '
+                'WHERE a.id = ? AND r.key = ?', (id_, key)).fetchone()
+        return (row[0], str(row[1])) if row is not None else None
+
+    def set_rendition(self, id_, key, content_type, body, serialized):
+        """Store rendition of annotation.
+
+        The rendition is only stored if the annotation is unchanged,
+        i.e. it is given by serialized (see get_serialized()), so that
+        renditions of replaced annotations are not stored.
+
+        Returns:
+            True if the rendition was stored, False otherwise.
+        """
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    'INSERT OR REPLACE INTO renditions '
+                    '(annotation, key, content_type, body) '
+                    'SELECT rowid, ?, ?, ? FROM annotations '
+                    'WHERE id = ? AND data = ?',
+                    (key, content_type, sqlite3.Binary(body), id_,
+                     serialized))
+                return cursor.rowcount > 0
+
+    def delete(self, id_):
+        """Delete annotation with given @id, return False if not found."""
+        with self._lock:
+            with self._connection:
+                row = self._connection.execute(
+                    'SELECT rowid FROM annotations WHERE id = ?',
+                    (id_,)).fetchone()
+                if row is None:
+                    return False
+                self._connection.execute(
+                    'DELETE FROM terms WHERE annotation = ?', row)
+                self._connection.execute(
+                    'DELETE FROM renditions WHERE annotation = ?', row)
+                self._connection.execute(
+                    'DELETE FROM annotations WHERE rowid = ?', row)
+        return True
+
+    def query(self, target=None, body=None, motivation=None, offset=0,
+              limit=None):
+        """Return annotations matching all given IRIs, in insertion order.
+
+        Args:
+            target: IRI of target or its source, or None for any.
+            body: IRI of body or its source, or None for any.
+            motivation: IRI of motivation, or None for any.
+            offset: number of matching annotations to skip.
+            limit: maximum number of annotations to return, or None
+                for PAGE_SIZE.
+
+        Returns:
+            list of annotations in expanded JSON-LD form.
+        """
+        if limit is None:
+            limit = PAGE_SIZE
+        # Filters in order of expected selectivity; the first one
+        # drives the query using the index, giving rowid order.
+        filters = [(f, iri) for f, iri in ((TARGET, target), (BODY, body),
+                                           (MOTIVATION, motivation))
+                   if iri is not None]
+        if not filters:
+            sql = ['SELECT data FROM annotations ORDER BY rowid']
+            parameters = []
+        else:
+            sql = ['SELECT a.data FROM terms t JOIN annotations a',
+                   'ON a.rowid = t.annotation WHERE t.field = ? AND t.iri = ?']
+            parameters = list(filters[0])
+            for field, iri in filters[1:]:
+                sql.append('AND EXISTS (SELECT 1 FROM terms u WHERE '
+                           'u.field = ? AND u.iri = ? AND '
+                           'u.annotation = t.annotation)')
+                parameters.extend((field, iri))
+            sql.append('ORDER BY t.annotation')
+        sql.append('LIMIT ? OFFSET ?')
+        parameters.extend((limit, offset))
+        with self._lock:
+            rows = self._connection.execute(' '.join(sql),
+                                            parameters).fetchall()
+        return [jsoncodec.loads(row[0]) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM annotations').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+def main(argv):
+    if len(argv) < 3:
+        print >> sys.stderr, 'Usage: %s DATABASE FILE [FILE ...]' % argv[0]
+        return 1
+    store = AnnotationStore(argv[1])
+    for fn in argv[2:]:
+        with open(fn) as f:
+            data = oajson.expand(jsoncodec.loads(f.read()))
+        ids = store.add(data)
+        print >> sys.stderr, '%s: added %d annotations' % (fn, len(ids))
+    store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""Open Annotation adapter server with non-blocking I/O.
+
+Serves the adapter using gevent, handling each request in a greenlet
+and making socket I/O (including upstream requests made by the proxy)
+non-blocking. A single process can thus have hundreds of proxied
+requests waiting on upstream servers, where the threaded server in
+server.py would need a thread for each.
+
+Requires gevent (http://www.gevent.org/).
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+# Sockets must be patched before anything else creates them.
+from gevent import monkey
+monkey.patch_all()
+
+import sys
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+# Note: restoaclient must be imported before server (circular import).
+import restoaclient
+import server
+
+HOST = '127.0.0.1'
+PORT = 5000
+
+# Maximum number of requests handled concurrently.
+MAX_CONCURRENT_REQUESTS = 1000
+
+# Maximum number of connections kept open to each upstream host.
+UPSTREAM_POOL_MAXSIZE = 500
+
+def serve(host=HOST, port=PORT):
+    """Serve the adapter application until interrupted."""
+    restoaclient.session = restoaclient.make_session(
+        pool_maxsize=UPSTREAM_POOL_MAXSIZE)
+    http_server = WSGIServer((host, port), server.app,
+                             spawn=Pool(MAX_CONCURRENT_REQUESTS))
+    print >> sys.stderr, 'Serving on http://%s:%d/' % (host, port)
+    http_server.serve_forever()
+
+def main(argv):
+    port = int(argv[1]) if len(argv) > 1 else PORT
+    try:
+        serve(port=port)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""Support for converting batches of annotations.
+
+A batch is given either as NDJSON (one JSON value per line) or as a
+JSON array. Each item is either a JSON-LD document, or a string
+containing a document in some other supported format. The items are
+expanded and combined into a single JSON-LD document, so that they
+can be rendered together.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+from pyld import jsonld
+
+import oajson
+import jsoncodec
+
+# MIME types for batches with one item per line.
+NDJSON_MIMETYPES = [
+    'application/x-ndjson',
+    'application/ndjson',
+]
+
+# MIME types for batches given as a JSON array.
+JSON_MIMETYPES = [
+    'application/json',
+    'application/ld+json',
+]
+
+# Response headers reporting batch processing statistics. Time and
+# rate cover parsing and expansion, as the response may be streamed.
+SIZE_HEADER = 'X-Batch-Size'
+TIME_HEADER = 'X-Batch-Time'
+RATE_HEADER = 'X-Batch-Rate'
+
+class ItemError(ValueError):
+    """Error in converting an item of a batch."""
+
+    def __init__(self, index, error):
+        """Initialize error.
+
+        Args:
+            index: number of the item, starting from 1.
+            error: exception raised in converting the item.
+        """
+        super(ItemError, self).__init__('item %d: %s' % (index, error))
+        self.index = index
+        self.error = error
+
+def is_batch_mimetype(mimetype):
+    return mimetype in NDJSON_MIMETYPES or mimetype in JSON_MIMETYPES
+
+def read_items(data, mimetype, charset=None):
+    """Generate the items of a batch.
+
+    JSON arrays are decoded incrementally, one item at a time.
+
+    Args:
+        data: string or file-like object (e.g. spool.MappedFile) in
+            NDJSON or JSON format.
+        mimetype: MIME type of data.
+        charset: character encoding of data, or None for default.
+
+    Raises:
+        ValueError: if data is not valid for mimetype.
+    """
+    if mimetype in NDJSON_MIMETYPES:
+        lines = data.splitlines() if isinstance(data, basestring) else data
+        for line in lines:
+            if line.strip():
+                yield jsoncodec.loads(line, charset)
+    elif mimetype in JSON_MIMETYPES:
+        for item in jsoncodec.iterload(data, charset):
+            yield item
+    else:
+        raise ValueError('not a batch MIME type: %s' % mimetype)
+
+def convert(items, parse_data, item_mimetype=None, base=None):
+    """Return expanded JSON-LD containing all items of a batch.
+
+    Args:
+        items: iterable of JSON-LD documents and strings.
+        parse_data: function parsing strings into JSON-LD, taking the
+            string and a MIME type (see parse.make_parser()).
+        item_mimetype: MIME type of string items.
+        base: base IRI for expansion.
+
+    Returns:
+        (data, count) pair, where data is a list containing all nodes
+        of the items in expanded JSON-LD form and count is the number
+        of items.
+
+    Raises:
+        ItemError: if an item cannot be parsed or expanded.
+    """
+    nodes, count = [], 0
+    for count, item in enumerate(items, 1):
+        try:
+            if isinstance(item, basestring):
+                item = parse_data(item, item_mimetype)
+            expanded = oajson.expand(item, base=base)
+        except (ValueError, jsonld.JsonLdError), e:
+            raise ItemError(count, e)
+        # Blank node identifiers are only unique within an item.
+        _prefix_blank_nodes(expanded, 'b%d_' % count)
+        nodes.extend(expanded)
+    return nodes, count
+
+def _prefix_blank_nodes(data, prefix):
+    """Add prefix to blank node identifiers in expanded JSON-LD."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            for key, item in value.iteritems():
+                if key == '@id':
+                    if isinstance(item, basestring) and item.startswith('_:'):
+                        value[key] = '_:' + prefix + item[2:]
+                elif isinstance(item, (dict, list)):
+                    stack.append(item)
+        elif isinstance(value, list):
+            stack.extend(value)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""Benchmark the latency of small requests next to an abusive client.
+
+Runs the threaded server (server.py) with the admission control limits
+of admission.py and with the limits lifted, each in its own process,
+while one client posts large N-Quads documents to /echo/ from many
+connections at once and other clients post small ones. Reports the
+latencies of the small requests and the responses to the large ones.
+The abusive client connects from 127.0.0.2, so that the server can
+tell the clients apart.
+"""
+
+import os
+import sys
+import time
+import httplib
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from proxy_load_benchmark import ROOT, SERVER_PORT, _wait_for_port
+
+DEFAULT_DURATION = 20.0
+DEFAULT_LARGE_CLIENTS = 8
+DEFAULT_SMALL_CLIENTS = 4
+DEFAULT_LARGE_LINES = 20000
+
+ABUSIVE_ADDRESS = '127.0.0.2'
+
+_SERVER = ('import sys, admission; %s'
+           'import restoaclient, server; '
+           'server.app.run(port=int(sys.argv[1]), threaded=True)')
+_UNLIMITED = ('admission.MAX_PER_CLIENT = admission.MAX_IN_FLIGHT = '
+              'admission.MAX_QUEUED = 10 ** 6; '
+              'admission.MAX_IN_FLIGHT_COST = 10 ** 12; ')
+
+MODES = [
+    ('unlimited', [sys.executable, '-c', _SERVER % _UNLIMITED]),
+    ('admission', [sys.executable, '-c', _SERVER % '']),
+]
+
+def _nquads(lines):
+    return ''.join('<http://example.org/annotations/%d> '
+                   '<http://www.w3.org/ns/oa#hasTarget> '
+                   '<http://example.org/documents/%d> .\n' % (i, i % 1000)
+                   for i in xrange(lines))
+
+def _client(body, source_address, end, results, lock):
+    """Post body to /echo/ until end, adding (status, latency) to
+    results."""
+    headers = {'Content-Type': 'application/n-quads',
+               'Accept': 'application/ld+json'}
+    while time.time() < end:
+        connection = httplib.HTTPConnection('127.0.0.1', SERVER_PORT,
+                                            source_address=(source_address, 0))
+        start = time.time()
+        try:
+            connection.request('POST', '/echo/', body, headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            retry_after = response.getheader('Retry-After')
+        except (httplib.HTTPException, IOError):
+            status, retry_after = None, None
+        finally:
+            connection.close()
+        with lock:
+            results.append((status, time.time() - start))
+        if retry_after is not None:
+            time.sleep(min(float(retry_after), max(end - time.time(), 0)))
+
+def _summary(results):
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return ', '.join('%s: %d' % (s, n) for s, n in sorted(statuses.items()))
+
+def benchmark(name, command, duration, large_clients, small_clients,
+              large_lines):
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(command + [str(SERVER_PORT)], cwd=ROOT,
+                                   stdout=devnull, stderr=devnull)
+    try:
+        _wait_for_port(SERVER_PORT)
+        end = time.time() + duration
+        large, small, lock = [], [], threading.Lock()
+        threads = [threading.Thread(target=_client,
+                                    args=(_nquads(large_lines),
+                                          ABUSIVE_ADDRESS, end, large, lock))
+                   for _ in range(large_clients)]
+        threads += [threading.Thread(target=_client,
+                                     args=(_nquads(5), '127.0.0.1', end,
+                                           small, lock))
+                    for _ in range(small_clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = sorted(l for s, l in small if s == 200)
+    print '%-9s small: %d requests, median %.3fs, p95 %.3fs, p99 %.3fs ' \
+        '(%s)' % (name, len(small), latencies[len(latencies) // 2],
+                  latencies[int(len(latencies) * 0.95)],
+                  latencies[int(len(latencies) * 0.99)], _summary(small))
+    print '          large: %d requests (%s)' % (len(large), _summary(large))
+
+def main(argv):
+    duration = float(argv[1]) if len(argv) > 1 else DEFAULT_DURATION
+    large_clients = int(argv[2]) if len(argv) > 2 else DEFAULT_LARGE_CLIENTS
+    small_clients = int(argv[3]) if len(argv) > 3 else DEFAULT_SMALL_CLIENTS
+    large_lines = int(argv[4]) if len(argv) > 4 else DEFAULT_LARGE_LINES
+    print '%d abusive connections posting %d lines, %d other clients, ' \
+        '%.0fs' % (large_clients, large_lines, small_clients, duration)
+    for name, command in MODES:
+        benchmark(name, command, duration, large_clients, small_clients,
+                  large_lines)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
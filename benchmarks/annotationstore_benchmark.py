@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Benchmark loading and querying the annotation store.
+
+Loads synthetic annotations (in expanded JSON-LD, without running
+JSON-LD expansion for each) into an annotation store in a temporary
+file and reports the loading rate and the latency of indexed queries
+by target document, by body, by target and motivation, and of a deep
+page.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import annotationstore
+
+from annotationstore import OA
+
+DEFAULT_ANNOTATIONS = 1000000
+DEFAULT_DOCUMENTS = 100000
+BATCH_SIZE = 10000
+QUERIES = 1000
+
+RDF_VALUE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#value'
+XSD_INTEGER = 'http://www.w3.org/2001/XMLSchema#integer'
+MOTIVATIONS = ['commenting', 'describing', 'highlighting', 'identifying',
+               'tagging']
+
+def annotation(i, documents, rand):
+    """Return expanded JSON-LD for a synthetic annotation."""
+    start = rand.randint(0, 10000)
+    return {
+        '@id': 'http://example.org/annotations/%d' % i,
+        '@type': [OA + 'Annotation'],
+        OA + 'hasBody': [{
+            '@id': 'http://example.org/bodies/%d' % i,
+            RDF_VALUE: [{ '@value': 'Comment %d' % i, '@language': 'en' }],
+        }],
+        OA + 'hasTarget': [{
+            OA + 'hasSource': [{
+                '@id': 'http://example.org/documents/%d' %
+                rand.randint(0, documents - 1),
+            }],
+            OA + 'hasSelector': [{
+                '@type': [OA + 'TextPositionSelector'],
+                OA + 'start': [{ '@value': start, '@type': XSD_INTEGER }],
+                OA + 'end': [{ '@value': start + 10, '@type': XSD_INTEGER }],
+            }],
+        }],
+        OA + 'motivatedBy': [{ '@id': OA + rand.choice(MOTIVATIONS) }],
+    }
+
+def latencies(function, arguments):
+    times = []
+    for args in arguments:
+        start = time.time()
+        function(*args)
+        times.append(time.time() - start)
+    times.sort()
+    return times
+
+def report(name, times, results=None):
+    print '%-28s p50 %7.3fms  p95 %7.3fms  max %7.3fms%s' % (
+        name, times[len(times) // 2] * 1000,
+        times[int(len(times) * 0.95)] * 1000, times[-1] * 1000,
+        '  (%.1f results)' % results if results is not None else '')
+
+def main(argv):
+    annotations = int(argv[1]) if len(argv) > 1 else DEFAULT_ANNOTATIONS
+    documents = int(argv[2]) if len(argv) > 2 else DEFAULT_DOCUMENTS
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'annotations.db')
+        store = annotationstore.AnnotationStore(path)
+        rand = random.Random(0)
+        start = time.time()
+        for batch_start in xrange(0, annotations, BATCH_SIZE):
+            batch_end = min(batch_start + BATCH_SIZE, annotations)
+            store.add([annotation(i, documents, rand)
+                       for i in xrange(batch_start, batch_end)])
+        elapsed = time.time() - start
+        print '%d annotations on %d documents loaded in %.1fs ' \
+            '(%.0f/sec), %.0f MB' % (annotations, documents, elapsed,
+                                     annotations / elapsed,
+                                     os.path.getsize(path) / 1e6)
+
+        document = lambda: 'http://example.org/documents/%d' % \
+            rand.randint(0, documents - 1)
+        queries = [(document(),) for _ in range(QUERIES)]
+        counts = [len(store.query(target=t)) for t, in queries[:100]]
+        report('target', latencies(lambda t: store.query(target=t), queries),
+               float(sum(counts)) / len(counts))
+        queries = [('http://example.org/bodies/%d' %
+                    rand.randint(0, annotations - 1),)
+                   for _ in range(QUERIES)]
+        report('body', latencies(lambda b: store.query(body=b), queries))
+        queries = [(document(), OA + rand.choice(MOTIVATIONS))
+                   for _ in range(QUERIES)]
+        report('target and motivation',
+               latencies(lambda t, m: store.query(target=t, motivation=m),
+                         queries))
+        queries = [('http://example.org/annotations/%d' %
+                    rand.randint(0, annotations - 1),)
+                   for _ in range(QUERIES)]
+        report('id', latencies(store.get, queries))
+        queries = [(OA + rand.choice(MOTIVATIONS),) for _ in range(10)]
+        report('motivation, offset 100000',
+               latencies(lambda m: store.query(motivation=m, offset=100000,
+                                               limit=100), queries))
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
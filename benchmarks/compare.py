@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+"""Compare two benchmark suite result files.
+
+Prints the ratio of mean times (new / old) for each measurement in
+both files, marking those that changed by more than a threshold.
+"""
+
+import sys
+import json
+
+# Relative change in mean time considered significant.
+THRESHOLD = 0.1
+
+def _measurements(report):
+    """Return dict mapping measurement names to mean times."""
+    measurements = {}
+    for result in report['results']:
+        name = '%s %s %d' % (result['benchmark'], result['format'],
+                             result['size'])
+        for key in ('from_jsonld', 'to_jsonld'):
+            if key in result:
+                measurements['%s %s' % (name, key)] = result[key]['mean']
+        if 'mean' in result:
+            measurements[name] = result['mean']
+    return measurements
+
+def main(argv):
+    if len(argv) != 3:
+        print >> sys.stderr, 'Usage: %s OLD.json NEW.json' % argv[0]
+        return 1
+    with open(argv[1]) as f:
+        old_report = json.load(f)
+    with open(argv[2]) as f:
+        new_report = json.load(f)
+    print 'old: %s' % old_report.get('commit')
+    print 'new: %s' % new_report.get('commit')
+    old, new = _measurements(old_report), _measurements(new_report)
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name] / old[name]
+        if ratio > 1 + THRESHOLD:
+            mark = 'slower'
+        elif ratio < 1 - THRESHOLD:
+            mark = 'faster'
+        else:
+            mark = ''
+        print '%-40s %9.4fs %9.4fs %6.2fx %s' % (name, old[name], new[name],
+                                                 ratio, mark)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
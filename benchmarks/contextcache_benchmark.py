@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""Benchmark the processed-context cache in expansion and compaction.
+
+Compares oajson.expand() and oajson.compact() latency using the
+shared cache in contextcache against the default PyLD cache and
+against no caching.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import contextcache
+import oajson
+
+from pyld import jsonld
+
+DEFAULT_REPEAT = 100
+
+def _make_document():
+    return {
+        '@id': 'http://example.org/annotations/1',
+        'target': 'http://example.org/documents/1',
+        'body': 'http://example.org/bodies/1',
+        'motivation': 'oa:commenting',
+    }
+
+def _roundtrip(document):
+    expanded = oajson.expand(dict(document), base='http://example.org/')
+    return oajson.compact(expanded)
+
+def _time(document, repeat):
+    _roundtrip(document)    # warm up
+    return timeit.timeit(lambda: _roundtrip(document), number=repeat)
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else DEFAULT_REPEAT
+    document = _make_document()
+
+    times = []
+    for name, cache in (('no cache', None),
+                        ('pyld cache', jsonld.ActiveContextCache()),
+                        ('shared LRU cache', contextcache.ActiveContextCache())):
+        jsonld._cache['activeCtx'] = cache
+        times.append((name, _time(document, repeat)))
+    contextcache.install()
+
+    print 'expand + compact x %d' % repeat
+    for name, total in times:
+        print '  %-18s %.2f ms/doc' % (name+':', 1000 * total / repeat)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
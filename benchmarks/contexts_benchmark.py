@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Benchmark context-to-URL lookup in compaction.
+
+Compares oajson.compact() latency using the indexed lookup in
+contexts._get_url_for_context() against the previous implementation,
+which normalized every known context and the response context for
+every lookup.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import contexts
+import oajson
+
+from pyld import jsonld
+
+DEFAULT_REPEAT = 100
+
+def _normalizing_get_url_for_context(document):
+    """Previous implementation of contexts._get_url_for_context()."""
+    for url, context in contexts.url_to_context.iteritems():
+        if jsonld.normalize(context['@context']) == jsonld.normalize(document):
+            return url
+    return document
+
+def _make_document():
+    return oajson.expand({
+        '@context': 'http://nlplab.org/ns/restoa-context-20150307.json',
+        '@id': 'http://example.org/annotations/1',
+        'target': 'http://example.org/documents/1',
+        'body': 'http://example.org/bodies/1',
+        'motivation': 'oa:commenting',
+    })
+
+def _time_compact(document, repeat):
+    return timeit.timeit(lambda: oajson.compact(document), number=repeat)
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else DEFAULT_REPEAT
+    document = _make_document()
+
+    indexed = _time_compact(document, repeat)
+    original = contexts._get_url_for_context
+    contexts._get_url_for_context = _normalizing_get_url_for_context
+    try:
+        normalizing = _time_compact(document, repeat)
+    finally:
+        contexts._get_url_for_context = original
+
+    print 'compact x %d' % repeat
+    print '  normalizing lookup: %.2f ms/doc' % (1000 * normalizing / repeat)
+    print '  indexed lookup:     %.2f ms/doc' % (1000 * indexed / repeat)
+    print '  speedup:            %.2fx' % (normalizing / indexed)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Benchmark converting large documents in a process pool.
+
+Converts large annotation collections from JSON-LD to Turtle from
+several concurrent threads, in-process and using convpool with an
+increasing number of worker processes, and reports the throughput.
+Throughput should scale with the number of workers up to the number
+of available CPUs.
+"""
+
+import os
+import sys
+import time
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import corpus
+import oajson
+import convpool
+import turtle_format
+
+DEFAULT_ANNOTATIONS = 2000
+DEFAULT_CONVERSIONS = 16
+DEFAULT_THREADS = 8
+
+def run(convert, data, conversions, threads):
+    counts = [conversions // threads + (i < conversions % threads)
+              for i in range(threads)]
+    def worker(count):
+        for _ in xrange(count):
+            convert(data)
+    workers = [threading.Thread(target=worker, args=(c,)) for c in counts]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.time() - start
+
+def benchmark(name, convert, data, conversions, threads):
+    elapsed = run(convert, data, conversions, threads)
+    print '%-14s %3d conversions in %6.2fs, %5.2f conversions/sec' % (
+        name, conversions, elapsed, conversions / elapsed)
+
+def main(argv):
+    annotations = int(argv[1]) if len(argv) > 1 else DEFAULT_ANNOTATIONS
+    conversions = int(argv[2]) if len(argv) > 2 else DEFAULT_CONVERSIONS
+    threads = int(argv[3]) if len(argv) > 3 else DEFAULT_THREADS
+    data = oajson.expand(corpus.collection(annotations))
+    cpus = multiprocessing.cpu_count()
+    print '%d annotations to Turtle, %d threads, %d CPUs' % (
+        annotations, threads, cpus)
+
+    benchmark('in-process', turtle_format.from_jsonld, data, conversions,
+              threads)
+    processes = 1
+    while processes <= max(cpus, 2):
+        pool = convpool.ConversionPool(processes, min_object_count=1)
+        pool.start()
+        convert = lambda d: pool.run(turtle_format.from_jsonld, d)
+        benchmark('%d workers' % processes, convert, data, conversions,
+                  threads)
+        pool.close()
+        processes *= 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
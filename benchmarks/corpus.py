@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""Synthetic Open Annotation corpora for benchmarking."""
+
+import random
+
+# Context used in generated annotations.
+CONTEXT_URL = 'http://nlplab.org/ns/restoa-context-20150307.json'
+
+XSD_INTEGER = 'http://www.w3.org/2001/XMLSchema#integer'
+
+MOTIVATIONS = [
+    'oa:commenting',
+    'oa:describing',
+    'oa:highlighting',
+    'oa:identifying',
+    'oa:tagging',
+]
+
+def annotation(i, rand=None):
+    """Return compacted JSON-LD for a synthetic annotation.
+
+    Each annotation gives roughly ten triples, including a blank
+    node, a language-tagged literal and typed literals.
+    """
+    if rand is None:
+        rand = random
+    doc = 'http://example.org/documents/%d' % rand.randint(0, 1000)
+    start = rand.randint(0, 10000)
+    return {
+        '@id': 'http://example.org/annotations/%d' % i,
+        '@type': 'oa:Annotation',
+        'body': {
+            '@id': 'http://example.org/bodies/%d' % i,
+            'value': { '@value': 'Comment %d' % i, '@language': 'en' },
+        },
+        'target': {
+            'source': doc,
+            'selector': {
+                '@type': 'oa:TextPositionSelector',
+                'start': { '@value': start, '@type': XSD_INTEGER },
+                'end': { '@value': start + rand.randint(1, 100),
+                         '@type': XSD_INTEGER },
+            },
+        },
+        'motivation': rand.choice(MOTIVATIONS),
+        'annotatedAt': '2015-03-17T12:00:%02d' % (i % 60),
+    }
+
+def collection(size, seed=0):
+    """Return compacted JSON-LD for a collection of annotations."""
+    rand = random.Random(seed)
+    return {
+        '@context': CONTEXT_URL,
+        '@graph': [annotation(i, rand) for i in range(size)],
+    }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""Benchmark HTML rendering of large documents.
+
+Compares html_format.from_jsonld() and stream_from_jsonld() with the
+previous renderer, which built the page in a list and pretty-printed
+it with BeautifulSoup, on synthetic annotation collections of about
+the given number of JSON-LD nodes. Each renderer runs in a forked
+process to report its own peak memory use.
+"""
+
+import os
+import sys
+import time
+import resource
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import corpus
+import oajson
+import html_format
+
+DEFAULT_NODES = 50000
+
+def count_nodes(value):
+    """Return number of dicts, lists and primitive values in value."""
+    count, stack = 0, [value]
+    while stack:
+        value = stack.pop()
+        count += 1
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+def legacy_from_jsonld(data):
+    """Render HTML as html_format did before streaming rendering."""
+    parts = ([html_format._html_header] + _legacy_to_html(data) +
+             [html_format._html_trailer])
+    from BeautifulSoup import BeautifulSoup
+    return BeautifulSoup(''.join(parts)).prettify()
+
+def _legacy_to_html(value, html=None):
+    if html is None:
+        html = []
+    if isinstance(value, list):
+        if len(value) == 1:
+            _legacy_to_html(value[0], html)
+        else:
+            html.append('<ul>\n')
+            for item in value:
+                html.append('<li>')
+                _legacy_to_html(item, html)
+                html.append('</li>\n')
+            html.append('</ul>\n')
+    elif isinstance(value, dict):
+        if len(value) == 1 and '@value' in value:
+            html.append(value['@value'])
+        else:
+            html.append('<dl>\n')
+            for key, v in sorted(value.items()):
+                if key == '@id':
+                    html.append('<a href="%s">%s</a>' % (v, v))
+                else:
+                    html.append('<dt>')
+                    _legacy_to_html(key, html)
+                    html.append('</dt><dd>')
+                    _legacy_to_html(v, html)
+                    html.append('</dd>\n')
+            html.append('</dl>\n')
+    else:
+        html.append(str(value))
+    return html
+
+def consume(chunks):
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+    return size
+
+def run_forked(function):
+    """Run function in child process, return (seconds, bytes, peak MB)."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        start = time.time()
+        size = function()
+        os.write(write_fd, '%f %d' % (time.time() - start, size))
+        os._exit(0)
+    os.close(write_fd)
+    output = os.read(read_fd, 1024)
+    os.close(read_fd)
+    _, _, rusage = os.wait4(pid, 0)
+    seconds, size = output.split()
+    return float(seconds), int(size), rusage.ru_maxrss / 1024.0
+
+def main(argv):
+    nodes = int(argv[1]) if len(argv) > 1 else DEFAULT_NODES
+    per_annotation = count_nodes(oajson.expand(corpus.collection(1)))
+    data = oajson.expand(corpus.collection(-(-nodes // per_annotation)))
+    print '%d annotations, %d nodes, baseline peak RSS %.0f MB' % (
+        len(data), count_nodes(data),
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0)
+
+    renderers = [
+        ('legacy', lambda: len(legacy_from_jsonld(data))),
+        ('from_jsonld', lambda: len(html_format.from_jsonld(data))),
+        ('stream', lambda: consume(html_format.stream_from_jsonld(data))),
+    ]
+    for name, function in renderers:
+        seconds, size, rss = run_forked(function)
+        print '%-12s %7.2fs %8.1f MB output %7.0f MB peak RSS' % (
+            name, seconds, size / 1e6, rss)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""Benchmark JSON encoding and decoding with the available libraries.
+
+Times decoding, compact encoding and pretty-printing of a synthetic
+annotation collection with the standard library json module and with
+the libraries selected by jsoncodec, and incremental decoding of the
+collection as a JSON array with jsoncodec.iterload().
+"""
+
+import os
+import sys
+import json
+import time
+import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corpus
+import oajson
+import jsoncodec
+
+DEFAULT_ANNOTATIONS = 5000
+REPEAT = 5
+
+def best_time(function, repeat=REPEAT):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+def report(name, seconds, size):
+    print '%-36s %8.4fs %8.1f MB/s' % (name, seconds, size / seconds / 1e6)
+
+def main(argv):
+    annotations = int(argv[1]) if len(argv) > 1 else DEFAULT_ANNOTATIONS
+    data = oajson.expand(corpus.collection(annotations))
+    text = json.dumps(data)
+    print '%d annotations, %.1f MB JSON; decoder %s, pretty encoder %s' % (
+        annotations, len(text) / 1e6, jsoncodec.decoder.__name__,
+        jsoncodec.pretty_encoder.__name__)
+
+    report('json.loads', best_time(lambda: json.loads(text)), len(text))
+    report('jsoncodec.loads', best_time(lambda: jsoncodec.loads(text)),
+           len(text))
+    report('jsoncodec.iterload',
+           best_time(lambda: sum(1 for _ in jsoncodec.iterload(
+                        StringIO.StringIO(text)))), len(text))
+    report('json.dumps (default separators)',
+           best_time(lambda: json.dumps(data)), len(text))
+    report('jsoncodec.dumps', best_time(lambda: jsoncodec.dumps(data)),
+           len(text))
+    pretty = json.dumps(data, indent=2, separators=(',', ': '))
+    report('json.JSONEncoder(indent=2).iterencode',
+           best_time(lambda: ''.join(json.JSONEncoder(
+                        indent=2, separators=(',', ': ')).iterencode(data))),
+           len(pretty))
+    report('jsoncodec.iterencode(pretty=True)',
+           best_time(lambda: ''.join(jsoncodec.iterencode(data, True))),
+           len(pretty))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
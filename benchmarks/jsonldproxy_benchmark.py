@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+"""Benchmark rewriting URLs in proxied JSON-LD data.
+
+Compares jsonldproxy.rewrite_urls() with the previous recursive
+implementation, which quoted every @id separately, on an expanded
+collection of synthetic annotations, and checks that deeply nested
+data can be rewritten.
+"""
+
+import os
+import sys
+import json
+import time
+import urllib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corpus
+import oajson
+import jsonldproxy
+
+DEFAULT_ANNOTATIONS = 100000
+NESTING_DEPTH = 100000
+
+PROXY_URL = 'http://localhost:5000/proxy/'
+
+def recursive_rewrite_urls(data, proxy_url):
+    """Previous implementation of jsonldproxy.rewrite_urls()."""
+    if isinstance(data, dict):
+        if '@id' in data:
+            data['@id'] = proxy_url + urllib.quote(data['@id'])
+        for key, value in data.iteritems():
+            if key == '@id':
+                continue
+            recursive_rewrite_urls(value, proxy_url)
+    elif isinstance(data, list):
+        for item in data:
+            recursive_rewrite_urls(item, proxy_url)
+    return data
+
+def count_ids(data):
+    count, stack = 0, [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            count += '@id' in value
+            stack.extend(value.itervalues())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+def benchmark(name, function, serialized, ids):
+    data = json.loads(serialized)
+    start = time.time()
+    function(data)
+    elapsed = time.time() - start
+    print '%-24s %.2fs, %9.0f IRIs/sec' % (name, elapsed, ids / elapsed)
+    return data
+
+def nested(depth):
+    data = node = {}
+    for i in xrange(depth):
+        child = { '@id': 'http://example.org/nodes/%d' % i }
+        node['http://example.org/child'] = [child]
+        node = child
+    return data
+
+def main(argv):
+    annotations = int(argv[1]) if len(argv) > 1 else DEFAULT_ANNOTATIONS
+    print 'Expanding %d annotations ...' % annotations
+    serialized = json.dumps(oajson.expand(corpus.collection(annotations)))
+    ids = count_ids(json.loads(serialized))
+    print '%d @id values' % ids
+
+    old = benchmark('recursive', lambda d: recursive_rewrite_urls(d, PROXY_URL),
+                    serialized, ids)
+    new = benchmark('iterative', lambda d: jsonldproxy.rewrite_urls(d, PROXY_URL),
+                    serialized, ids)
+    assert old == new, 'results differ'
+    origin = 'http://example.org'
+    benchmark('iterative, same origin',
+              lambda d: jsonldproxy.rewrite_urls(d, PROXY_URL, origin),
+              serialized, ids)
+
+    data = nested(NESTING_DEPTH)
+    try:
+        recursive_rewrite_urls(data, PROXY_URL)
+        print 'recursive: depth %d ok' % NESTING_DEPTH
+    except RuntimeError, e:
+        print 'recursive: depth %d failed: %s' % (NESTING_DEPTH, e)
+    data = nested(NESTING_DEPTH)
+    jsonldproxy.rewrite_urls(data, PROXY_URL)
+    print 'iterative: depth %d ok' % NESTING_DEPTH
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
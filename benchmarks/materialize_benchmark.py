@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Benchmark requests for single stored annotations with materialization.
+
+Stores synthetic annotations in an in-memory annotation store, and
+reports the latency of GET /annotations/?id= requests in each format
+when rendering on request and when served from stored renditions
+(after the eager renditions are done and the lazy ones made by a
+first round of requests).
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corpus
+import oajson
+import restoaclient
+import server
+import materialize
+import annotationstore
+
+DEFAULT_ANNOTATIONS = 1000
+REQUESTS = 200
+
+def latencies(client, ids, accept):
+    times = []
+    for id_ in ids:
+        start = time.time()
+        response = client.get('/annotations/?id=%s' % id_,
+                              headers={ 'Accept': accept })
+        response.data
+        response.close()
+        times.append(time.time() - start)
+    times.sort()
+    return times
+
+def report(name, times):
+    print '%-36s p50 %7.3fms  p95 %7.3fms' % (
+        name, times[len(times) // 2] * 1000,
+        times[int(len(times) * 0.95)] * 1000)
+
+def main(argv):
+    annotations = int(argv[1]) if len(argv) > 1 else DEFAULT_ANNOTATIONS
+    store = annotationstore.AnnotationStore()
+    materializer = materialize.Materializer(store, server.formats)
+    server.annotation_store = store
+    client = server.app.test_client()
+
+    start = time.time()
+    ids = store.add(oajson.expand(corpus.collection(annotations)))
+    print '%d annotations stored in %.2fs' % (annotations,
+                                              time.time() - start)
+    start = time.time()
+    materializer.written(ids)
+    materializer.close()
+    print 'eager renditions (%s) in %.2fs' % (
+        ', '.join(materializer.eager), time.time() - start)
+
+    rand = random.Random(0)
+    sample = [rand.choice(ids) for _ in range(REQUESTS)]
+    for f in sorted(server.formats, key=lambda f: f.format_name):
+        accept = f.mimetypes[0]
+        server.materializer = None
+        report('%s, rendered' % f.format_name,
+               latencies(client, sample, accept))
+        server.materializer = materializer
+        latencies(client, sample, accept)    # make lazy renditions
+        report('%s, materialized (%s)' % (
+                f.format_name, materializer.policy(f.format_name)),
+               latencies(client, sample, accept))
+    store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""Benchmark streaming N-Quads parsing and serialization.
+
+Measures the throughput of nquadstools.parse() on a synthetic N-Quads
+file read as a file and memory-mapped, and of nquadstools.serialize()
+on a synthetic annotation collection, in triples per second, with peak
+memory use.
+"""
+
+import os
+import sys
+import mmap
+import time
+import resource
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import corpus
+import oajson
+import nquadstools
+
+DEFAULT_LINES = 2000000
+DEFAULT_ANNOTATIONS = 20000
+
+def _write_nquads(f, lines):
+    for i in xrange(lines):
+        if i % 3 == 0:
+            f.write('<http://example.org/annotations/%d> '
+                    '<http://www.w3.org/ns/oa#hasTarget> '
+                    '<http://example.org/documents/%d> .\n' % (i, i % 1000))
+        elif i % 3 == 1:
+            f.write('_:b%d <http://www.w3.org/1999/02/22-rdf-syntax-ns#value> '
+                    '"Comment \\"%d\\" with spaces"@en '
+                    '<http://example.org/graphs/%d> .\n' % (i, i, i % 10))
+        else:
+            f.write('_:b%d <http://www.w3.org/ns/oa#start> '
+                    '"%d"^^<http://www.w3.org/2001/XMLSchema#integer> _:g .\n'
+                    % (i, i))
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def benchmark_parse(lines):
+    with tempfile.NamedTemporaryFile(suffix='.nq') as f:
+        _write_nquads(f, lines)
+        f.flush()
+        size = f.tell()
+        for name, mapped in (('file', False), ('mmap', True)):
+            rss_before = _max_rss_mb()
+            start = time.time()
+            with open(f.name) as input_:
+                if mapped:
+                    input_ = mmap.mmap(input_.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+                count = sum(1 for _ in nquadstools.parse(input_))
+            elapsed = time.time() - start
+            print 'parse (%s): %d triples (%.0f MB) in %.1fs, ' \
+                '%.0f triples/sec' % (name, count, size / 1e6, elapsed,
+                                      count / elapsed)
+            print '  peak RSS %.0f MB (%.0f MB before)' % (_max_rss_mb(),
+                                                          rss_before)
+
+def benchmark_serialize(annotations):
+    data = oajson.expand(corpus.collection(annotations))
+    rss_before = _max_rss_mb()
+    start = time.time()
+    count = 0
+    for chunk in nquadstools.serialize(data):
+        count += chunk.count('\n')
+    elapsed = time.time() - start
+    print 'serialize: %d triples in %.1fs, %.0f triples/sec' % (
+        count, elapsed, count / elapsed)
+    print '  peak RSS %.0f MB (%.0f MB before)' % (_max_rss_mb(), rss_before)
+
+def main(argv):
+    lines = int(argv[1]) if len(argv) > 1 else DEFAULT_LINES
+    annotations = int(argv[2]) if len(argv) > 2 else DEFAULT_ANNOTATIONS
+    benchmark_parse(lines)
+    benchmark_serialize(annotations)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
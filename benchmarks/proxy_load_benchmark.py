@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""Load test the /proxy/ endpoint against a slow upstream server.
+
+Starts a local mock upstream server that delays every response, then
+runs the threaded server (server.py) and the gevent server
+(asyncserver.py) in turn, each in its own process, and measures the
+throughput and latency of proxied requests with many concurrent
+clients, with the peak memory use of the server. The gevent server is
+skipped if gevent is not installed.
+"""
+
+import os
+import sys
+import imp
+import json
+import time
+import socket
+import threading
+import BaseHTTPServer
+import SocketServer
+import subprocess
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corpus
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_CLIENTS = 200
+DEFAULT_REQUESTS = 1000
+DEFAULT_DELAY = 0.5
+
+SERVER_PORT = 5055
+
+class SlowUpstreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve an annotation for any path after a delay."""
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        data = dict(corpus.annotation(int(self.path.split('/')[-1])),
+                    **{'@context': corpus.CONTEXT_URL})
+        body = json.dumps(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/ld+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SlowUpstreamServer(SocketServer.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+def start_upstream(delay):
+    server = SlowUpstreamServer(('127.0.0.1', 0), SlowUpstreamHandler)
+    server.delay = delay
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+# Commands starting the servers. Each server runs in a new interpreter,
+# as gevent needs to patch the standard library before it is imported.
+THREADED_SERVER = [sys.executable, '-c',
+                   'import sys, restoaclient, server; '
+                   'server.app.run(port=int(sys.argv[1]), threaded=True)']
+GEVENT_SERVER = [sys.executable, 'asyncserver.py']
+
+def _wait_for_port(port, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return
+        except socket.error:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start on port %d' % port)
+
+def _peak_rss_mb(pid):
+    """Return peak resident set size of process, or None if unknown."""
+    try:
+        with open('/proc/%d/status' % pid) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    return None
+
+def load(url_for, requests_, clients):
+    """Make requests with given number of concurrent clients.
+
+    Returns:
+        (elapsed seconds, list of latencies, number of errors).
+    """
+    latencies, errors = [], []
+    counter = iter(xrange(requests_))
+    lock = threading.Lock()
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.time()
+            try:
+                response = session.get(url_for(i))
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                latencies.append(time.time() - start)
+                if not ok:
+                    errors.append(i)
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - start, latencies, len(errors)
+
+def benchmark(name, command, upstream_url, requests_, clients):
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(command + [str(SERVER_PORT)], cwd=ROOT,
+                                   stdout=devnull, stderr=devnull)
+    try:
+        _wait_for_port(SERVER_PORT)
+        proxy_url = 'http://127.0.0.1:%d/proxy/%s' % (SERVER_PORT,
+                                                      upstream_url)
+        url_for = lambda i: '%s%d' % (proxy_url, i)
+        elapsed, latencies, errors = load(url_for, requests_, clients)
+        rss = _peak_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    latencies.sort()
+    print '%-8s %5d requests in %6.2fs, %6.1f requests/sec, ' \
+        'median %.2fs, p99 %.2fs, %d errors' % (
+        name, requests_, elapsed, requests_ / elapsed,
+        latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.99)], errors)
+    if rss is not None:
+        print '         server peak RSS %.0f MB' % rss
+
+def main(argv):
+    requests_ = int(argv[1]) if len(argv) > 1 else DEFAULT_REQUESTS
+    clients = int(argv[2]) if len(argv) > 2 else DEFAULT_CLIENTS
+    delay = float(argv[3]) if len(argv) > 3 else DEFAULT_DELAY
+    servers = [('threaded', THREADED_SERVER)]
+    try:
+        imp.find_module('gevent')
+        servers.append(('gevent', GEVENT_SERVER))
+    except ImportError:
+        print 'gevent not installed, skipping asyncserver'
+    upstream = start_upstream(delay)
+    upstream_url = 'http://127.0.0.1:%d/annotations/' % upstream.server_port
+    print '%d clients, upstream delay %.2fs' % (clients, delay)
+    for name, command in servers:
+        benchmark(name, command, upstream_url, requests_, clients)
+    upstream.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
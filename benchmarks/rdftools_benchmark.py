@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+"""Benchmark conversion between JSON-LD and RDF formats in rdftools.
+
+Compares rdftools.from_jsonld() and rdftools.to_jsonld(), which pass
+data directly between PyLD RDF datasets and rdflib graphs, against
+the previous paths via N-Quads text.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import rdflib
+
+import corpus
+import oajson
+import rdftools
+
+from pyld import jsonld
+
+DEFAULT_SIZES = [1000, 5000]
+FORMATS = ['turtle', 'nt', 'xml', 'trig']
+
+def _from_jsonld_via_nquads(data, format):
+    """Previous implementation of rdftools.from_jsonld()."""
+    quads = jsonld.to_rdf(data, { 'format': 'application/nquads' })
+    graph = rdflib.ConjunctiveGraph()
+    graph.parse(data=quads, format='nquads')
+    return graph.serialize(format=format)
+
+def _remove_blank_graph_labels(data):
+    """Previous implementation of rdftools._remove_blank_graph_labels()."""
+    processed = []
+    for line in data.split('\n'):
+        fields = line.split()
+        if len(fields) >= 4 and fields[3].startswith('_:'):
+            fields = fields[:3] + fields[4:]
+        processed.append(' '.join(fields))
+    return '\n'.join(processed)
+
+def _to_jsonld_via_nquads(data, format):
+    """Previous implementation of rdftools.to_jsonld()."""
+    graph = rdftools.from_string(data, format)
+    data = _remove_blank_graph_labels(graph.serialize(format='nquads'))
+    return jsonld.from_rdf(data, { 'format': 'application/nquads' })
+
+def _time(function, *args):
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+def main(argv):
+    sizes = [int(a) for a in argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        data = oajson.expand(corpus.collection(size))
+        triples = len(rdftools.to_graph(data))
+        print '%d annotations, %d triples' % (size, triples)
+        for format in FORMATS:
+            previous = _time(_from_jsonld_via_nquads, data, format)
+            direct = _time(rdftools.from_jsonld, data, format)
+            _report('from_jsonld', format, previous, direct)
+        for format in FORMATS:
+            text = rdftools.from_jsonld(data, format)
+            previous = _time(_to_jsonld_via_nquads, text, format)
+            direct = _time(rdftools.to_jsonld, text, format)
+            _report('to_jsonld', format, previous, direct)
+
+def _report(function, format, previous, direct):
+    print '  %-11s %-7s via N-Quads %.2fs, direct %.2fs (%.0f%% faster)' % (
+        function, format, previous, direct, 100 * (1 - direct / previous))
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
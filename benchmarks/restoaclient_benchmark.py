@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""Benchmark fetching annotations from an upstream server.
+
+Starts a local stand-in for an upstream RESTful Open Annotation server
+and measures the request rate of restoaclient.fetch() with a new
+connection per request (as before connection pooling), with the
+shared session, and with the HTTP cache for responses that must be
+revalidated and for responses that are fresh.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import BaseHTTPServer
+import SocketServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+
+import corpus
+import restoaclient
+
+DEFAULT_REQUESTS = 2000
+DEFAULT_THREADS = 8
+DEFAULT_ANNOTATIONS = 50
+
+class UpstreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve a fixed annotation collection with given Cache-Control."""
+
+    protocol_version = 'HTTP/1.1'    # keep-alive
+    wbufsize = -1                    # send headers and body together
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body, etag = self.server.body, self.server.etag
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/ld+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', self.server.cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class UpstreamServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+def start_upstream(annotations):
+    server = UpstreamServer(('127.0.0.1', 0), UpstreamHandler)
+    server.body = json.dumps(corpus.collection(annotations))
+    server.etag = '"%s"' % hashlib.sha1(server.body).hexdigest()
+    server.cache_control = 'no-cache'
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def _unpooled_fetch(url):
+    response = requests.get(url, headers={'Accept': 'application/ld+json'})
+    response.raise_for_status()
+    return response
+
+def run(fetch, url, requests_, threads):
+    def worker(count):
+        for _ in xrange(count):
+            fetch(url)
+    counts = [requests_ // threads + (i < requests_ % threads)
+              for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(c,)) for c in counts]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.time() - start
+
+def benchmark(name, fetch, url, requests_, threads):
+    elapsed = run(fetch, url, requests_, threads)
+    print '%-24s %6d requests in %5.2fs, %7.0f requests/sec' % (
+        name, requests_, elapsed, requests_ / elapsed)
+
+def main(argv):
+    requests_ = int(argv[1]) if len(argv) > 1 else DEFAULT_REQUESTS
+    threads = int(argv[2]) if len(argv) > 2 else DEFAULT_THREADS
+    server = start_upstream(DEFAULT_ANNOTATIONS)
+    url = 'http://127.0.0.1:%d/annotations/' % server.server_port
+    print '%d threads, %d byte response' % (threads, len(server.body))
+
+    benchmark('new connections', _unpooled_fetch, url, requests_, threads)
+
+    restoaclient.http_cache = restoaclient.HttpCache(0)
+    benchmark('shared session', restoaclient.fetch, url, requests_, threads)
+
+    restoaclient.http_cache = restoaclient.HttpCache(1024 * 1024)
+    benchmark('revalidated (no-cache)', restoaclient.fetch, url, requests_,
+              threads)
+
+    server.cache_control = 'max-age=60'
+    restoaclient.http_cache = restoaclient.HttpCache(1024 * 1024)
+    benchmark('fresh (max-age)', restoaclient.fetch, url, requests_, threads)
+
+    server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""Benchmark the memory use of ingesting large request bodies.
+
+Parses a synthetic N-Quads body read from a stream, as the server
+reads request bodies, either into a string or spooled to a
+memory-mapped temporary file (see spool.py), and reports the time and
+peak memory use of each. Each mode runs in a separate process, as the
+peak is the maximum over the lifetime of a process.
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import spool
+import nquadstools
+
+from nquads_benchmark import _write_nquads
+
+DEFAULT_LINES = 1000000
+
+MODES = ('memory', 'spool')
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def run(mode, path):
+    """Parse file at path as a request body, print results."""
+    rss_before = _max_rss_mb()
+    start = time.time()
+    with open(path) as stream:
+        if mode == 'memory':
+            data = stream.read()
+        else:
+            data = spool.spool(stream)
+        count = sum(1 for _ in nquadstools.parse(data))
+    elapsed = time.time() - start
+    print '%s: %d triples (%.0f MB) in %.1fs, %.0f triples/sec' % (
+        mode, count, os.path.getsize(path) / 1e6, elapsed, count / elapsed)
+    print '  peak RSS %.0f MB (%.0f MB before)' % (_max_rss_mb(), rss_before)
+
+def main(argv):
+    if len(argv) > 2 and argv[1] in MODES:
+        return run(argv[1], argv[2])
+    lines = int(argv[1]) if len(argv) > 1 else DEFAULT_LINES
+    with tempfile.NamedTemporaryFile(suffix='.nq') as f:
+        _write_nquads(f, lines)
+        f.flush()
+        print 'spool.MAX_MEMORY_SIZE %d MB, spool.WINDOW_SIZE %d MB' % (
+            spool.MAX_MEMORY_SIZE >> 20, spool.WINDOW_SIZE >> 20)
+        for mode in MODES:
+            subprocess.check_call([sys.executable, __file__, mode, f.name])
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
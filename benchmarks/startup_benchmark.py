@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""Benchmark server startup with lazy and eager format loading.
+
+Starts fresh Python processes that import the server with
+formatloader.LAZY set to True and False, and reports the time to
+import, the time of the first /echo/ request in JSON-LD and in Turtle
+(which imports rdflib when loading lazily), the number of loaded
+modules and the peak memory use after import.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_REPEAT = 5
+
+# Run in a child process with the lazy setting as argument; prints
+# measurements as JSON.
+CHILD = r'''
+import sys, time, json, resource
+start = time.time()
+import formatloader
+formatloader.LAZY = sys.argv[1] == 'lazy'
+import restoaclient, server
+result = {
+    'import': time.time() - start,
+    'modules': len(sys.modules),
+    'rdflib': 'rdflib' in sys.modules,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+}
+client = server.app.test_client()
+body = '{"@id": "http://example.org/1", "oa:hasTarget": "http://example.org/2"}'
+for name, mimetype in (('jsonld', 'application/ld+json'),
+                       ('turtle', 'text/turtle')):
+    start = time.time()
+    response = client.post('/echo/', data=body, headers={
+        'Content-Type': 'application/ld+json', 'Accept': mimetype })
+    response.get_data()
+    response.close()
+    assert response.status_code == 200, response.status_code
+    result['first_' + name] = time.time() - start
+print json.dumps(result)
+'''
+
+def run_child(mode):
+    output = subprocess.check_output([sys.executable, '-c', CHILD, mode],
+                                     cwd=ROOT)
+    return json.loads(output.splitlines()[-1])
+
+def mean(values):
+    return sum(values) / len(values)
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else DEFAULT_REPEAT
+    print '%-6s %9s %12s %12s %8s %8s %7s' % (
+        'mode', 'import', 'first jsonld', 'first turtle', 'modules',
+        'RSS MB', 'rdflib')
+    for mode in ('eager', 'lazy'):
+        results = [run_child(mode) for _ in range(repeat)]
+        print '%-6s %8.3fs %11.3fs %11.3fs %8d %8.1f %7s' % (
+            mode,
+            mean([r['import'] for r in results]),
+            mean([r['first_jsonld'] for r in results]),
+            mean([r['first_turtle'] for r in results]),
+            results[0]['modules'],
+            mean([r['rss_mb'] for r in results]),
+            results[0]['rdflib'])
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+"""Benchmark suite for format conversions and server endpoints.
+
+Generates synthetic Open Annotation collections of several sizes and
+measures:
+
+* from_jsonld() and to_jsonld() of every format module found by
+  formatloader.load(),
+* /echo/ latency and throughput for JSON-LD input rendered in each
+  format, and
+* /proxy/ latency and throughput against a local mock upstream server,
+
+using the Flask test client. Results are written to a JSON file for
+comparison across commits.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import threading
+import subprocess
+import BaseHTTPServer
+import SocketServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# formatloader loads formats relative to the working directory.
+CWD = os.getcwd()
+os.chdir(ROOT)
+
+import corpus
+import restoaclient
+import server
+import formatloader
+import oajson
+
+DEFAULT_SIZES = [1, 10, 100]
+
+# Minimum total time and number of repetitions for each measurement.
+MIN_TIME = 1.0
+MIN_REPEAT = 3
+
+DEFAULT_OUTPUT = 'benchmark-results.json'
+
+class UpstreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve a collection of the size given by the last path component."""
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        size = int(self.path.rstrip('/').split('/')[-1])
+        body = self.server.bodies.get(size)
+        if body is None:
+            body = json.dumps(corpus.collection(size))
+            self.server.bodies[size] = body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/ld+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class UpstreamServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+def start_upstream():
+    upstream = UpstreamServer(('127.0.0.1', 0), UpstreamHandler)
+    upstream.bodies = {}
+    thread = threading.Thread(target=upstream.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return upstream
+
+def measure(function, min_time=MIN_TIME, min_repeat=MIN_REPEAT):
+    """Call function repeatedly, return list of times in seconds."""
+    times = []
+    total_start = time.time()
+    while len(times) < min_repeat or time.time() - total_start < min_time:
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return times
+
+def summarize(times, size):
+    times = sorted(times)
+    mean = sum(times) / len(times)
+    return {
+        'repeat': len(times),
+        'mean': mean,
+        'median': times[len(times) // 2],
+        'p95': times[min(len(times) - 1, int(len(times) * 0.95))],
+        'min': times[0],
+        'per_second': 1.0 / mean,
+        'annotations_per_second': size / mean,
+    }
+
+def _request_context(mimetype):
+    # Some formats read the request, e.g. for the JSON-LD profile.
+    return server.app.test_request_context(headers={'Accept': mimetype})
+
+def benchmark_formats(formats, sizes):
+    results = []
+    for size in sizes:
+        data = oajson.expand(corpus.collection(size))
+        for format_ in formats:
+            mimetype = format_.mimetypes[0]
+            result = {
+                'benchmark': 'format',
+                'format': format_.format_name,
+                'size': size,
+            }
+            with _request_context(mimetype):
+                try:
+                    output = format_.from_jsonld(data)
+                    times = measure(lambda: format_.from_jsonld(data))
+                    result['from_jsonld'] = summarize(times, size)
+                    result['bytes'] = len(output)
+                    times = measure(lambda: format_.to_jsonld(output))
+                    result['to_jsonld'] = summarize(times, size)
+                except Exception, e:
+                    result['error'] = '%s: %s' % (type(e).__name__, e)
+            results.append(result)
+            _report(result)
+    return results
+
+def benchmark_echo(formats, sizes):
+    client = server.app.test_client()
+    results = []
+    for size in sizes:
+        body = json.dumps(corpus.collection(size))
+        for format_ in formats:
+            mimetype = format_.mimetypes[0]
+            headers = {
+                'Content-Type': 'application/ld+json',
+                'Accept': mimetype,
+            }
+            def request():
+                response = client.post('/echo/', data=body, headers=headers)
+                response.get_data()
+                response.close()
+                return response
+            result = {
+                'benchmark': 'echo',
+                'format': format_.format_name,
+                'size': size,
+            }
+            status = request().status_code
+            if status == 200:
+                result.update(summarize(measure(request), size))
+            else:
+                result['error'] = 'HTTP status %d' % status
+            results.append(result)
+            _report(result)
+    return results
+
+def benchmark_proxy(sizes):
+    upstream = start_upstream()
+    client = server.app.test_client()
+    results = []
+    try:
+        for size in sizes:
+            url = '/proxy/http://127.0.0.1:%d/annotations/%d' % (
+                upstream.server_port, size)
+            def request():
+                response = client.get(url,
+                                      headers={'Accept': 'application/ld+json'})
+                response.get_data()
+                response.close()
+                return response
+            result = {
+                'benchmark': 'proxy',
+                'format': 'jsonld',
+                'size': size,
+            }
+            status = request().status_code
+            if status == 200:
+                result.update(summarize(measure(request), size))
+            else:
+                result['error'] = 'HTTP status %d' % status
+            results.append(result)
+            _report(result)
+    finally:
+        upstream.shutdown()
+    return results
+
+def _report(result):
+    name = '%s %s %d' % (result['benchmark'], result['format'],
+                         result['size'])
+    if 'error' in result:
+        print >> sys.stderr, '%-24s error: %s' % (name, result['error'])
+    elif 'from_jsonld' in result:
+        print >> sys.stderr, '%-24s from_jsonld %8.4fs  to_jsonld %8.4fs' % (
+            name, result['from_jsonld']['mean'], result['to_jsonld']['mean'])
+    else:
+        print >> sys.stderr, '%-24s %8.4fs  %8.1f requests/sec' % (
+            name, result['mean'], result['per_second'])
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       cwd=ROOT,
+                                       stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def argparser():
+    ap = argparse.ArgumentParser(description='Run benchmark suite.')
+    ap.add_argument('-s', '--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                    help='comma-separated corpus sizes (annotations)')
+    ap.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                    help='file to write JSON results to')
+    ap.add_argument('-f', '--formats', default=None,
+                    help='comma-separated format names (default all)')
+    ap.add_argument('--skip', default='',
+                    help='comma-separated benchmarks to skip '
+                    '(format, echo, proxy)')
+    return ap
+
+def main(argv):
+    args = argparser().parse_args(argv[1:])
+    output = os.path.abspath(os.path.join(CWD, args.output))
+    sizes = [int(s) for s in args.sizes.split(',')]
+    skip = set(s for s in args.skip.split(',') if s)
+    formats = formatloader.load()
+    if args.formats is not None:
+        names = set(args.formats.split(','))
+        formats = [f for f in formats if f.format_name in names]
+    formats.sort(key=lambda f: f.format_name)
+
+    results = []
+    if 'format' not in skip:
+        results.extend(benchmark_formats(formats, sizes))
+    if 'echo' not in skip:
+        results.extend(benchmark_echo(formats, sizes))
+    if 'proxy' not in skip:
+        results.extend(benchmark_proxy(sizes))
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print >> sys.stderr, 'Wrote results to %s' % output
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
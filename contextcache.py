@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""Process-wide cache of processed JSON-LD contexts.
+
+PyLD processes the local context (e.g. the Open Annotation context)
+of every expanded and compacted document into an "active context".
+This module provides a replacement for the PyLD active context cache
+that is shared across requests, evicts the least recently used
+entries, and keeps hit/miss counts.
+
+Local contexts are keyed by a hash of their content, as PyLD copies
+them before processing. Active contexts are keyed by identity where
+possible, as the active contexts that PyLD processes further are
+typically ones returned from this cache.
+"""
+
+import json
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from pyld import jsonld
+
+# Default maximum number of processed contexts to keep.
+DEFAULT_SIZE = 100
+
+class ActiveContextCache(object):
+    """LRU cache of PyLD active contexts.
+
+    Implements the get() and set() interface expected by PyLD for
+    jsonld._cache['activeCtx'].
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        # id() of cached active context -> (active context, key)
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def get(self, active_ctx, local_ctx):
+        key = (self._key(active_ctx), _content_key(local_ctx))
+        with self._lock:
+            try:
+                result = self._cache.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._cache[key] = result    # mark most recently used
+            self.hits += 1
+            return result
+
+    def set(self, active_ctx, local_ctx, result):
+        key = (self._key(active_ctx), _content_key(local_ctx))
+        result_key = _content_key(result)
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._known.pop(id(previous), None)
+            self._cache[key] = result
+            self._known[id(result)] = (result, result_key)
+            while len(self._cache) > self.size:
+                _, evicted = self._cache.popitem(last=False)
+                self._known.pop(id(evicted), None)
+
+    def clear(self):
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._cache.clear()
+            self._known.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return dict with cache size and hit/miss counts."""
+        return {
+            'size': len(self._cache),
+            'maxsize': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _key(self, active_ctx):
+        known = self._known.get(id(active_ctx))
+        if known is not None and known[0] is active_ctx:
+            return known[1]
+        return _content_key(active_ctx)
+
+def _content_key(context):
+    """Return hash of the content of given context."""
+    # Note: keys are not sorted, as that would bypass the C JSON
+    # encoder. At worst, this causes unnecessary cache misses.
+    # The inverse context is derived data generated lazily by PyLD
+    # and not part of the identity of an active context.
+    if isinstance(context, dict) and context.get('inverse') is not None:
+        context = dict(context, inverse=None)
+    serialized = json.dumps(context, separators=(',', ':'))
+    return hashlib.sha1(serialized).hexdigest()
+
+# The cache shared by all PyLD processing in this process.
+_cache = ActiveContextCache()
+
+def install(cache=None):
+    """Make PyLD use given cache, or the shared cache if None."""
+    if cache is None:
+        cache = _cache
+    jsonld._cache['activeCtx'] = cache
+    return cache
+
+def stats():
+    """Return statistics for the shared cache."""
+    return _cache.stats()
@@ -2,15 +2,47 @@
 
 """Support for working with JSON-LD contexts."""
 
+import os
+import copy
+import json
+import time
+import urllib
+import logging
+import hashlib
+import tempfile
+import threading
+
 from pyld import jsonld
 
+# Maximum number of context-to-URL lookups to remember for contexts
+# that are not found in the structural index.
+MAX_REMEMBERED_LOOKUPS = 1024
+
+# Directory to read locally stored contexts from, or None for no
+# directory. Files are named by URL-quoting the context URL (see
+# context_filename()). Contexts retrieved over the network are also
+# stored here. Stored contexts are pinned: they are used for as long as
+# the server runs and are never retrieved again, regardless of
+# REMOTE_CONTEXT_TTL. Delete a file to have its context retrieved
+# again (after restarting the server, if the context has been used).
+CONTEXT_DIRECTORY = None
+
+# Number of seconds to keep contexts retrieved over the network in
+# memory, if not stored in CONTEXT_DIRECTORY.
+REMOTE_CONTEXT_TTL = 24 * 60 * 60
+
+# If True, never retrieve contexts over the network.
+OFFLINE = False
+
 def context_urls_to_objects(document):
     """Replace context URLs with their corresponding objects.
 
     This function is intended to be called with a JSON-LD document
-    prior to expansion to avoid unnecessary HTTP GETs.
+    prior to expansion to avoid unnecessary HTTP GETs. Any context
+    URLs that this does not replace (e.g. in nested contexts) are
+    resolved by load_document() when installed as the PyLD document
+    loader.
     """
-    # TODO: process recursively.
     try:
         if '@context' in document:
             document['@context'] = _get_context_for_url(document['@context'])
@@ -213,14 +245,193 @@ def _get_context_for_url(url):
         return url  # can only map strings
     return url_to_context.get(url, url)
 
+def register_context(url, context):
+    """Register context object for given URL.
+
+    Args:
+        url: URL of the context.
+        context: dict with the context description under '@context'.
+
+    Raises:
+        ValueError: if context has no '@context'.
+    """
+    if not _is_context(context):
+        raise ValueError('not a JSON-LD context document: %s' % url)
+    url_to_context[url] = context
+    _index_context(url, context)
+
+def _is_context(document):
+    """Return True if given JSON data is a context document."""
+    return isinstance(document, dict) and '@context' in document
+
+def _fingerprint(document):
+    """Return a cheap structural hash of given JSON data.
+
+    Structurally identical data gives the same fingerprint. Unlike
+    normalization, this does not involve any JSON-LD processing.
+    """
+    # Note: keys are not sorted, as that would bypass the C JSON
+    # encoder. Differences in key order only cause a fallback on
+    # comparing canonical forms.
+    serialized = json.dumps(document, separators=(',', ':'))
+    return hashlib.sha1(serialized).hexdigest()
+
+def _canonical(document):
+    """Return serialization of given JSON data independent of key order."""
+    return json.dumps(document, separators=(',', ':'), sort_keys=True)
+
+# Mapping from structural fingerprints of known context objects to
+# their URLs.
+_fingerprint_to_url = {}
+
+# Mapping from canonical forms of known context objects to their URLs.
+# (JSON-LD normalization cannot be used to compare contexts, as a
+# context on its own has no triples and all contexts normalize to the
+# same empty string.)
+_canonical_to_url = {}
+
+# Results of previous lookups for contexts without a structural match,
+# keyed by fingerprint. Values are URLs or None for no match.
+_remembered_lookups = {}
+
+def _index_context(url, context):
+    """Add given context to the indices used by _get_url_for_context()."""
+    # Earlier registrations take precedence.
+    _fingerprint_to_url.setdefault(_fingerprint(context['@context']), url)
+    _canonical_to_url.setdefault(_canonical(context['@context']), url)
+    _remembered_lookups.clear()
+
+for _url, _context in url_to_context.iteritems():
+    _index_context(_url, _context)
+del _url, _context
+
 def _get_url_for_context(document):
     """Return URL for given context object.
 
     Returns:
-        context URL, or given dict if not found.
+        URL of a registered context with the same content, or given
+        dict if there is none.
     """
-    for url, context in url_to_context.iteritems():
-        # TODO: avoid unnecessarily repeated normalization of known contexts
-        if jsonld.normalize(context['@context']) == jsonld.normalize(document):
-            return url
-    return document
+    if isinstance(document, basestring):
+        return document    # already a URL
+    fingerprint = _fingerprint(document)
+    url = _fingerprint_to_url.get(fingerprint)
+    if url is not None:
+        return url
+    # No structural match, fall back on comparing canonical forms.
+    try:
+        url = _remembered_lookups[fingerprint]
+    except KeyError:
+        url = _canonical_to_url.get(_canonical(document))
+        if len(_remembered_lookups) >= MAX_REMEMBERED_LOOKUPS:
+            _remembered_lookups.clear()
+        _remembered_lookups[fingerprint] = url
+    if url is None:
+        return document
+    return url
+
+def context_filename(url, directory=None):
+    """Return the name of the file storing the context for given URL."""
+    if directory is None:
+        directory = CONTEXT_DIRECTORY
+    return os.path.join(directory, urllib.quote(url, safe='') + '.jsonld')
+
+def load_context_directory(directory=None):
+    """Register the contexts stored in given directory.
+
+    Files that are not valid context documents are skipped.
+
+    Returns:
+        list of URLs of the registered contexts.
+    """
+    if directory is None:
+        directory = CONTEXT_DIRECTORY
+    registered = []
+    for fn in sorted(os.listdir(directory)):
+        if not fn.endswith('.jsonld'):
+            continue
+        url = urllib.unquote(fn[:-len('.jsonld')])
+        context = _read_stored_context(os.path.join(directory, fn))
+        if context is not None:
+            register_context(url, context)
+            registered.append(url)
+    return registered
+
+def _read_stored_context(filename):
+    """Return context document stored in given file, or None if the
+    file does not contain one."""
+    try:
+        with open(filename) as f:
+            context = json.load(f)
+    except ValueError:
+        context = None
+    if not _is_context(context):
+        logging.warning('Ignoring invalid stored context %s', filename)
+        return None
+    return context
+
+# Contexts retrieved over the network, mapping from URL to (time of
+# expiry, context).
+_remote_contexts = {}
+_remote_contexts_lock = threading.Lock()
+
+def _get_remote_context(url):
+    """Return context for given URL, retrieving it over the network
+    if not cached.
+    """
+    now = time.time()
+    with _remote_contexts_lock:
+        cached = _remote_contexts.get(url)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    if OFFLINE:
+        raise jsonld.JsonLdError(
+            'Context not available locally and network access disabled.',
+            'jsonld.LoadDocumentError', {'url': url},
+            code='loading document failed')
+    context = jsonld.load_document(url)['document']
+    if isinstance(context, basestring):
+        context = json.loads(context)
+    with _remote_contexts_lock:
+        _remote_contexts[url] = (now + REMOTE_CONTEXT_TTL, context)
+    if CONTEXT_DIRECTORY is not None and _is_context(context):
+        _store_context(url, context)
+    return context
+
+def _store_context(url, context):
+    """Store context in CONTEXT_DIRECTORY."""
+    filename = context_filename(url)
+    # Unique temporary file, as others may be storing the same context.
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename),
+                                   suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(context, f)
+    os.rename(tmpname, filename)
+
+def load_document(url):
+    """Return PyLD RemoteDocument for given URL.
+
+    This is a PyLD document loader (see jsonld.set_document_loader())
+    that resolves contexts registered in url_to_context and stored in
+    CONTEXT_DIRECTORY without network access. Other URLs are retrieved
+    using the default PyLD loader and cached for REMOTE_CONTEXT_TTL
+    seconds, unless OFFLINE is True. Contexts retrieved over the
+    network and stored in CONTEXT_DIRECTORY are registered when next
+    loaded, and are not retrieved again after that.
+    """
+    context = url_to_context.get(url)
+    if context is None and CONTEXT_DIRECTORY is not None:
+        filename = context_filename(url)
+        if os.path.exists(filename):
+            # Invalid stored contexts are retrieved again.
+            context = _read_stored_context(filename)
+            if context is not None:
+                register_context(url, context)
+    if context is None:
+        context = _get_remote_context(url)
+    return {
+        'contextUrl': None,
+        'documentUrl': url,
+        # PyLD may modify the document, don't return shared data.
+        'document': copy.deepcopy(context),
+    }
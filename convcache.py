@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+"""Cache of conversion results.
+
+Caches rendered responses keyed by a digest of the input data, the
+negotiated MIME type and the JSON-LD profile, so that repeated
+conversions of the same data into the same representation do not
+need to be recomputed.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+
+from collections import OrderedDict
+from functools import wraps
+
+import flask
+
+# Response header indicating whether the response was cached.
+CACHE_HEADER = 'X-Conversion-Cache'
+
+# Default maximum total size of cached data, in bytes.
+MEMORY_BACKEND_MAX_BYTES = 64 * 1024 * 1024
+FILE_BACKEND_MAX_BYTES = 1024 * 1024 * 1024
+
+# Only responses up to this size, in bytes, are cached.
+MAX_ENTRY_BYTES = 16 * 1024 * 1024
+
+# Number of bytes of non-string parts to hash at a time.
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+def digest(*parts):
+    """Return hex digest of given strings.
+
+    Parts that are not strings are hashed in slices of their bytes
+    (e.g. spool.MappedFile), so that they need not be held in memory
+    all at once.
+    """
+    sha = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, unicode):
+            part = part.encode('utf-8')
+        if part is None or isinstance(part, str):
+            part_sha = hashlib.sha1(part or '')
+        else:
+            part_sha = hashlib.sha1()
+            for start in xrange(0, len(part), DIGEST_CHUNK_SIZE):
+                part_sha.update(part[start:start+DIGEST_CHUNK_SIZE])
+        sha.update(part_sha.digest())
+    return sha.hexdigest()
+
+class MemoryBackend(object):
+    """In-process LRU store bounded by total size of values."""
+
+    def __init__(self, max_bytes=MEMORY_BACKEND_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = value    # mark most recently used
+            return value
+
+    def set(self, key, value):
+        content_type, body = value
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._data[key] = value
+            self._size += len(body)
+            while self._size > self.max_bytes and self._data:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted[1])
+
+class FileBackend(object):
+    """Store in local directory bounded by total size of files.
+
+    Least recently used files are removed when the size is exceeded.
+    """
+
+    def __init__(self, directory, max_bytes=FILE_BACKEND_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size = sum(os.path.getsize(p) for p in self._paths())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                content_type = f.readline().rstrip('\n')
+                body = f.read()
+        except IOError:
+            return None
+        try:
+            os.utime(path, None)    # mark most recently used
+        except OSError:
+            pass
+        return content_type, body
+
+    def set(self, key, value):
+        content_type, body = value
+        path = self._path(key)
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content_type + '\n')
+            f.write(body)
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.rename(tmpname, path)
+            self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        paths = sorted(self._paths(), key=os.path.getmtime)
+        for path in paths:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _paths(self):
+        return [os.path.join(self.directory, fn)
+                for fn in os.listdir(self.directory)
+                if not fn.endswith('.tmp')]
+
+class ConversionCache(object):
+    """Cache of rendered responses."""
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = MemoryBackend()
+        self.backend = backend
+
+    def cached(self, input_digest, response_key):
+        """Return decorator caching the responses of a Flask view.
+
+        Args:
+            input_digest: function taking the arguments of the view
+                and returning a digest of the input data, or None if
+                the response should not be cached.
+            response_key: function returning a string identifying the
+                representation of the response (e.g. negotiated MIME
+                type) for the current request, or None if the response
+                should not be cached.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                input_key = input_digest(*args, **kwargs)
+                output_key = response_key()
+                if input_key is None or output_key is None:
+                    return view(*args, **kwargs)
+                key = digest(input_key, output_key)
+                cached = self.backend.get(key)
+                if cached is not None:
+                    content_type, body = cached
+                    response = flask.Response(body, content_type=content_type)
+                    response.headers[CACHE_HEADER] = 'hit'
+                    return response
+                response = flask.make_response(view(*args, **kwargs))
+                response.headers[CACHE_HEADER] = 'miss'
+                if response.status_code == 200:
+                    self._store(key, response)
+                return response
+            return wrapper
+        return decorator
+
+    def _store(self, key, response):
+        """Store response body in cache once it has been generated."""
+        content_type = response.headers.get('Content-Type', '')
+        if not response.is_streamed:
+            body = response.get_data()
+            if len(body) <= MAX_ENTRY_BYTES:
+                self.backend.set(key, (content_type, body))
+            return
+        # Collect the chunks of streamed responses as they are sent.
+        original = response.response
+        def store_chunks(chunks):
+            collected, size = [], 0
+            try:
+                for chunk in chunks:
+                    if collected is not None:
+                        collected.append(chunk)
+                        size += len(chunk)
+                        if size > MAX_ENTRY_BYTES:
+                            collected = None
+                    yield chunk
+            finally:
+                if hasattr(original, 'close'):
+                    original.close()
+            if collected is not None:
+                self.backend.set(key, (content_type, ''.join(collected)))
+        response.response = store_chunks(response.iter_encoded())
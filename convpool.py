@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+"""Process pool for CPU-bound conversions.
+
+Parsing and rendering are pure Python and hold the GIL, so a server
+process can only perform one conversion at a time. ConversionPool
+runs conversions of large documents in worker processes, keeping
+small ones in-process where the cost of sending the data to a worker
+would outweigh the gain.
+
+Functions run in workers must be picklable (e.g. module-level
+functions such as the to_jsonld and from_jsonld functions of format
+modules). The path, query string and headers of the current Flask
+request are made available to them in a request context.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import sys
+import pickle
+import threading
+import traceback
+import multiprocessing
+
+import flask
+
+from pyld import jsonld
+
+import spool
+
+# Number of worker processes, or None for the number of CPUs.
+PROCESSES = None
+
+# Minimum size of string data, in characters, to convert in a worker.
+MIN_STRING_SIZE = 256 * 1024
+
+# Minimum size of JSON-LD data, in JSON objects, to convert in a worker.
+MIN_OBJECT_COUNT = 2000
+
+# Seconds to wait for a conversion in a worker.
+TIMEOUT = 60
+
+# Number of conversions after which a worker is replaced by a new one,
+# or None to keep workers for the lifetime of the pool.
+MAX_TASKS_PER_WORKER = 100
+
+class ConversionError(Exception):
+    """Conversion failed in worker with an exception that could not be
+    passed back to the calling process."""
+    pass
+
+class ConversionTimeout(ConversionError):
+    """Conversion in worker did not finish in time."""
+    pass
+
+class InvalidInputError(ValueError):
+    """Conversion failed in worker on invalid input, with an exception
+    that could not be passed back to the calling process.
+
+    The message is that of the original exception, and the traceback
+    in the worker is given by the trace attribute.
+    """
+
+    def __init__(self, message, trace=None):
+        ValueError.__init__(self, message)
+        self.trace = trace
+
+    def __reduce__(self):
+        return (InvalidInputError, (self.args[0], self.trace))
+
+# Exceptions caused by invalid input, which are passed back from
+# workers as InvalidInputError if they cannot be pickled, so that they
+# are reported as they are for conversions in the calling process.
+INPUT_ERRORS = (ValueError, jsonld.JsonLdError)
+
+# Application providing request contexts for functions run in workers.
+_app = flask.Flask(__name__)
+
+def _call(function, args, request):
+    """Call function in worker process, in request context if given."""
+    try:
+        if request is None:
+            return function(*args)
+        path, query_string, headers = request
+        with _app.test_request_context(path, query_string=query_string,
+                                       headers=headers):
+            return function(*args)
+    except Exception, e:
+        trace = traceback.format_exc()
+        try:
+            pickle.loads(pickle.dumps(e, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            if isinstance(e, INPUT_ERRORS):
+                raise InvalidInputError(str(e), trace)
+            raise ConversionError(trace)
+        raise
+
+def _current_request():
+    """Return (path, query string, headers) for Flask request, if any."""
+    if not flask.has_request_context():
+        return None
+    request = flask.request
+    headers = [(k, v) for k, v in request.headers.items()
+               if k.lower() != 'content-length']
+    return request.path, request.query_string, headers
+
+def _is_large(data, min_string_size, min_object_count):
+    """Return True if data is at least the given size."""
+    if isinstance(data, basestring):
+        return len(data) >= min_string_size
+    if isinstance(data, spool.MappedFile):
+        # Passing a spooled body to a worker would copy all of it into
+        # memory, which spooling is to avoid.
+        return False
+    # Count objects only up to the threshold.
+    count, stack = 0, [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            count += 1
+            if count >= min_object_count:
+                return True
+            stack.extend(value.itervalues())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return False
+
+class ConversionPool(object):
+    """Runs conversions of large data in a pool of worker processes.
+
+    The worker processes are started on first use.
+    """
+
+    def __init__(self, processes=None, min_string_size=None,
+                 min_object_count=None, timeout=None,
+                 max_tasks_per_worker=None):
+        self.processes = processes if processes is not None else PROCESSES
+        self.min_string_size = (min_string_size if min_string_size is not None
+                                else MIN_STRING_SIZE)
+        self.min_object_count = (min_object_count
+                                 if min_object_count is not None
+                                 else MIN_OBJECT_COUNT)
+        self.timeout = timeout if timeout is not None else TIMEOUT
+        self.max_tasks_per_worker = (max_tasks_per_worker
+                                     if max_tasks_per_worker is not None
+                                     else MAX_TASKS_PER_WORKER)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def is_large(self, data):
+        """Return True if data should be converted in a worker."""
+        return _is_large(data, self.min_string_size, self.min_object_count)
+
+    def run(self, function, data, *args):
+        """Return function(data, *args), computed in a worker if data
+        is large.
+
+        Raises:
+            ConversionTimeout: if the worker does not finish in time.
+            InvalidInputError: if the worker raises one of INPUT_ERRORS
+                that cannot be passed back to this process.
+            ConversionError: if the worker raises another exception
+                that cannot be passed back to this process.
+        """
+        if not self.is_large(data):
+            return function(data, *args)
+        pool = self._get_pool()
+        result = pool.apply_async(_call, (function, (data,) + args,
+                                          _current_request()))
+        try:
+            return result.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            self._replace_pool(pool)
+            raise ConversionTimeout('conversion timed out after %s seconds'
+                                    % self.timeout)
+
+    def start(self):
+        """Start worker processes if not already running."""
+        self._get_pool()
+
+    def close(self):
+        """Stop worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(
+                    self.processes, maxtasksperchild=self.max_tasks_per_worker)
+            return self._pool
+
+    def _replace_pool(self, pool):
+        """Replace pool with a worker stuck on a conversion."""
+        with self._lock:
+            if self._pool is not pool:
+                return    # already replaced
+            self._pool = None
+        # Conversions still running in the old pool time out within
+        # one more timeout period, after which the workers are stopped.
+        pool.close()
+        timer = threading.Timer(self.timeout, pool.terminate)
+        timer.daemon = True
+        timer.start()
+        print >> sys.stderr, 'convpool: conversion timed out, restarting'
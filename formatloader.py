@@ -5,14 +5,33 @@
 The import and export formats supported by the adapter are determined
 at runtime based on the format support "modules" found in the formats/
 directory.
+
+To avoid importing every format module (and their dependencies, such
+as rdflib) at startup, the format names, MIME types and functions of
+the modules are listed in a manifest file in the format directory.
+Modules listed in the manifest are only imported when one of their
+functions is first called. Run this script to regenerate the manifest
+after adding or changing format modules; modules that are missing from
+the manifest or whose content differs from that listed in it (by
+SHA-1 hash, as file times are not preserved by e.g. git checkouts) are
+imported at startup.
 """
 
 import sys
 import os
+import json
+import hashlib
+import importlib
 
 # Directory containing format modules.
 FORMAT_DIRECTORY = 'formats'
 
+# Name of the manifest file in the format directory.
+MANIFEST = 'manifest.json'
+
+# If True, import format modules listed in the manifest on first use.
+LAZY = True
+
 # Attributes that every module should have.
 # format_name: string giving the short name of the format.
 # mimetypes:   list of MIME types that should be associated with the format.
@@ -20,11 +39,66 @@ FORMAT_DIRECTORY = 'formats'
 # to_jsonld:   function parsing string in the format to JSON-LD.
 REQUIRED_ATTRIBUTES = [
     'format_name',
-    'mimetypes', 
+    'mimetypes',
     'from_jsonld',
     'to_jsonld',
 ]
 
+# Attributes that modules may optionally have.
+# stream_from_jsonld: generator function rendering JSON-LD to strings
+#                     in the format, allowing responses to be streamed.
+OPTIONAL_ATTRIBUTES = [
+    'stream_from_jsonld',
+]
+
+# Functions of format modules, listed in the manifest.
+FUNCTION_ATTRIBUTES = [
+    'from_jsonld',
+    'to_jsonld',
+    'stream_from_jsonld',
+]
+
+class _LazyFunction(object):
+    """Function of format module, importing the module when called."""
+
+    def __init__(self, module_name, name):
+        self.module_name = module_name
+        self.name = name
+        self._function = None
+
+    def __call__(self, *args, **kwargs):
+        if self._function is None:
+            module = importlib.import_module(self.module_name)
+            self._function = getattr(module, self.name)
+        return self._function(*args, **kwargs)
+
+    def __getstate__(self):
+        # Functions are pickled by reference; import again on unpickling.
+        return { 'module_name': self.module_name, 'name': self.name,
+                 '_function': None }
+
+class LazyFormat(object):
+    """Stand-in for format module, importing the module on first use.
+
+    Has the format_name and mimetypes of the module and its functions
+    listed in the manifest. Accessing other attributes imports the
+    module.
+    """
+
+    def __init__(self, module_name, format_name, mimetypes, functions):
+        self.__name__ = module_name
+        self.format_name = format_name
+        self.mimetypes = mimetypes
+        for name in functions:
+            setattr(self, name, _LazyFunction(module_name, name))
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__.
+        if name in FUNCTION_ATTRIBUTES or name.startswith('__'):
+            raise AttributeError("'%s' module has no attribute '%s'" % (
+                    self.__name__, name))
+        return getattr(importlib.import_module(self.__name__), name)
+
 def _is_valid(m, err=None):
     """Returns if the given module has all required attributes."""
     if err is None:
@@ -51,12 +125,73 @@ def _load_format_module(dir, mn):
         raise
     return getattr(mod, mn)
 
-def load(dir=FORMAT_DIRECTORY):
-    """Load format processing modules."""
+def _module_name(dir, fn):
+    return '%s.%s' % (dir, fn[:-3])
+
+def read_manifest(dir=FORMAT_DIRECTORY):
+    """Return manifest for format directory, or {} if there is none."""
+    try:
+        with open(os.path.join(dir, MANIFEST)) as f:
+            return json.load(f)
+    except IOError:
+        return {}
+
+def _module_hash(dir, fn):
+    """Return SHA-1 hex digest of the content of format module file."""
+    with open(os.path.join(dir, fn), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _manifest_entry(module, sha1):
+    return {
+        'format_name': module.format_name,
+        'mimetypes': list(module.mimetypes),
+        'functions': [a for a in FUNCTION_ATTRIBUTES if hasattr(module, a)],
+        'sha1': sha1,
+    }
+
+def write_manifest(dir=FORMAT_DIRECTORY):
+    """Write manifest for the format modules in given directory."""
+    manifest = {}
+    for fn in sorted(f for f in os.listdir(dir) if _is_format_module(f)):
+        module = _load_format_module(dir, fn)
+        if module is not None and _is_valid(module):
+            manifest[fn] = _manifest_entry(module, _module_hash(dir, fn))
+    with open(os.path.join(dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+        f.write('\n')
+    return manifest
+
+def _lazy_format(dir, fn, manifest):
+    """Return LazyFormat for module from manifest, or None if not listed
+    or changed since the manifest was written."""
+    entry = manifest.get(fn)
+    if entry is None:
+        return None
+    if entry.get('sha1') != _module_hash(dir, fn):
+        print >> sys.stderr, 'Format manifest out of date for %s' % fn
+        return None
+    return LazyFormat(_module_name(dir, fn), str(entry['format_name']),
+                      [str(m) for m in entry['mimetypes']],
+                      [str(f) for f in entry['functions']])
+
+def load(dir=FORMAT_DIRECTORY, lazy=None):
+    """Load format processing modules.
+
+    If lazy is True (default LAZY), modules listed in the manifest are
+    represented by LazyFormat objects and imported on first use.
+    """
+    if lazy is None:
+        lazy = LAZY
+    manifest = read_manifest(dir) if lazy else {}
     # Load everything matching the naming conventions.
     modules = []
     for fn in (f for f in os.listdir(dir) if _is_format_module(f)):
-        module = _load_format_module(dir, fn)
+        module = None
+        if manifest:
+            module = _lazy_format(dir, fn, manifest)
+        if module is None:
+            module = _load_format_module(dir, fn)
         if module is None:
             continue
         modules.append(module)
@@ -68,5 +203,14 @@ def load(dir=FORMAT_DIRECTORY):
             print >> sys.stderr, 'Duplicate format %s' % module.format_name
         else:
             valid.append(module)
-            seen.add(module)
+            seen.add(module.format_name)
     return valid
+
+def main(argv):
+    dir = argv[1] if len(argv) > 1 else FORMAT_DIRECTORY
+    manifest = write_manifest(dir)
+    print >> sys.stderr, 'Wrote %s with %d formats' % (
+        os.path.join(dir, MANIFEST), len(manifest))
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
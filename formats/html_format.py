@@ -5,8 +5,25 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
+import cgi
+import urllib
+
+import flask
+
 from pyld import jsonld
 
+# Maximum number of JSON-LD nodes to render, or None for no limit.
+# Output is truncated after this many nodes with a notice.
+MAX_NODES = 100000
+
+# Number of collection items per page if not given in options or
+# request, or None to render all items.
+PAGE_SIZE = None
+
+# Indentation of nested elements, and the depth of the body content.
+INDENT = '  '
+BODY_DEPTH = 2
+
 # Short name for this format.
 format_name = 'html'
 
@@ -38,6 +55,10 @@ def from_jsonld(data, options=None):
     This is intended to be used as a mimerender render function
     (see http://mimerender.readthedocs.org/en/latest/).
 
+    Collections (lists of nodes) can be paginated with the options or
+    request query parameters 'offset' and 'limit', and output is
+    truncated after MAX_NODES nodes.
+
     Args:
         data: dict containing JSON-LD data in expanded JSON-LD form
             (see http://www.w3.org/TR/json-ld/#expanded-document-form).
@@ -55,19 +76,44 @@ def from_jsonld(data, options=None):
     if options.get('passthrough'):
         return data
 
-    parts = (
-        [_html_header] +
-        _to_html(data) +
-        [_html_trailer]
-    )
-    html = ''.join(parts)
-    return _pretty_print_html(html)
+    return ''.join(stream_from_jsonld(data, options))
+
+def stream_from_jsonld(data, options=None):
+    """Render JSON-LD data into HTML.
+
+    Streaming version of from_jsonld(), see there for arguments.
+
+    Yields:
+        Strings representing consecutive parts of the rendered data.
+    """
+    if options is None:
+        options = {}
+
+    if options.get('passthrough'):
+        yield data
+        return
+
+    offset, limit = _page_options(options)
+    max_nodes = options.get('max_nodes', MAX_NODES)
+
+    yield _html_header
+    if isinstance(data, list) and (offset or limit is not None):
+        total = len(data)
+        # An offset past the end gives an empty last page.
+        offset = min(offset, total)
+        end = total if limit is None else min(offset + limit, total)
+        data = data[offset:end]
+        for part in _page_navigation(offset, limit, end, total):
+            yield part
+    for part in _to_html(data, BODY_DEPTH, max_nodes):
+        yield part
+    yield _html_trailer
 
 def to_jsonld(data, options=None):
     """Parse HTML data into JSON-LD.
 
     Args:
-        data: string in HTML format.
+        data: string or spool.MappedFile in HTML format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -79,118 +125,185 @@ def to_jsonld(data, options=None):
 
     # TODO: this is a hack for allowing HTML to be passed through
     # proxying unmodified. Resolve more systematically.
+    if not isinstance(data, basestring):
+        data = data.read()
     return data
 
-def _pretty_print_html(html):
-    try:
-        from BeautifulSoup import BeautifulSoup
-    except ImportError:
-        # no can do
-        return html
-    return BeautifulSoup(html).prettify()
-
-def _get_url(document):
-    """Return the URL for the given JSON-LD document."""
-    return document['@id']
-    
-def _is_url(value):
-    """Return True if given value is JSON-LD URL, False otherwise."""
+def _page_options(options):
+    """Return (offset, limit) from options or the current request."""
+    args = {}
+    if flask.has_request_context():
+        args = flask.request.args
+    offset = _nonnegative_int(options.get('offset', args.get('offset')), 0)
+    if 'limit' in options:
+        # None in options disables pagination.
+        limit = _nonnegative_int(options['limit'], None)
+    else:
+        limit = _nonnegative_int(args.get('limit'), PAGE_SIZE)
+    return offset, limit
+
+def _nonnegative_int(value, default):
     try:
-        # TODO: don't assume all IRIs are URLs.
-        if len(value) != 1:
-            return False
-        url = _get_url(value)
-        return True
-    except:
-        return False
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+def _page_url(offset, limit):
+    """Return URL of the given page of the current request."""
+    args = {}
+    if flask.has_request_context():
+        args = flask.request.args.to_dict()
+    args['offset'] = offset
+    if limit is not None:
+        args['limit'] = limit
+    return '?' + urllib.urlencode(sorted(args.items()))
+
+def _page_navigation(offset, limit, end, total):
+    """Generate navigation for page with items [offset, end) of total."""
+    indent = INDENT * BODY_DEPTH
+    yield '%s<nav class="pagination" data-total="%d">\n' % (indent, total)
+    if end > offset:
+        yield '%s%sItems %d-%d of %d\n' % (indent, INDENT, offset + 1, end,
+                                           total)
+    else:
+        yield '%s%sNo items (%d in total)\n' % (indent, INDENT, total)
+    if offset > 0:
+        previous = max(offset - (limit or offset), 0)
+        yield '%s%s<a rel="prev" href="%s">previous</a>\n' % (
+            indent, INDENT, _escape(_page_url(previous, limit)))
+    if end < total:
+        yield '%s%s<a rel="next" href="%s">next</a>\n' % (
+            indent, INDENT, _escape(_page_url(end, limit)))
+    yield '%s</nav>\n' % indent
+
+def _escape(value):
+    """Return value as HTML-escaped UTF-8 string."""
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    elif not isinstance(value, str):
+        value = str(value)
+    return cgi.escape(value, True)
 
 def _is_plain_value(dict_):
     """Return True if dict is plain JSON-LD value, False otherwise."""
     return len(dict_) == 1 and '@value' in dict_
 
-def _plain_value_to_html(dict_, html=None):
-    """Convert plain JSON-LD value to HTML."""
-    if html is None:
-        html = []
-    html.append(dict_['@value'])
-    return html
-
 def _is_datetime(dict_):
     """Return True if dict is a JSON-LD datetime, False otherwise."""
     return (len(dict_) == 2 and '@value' in dict_ and '@type' in dict_ and
             dict_['@type'] == 'http://www.w3.org/2001/XMLSchema#dateTimeStamp')
 
-def _datetime_to_html(dict_, html=None):
-    """Convert JSON-LD datetime to HTML."""
-    if html is None:
-        html = []
-    datetime = dict_['@value']
-    html.append('<time datetime="%s">%s</time>' % (datetime, datetime))
-    return html
-
-def _list_to_html(list_, html=None):
-    """Convert JSON-LD list to HTML."""
-    if html is None:
-        html = []
-    if len(list_) == 1:
-        _to_html(list_[0], html)
-    else:
-        html.append('<ul>\n')
-        for item in list_:
-            html.append('<li>')
-            _to_html(item, html)
-            html.append('</li>\n')        
-        html.append('</ul>\n')
-    return html
-
-def _key_value_to_html(key, value, html=None):
-    """Convert (key, value) pair in JSON-LD dict to HTML."""
-    if html is None:
-        html = []
-    if key == '@id':
-        # IDs map to links
-        html.append('<a href="%s">%s</a>' % (value, value))
-    else:
-        html.append('<dt>')
-        _to_html(key, html)
-        html.append('</dt>')
-        html.append('<dd>')
-        _to_html(value, html)
-        html.append('</dd>\n')
-    return html
-
-def _dict_to_html(dict_, html=None):
-    """Convert JSON-LD dict to HTML."""
-    if html is None:
-        html = []
-    if _is_plain_value(dict_):
-        _plain_value_to_html(dict_, html)
-    elif _is_datetime(dict_):
-        _datetime_to_html(dict_, html)
+def _inline_html(value):
+    """Return HTML for value that is rendered on a single line, or None.
+
+    Plain values, datetimes, primitive values and single-item lists
+    of these are rendered inline.
+    """
+    while type(value) is list and len(value) == 1:
+        value = value[0]
+    if type(value) is dict:
+        if _is_plain_value(value):
+            return _escape(value['@value'])
+        elif _is_datetime(value):
+            datetime = _escape(value['@value'])
+            return '<time datetime="%s">%s</time>' % (datetime, datetime)
+        else:
+            return None
+    elif type(value) is list:
+        return None
     else:
-        # Generic processing
-        html.append('<dl>\n')
-        for key, value in sorted(dict_.items()):
-            _key_value_to_html(key, value, html)
-        html.append('</dl>\n')        
-    return html
+        return _escape(value)
+
+# Kinds of items on the _to_html() stack: (_LINE, depth, html) for a
+# line, (_CLOSE, depth, html) for the end tag of an element that has
+# been started, and (_VALUE, depth, value, start, end) for a value
+# rendered between the given start and end tags (or None).
+_LINE, _CLOSE, _VALUE = range(3)
+
+def _dict_items(dict_, depth):
+    """Return _to_html() stack items for the content of generic dict."""
+    items = []
+    for key, value in sorted(dict_.items()):
+        if key == '@id':
+            # IDs map to links
+            url = _escape(value)
+            items.append((_LINE, depth, '<a href="%s">%s</a>' % (url, url)))
+            continue
+        items.append((_LINE, depth, '<dt>%s</dt>' % _escape(key)))
+        html = _inline_html(value)
+        if html is not None:
+            items.append((_LINE, depth, '<dd>%s</dd>' % html))
+        else:
+            items.append((_VALUE, depth, value, '<dd>', '</dd>'))
+    return items
 
-def _to_html(value, html=None):
-    """Convert JSON-LD value to HTML.
+def _list_items(list_, depth):
+    """Return _to_html() stack items for the content of list."""
+    items = []
+    for item in list_:
+        html = _inline_html(item)
+        if html is not None:
+            items.append((_LINE, depth, '<li>%s</li>' % html))
+        else:
+            items.append((_VALUE, depth, item, '<li>', '</li>'))
+    return items
+
+def _to_html(value, depth=0, max_nodes=None):
+    """Generate indented HTML for JSON-LD value.
+
+    Renders dicts as definition lists and lists as unordered lists,
+    without recursion so that deeply nested data can be rendered. If
+    more than max_nodes nodes (lines and nested values) would be
+    rendered, the output is truncated with a notice and open elements
+    are closed.
 
     Args:
-        value: JSON-LD dict, list, or primive value.
-        html: list to append HTML to, or None to create a new list.
+        value: JSON-LD dict, list, or primitive value.
+        depth: indentation depth of the output.
+        max_nodes: maximum number of nodes to render, or None for
+            no limit.
 
-    Returns:
-        list with converted HTML.
+    Yields:
+        Lines of HTML.
     """
-    if html is None:
-        html = []
-    if isinstance(value, list):
-        _list_to_html(value, html)
-    elif isinstance(value, dict):
-        _dict_to_html(value, html)
-    else:
-        html.append(str(value))
-    return html
+    stack = [(_VALUE, depth, value, None, None)]
+    nodes, truncated = 0, False
+    while stack:
+        item = stack.pop()
+        kind, d = item[0], item[1]
+        if kind == _CLOSE:
+            yield '%s%s\n' % (INDENT * d, item[2])
+            continue
+        if truncated:
+            continue
+        if max_nodes is not None and nodes >= max_nodes:
+            truncated = True
+            yield '%s<p class="truncated">Output truncated after %d nodes.' \
+                '</p>\n' % (INDENT * d, nodes)
+            continue
+        nodes += 1
+        if kind == _LINE:
+            yield '%s%s\n' % (INDENT * d, item[2])
+            continue
+        value, start, end = item[2], item[3], item[4]
+        if start is not None:
+            yield '%s%s\n' % (INDENT * d, start)
+            stack.append((_CLOSE, d, end))
+            d += 1
+        html = _inline_html(value)
+        if html is not None:
+            yield '%s%s\n' % (INDENT * d, html)
+            continue
+        while type(value) is list and len(value) == 1:
+            value = value[0]
+        if type(value) is list:
+            yield '%s<ul>\n' % (INDENT * d)
+            stack.append((_CLOSE, d, '</ul>'))
+            items = _list_items(value, d + 1)
+        else:
+            yield '%s<dl>\n' % (INDENT * d)
+            stack.append((_CLOSE, d, '</dl>'))
+            items = _dict_items(value, d + 1)
+        items.reverse()
+        stack.extend(items)
@@ -5,10 +5,11 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
-import json
+import jsoncodec
 
-# Default values for rendering options
-PRETTYPRINT_DEFAULT = True
+# Default values for rendering options. For prettyprint, None uses the
+# default of jsoncodec.prettyprint() (compact output for machines).
+PRETTYPRINT_DEFAULT = None
 KEEPCONTEXT_DEFAULT = False
 
 # Short name for this format.
@@ -24,7 +25,7 @@ def from_jsonld(data, options=None):
     (see http://mimerender.readthedocs.org/en/latest/).
 
     If options['prettyprint'] is True, renders the data so that it is
-    more easily readable by humans.
+    more easily readable by humans (see jsoncodec.prettyprint()).
     If options['keepcontext'] is True, includes the JSON-LD @context
     in the JSON data if present.
 
@@ -44,17 +45,14 @@ def from_jsonld(data, options=None):
     if not keepcontext and '@context' in data:
         del data['@context']
 
-    prettyprint = options.get('prettyprint', PRETTYPRINT_DEFAULT)
-    if prettyprint:
-        return json.dumps(data, indent=2, separators=(',', ': '))+'\n'
-    else:
-        return json.dumps(data)
+    prettyprint = jsoncodec.prettyprint(options, PRETTYPRINT_DEFAULT)
+    return jsoncodec.dumps(data, prettyprint)
 
 def to_jsonld(data, options=None):
     """Parse JSON data into JSON-LD.
 
     Args:
-        data: string in JSON format.
+        data: string or spool.MappedFile in JSON format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -64,12 +62,7 @@ def to_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    encoding = options.get('encoding')
-
-    if encoding is None:
-        jsonld = json.loads(data)
-    else:
-        jsonld = json.loads(data, encoding=encoding)
+    jsonld = jsoncodec.loads(data, options.get('encoding'))
 
     # TODO: add context and expand
     return jsonld
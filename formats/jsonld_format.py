@@ -5,14 +5,15 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
-import json
-
 import flask
 
 import oajson
+import mediatype
+import jsoncodec
 
-# Default values for rendering options
-PRETTYPRINT_DEFAULT = True
+# Default values for rendering options. For prettyprint, None uses the
+# default of jsoncodec.prettyprint() (compact output for machines).
+PRETTYPRINT_DEFAULT = None
 
 # Short name for this format.
 format_name = 'jsonld'
@@ -32,17 +33,22 @@ JSON_LD_PROFILES = [
 ]
 DEFAULT_PROFILE = JSON_LD_COMPACTED
 
+# Maps JSON-LD media types with profile to the profile. The default
+# comes first, as it is chosen when the Accept header gives no profile.
+_profile_table = mediatype.DispatchTable(
+    ('%s; profile="%s"' % (mimetypes[0], p), p) for p in
+    [DEFAULT_PROFILE] + [p for p in JSON_LD_PROFILES if p != DEFAULT_PROFILE])
+
 def _select_response_form(request=None):
     """Return the JSON-LD profile applying to the response."""
     if request is None:
         request = flask.request
-    header = request.headers.get('Accept', '')
-    for profile in JSON_LD_PROFILES:
-        # TODO: parse the header instead of just looking for a substring
-        if profile in header:
-            return profile
+    header = request.headers.get('Accept')
+    if not header:
+        return DEFAULT_PROFILE
+    selected = _profile_table.negotiate(header)
     # TODO: check for Link headers with profile.
-    return DEFAULT_PROFILE
+    return selected[1] if selected is not None else DEFAULT_PROFILE
 
 def from_jsonld(data, options=None):
     """Render JSON-LD data into string.
@@ -51,7 +57,7 @@ def from_jsonld(data, options=None):
     (see http://mimerender.readthedocs.org/en/latest/).
 
     If options['prettyprint'] is True, renders the data so that it is
-    more easily readable by humans.
+    more easily readable by humans (see jsoncodec.prettyprint()).
 
     Args:
         data: dict containing JSON-LD data in expanded JSON-LD form
@@ -61,6 +67,16 @@ def from_jsonld(data, options=None):
     Returns:
         String representing the rendered data.
     """
+    return ''.join(stream_from_jsonld(data, options))
+
+def stream_from_jsonld(data, options=None):
+    """Render JSON-LD data into strings.
+
+    Streaming version of from_jsonld(), see there for arguments.
+
+    Yields:
+        Strings representing consecutive parts of the rendered data.
+    """
     if options is None:
         options = {}
 
@@ -75,17 +91,15 @@ def from_jsonld(data, options=None):
         assert document_form == JSON_LD_EXPANDED, 'internal error'
         pass # no-op: internal representation is alredy expanded.
 
-    prettyprint = options.get('prettyprint', PRETTYPRINT_DEFAULT)
-    if prettyprint:
-        return json.dumps(data, indent=2, separators=(',', ': '))+'\n'
-    else:
-        return json.dumps(data)
+    prettyprint = jsoncodec.prettyprint(options, PRETTYPRINT_DEFAULT)
+    for chunk in jsoncodec.iterencode(data, prettyprint):
+        yield chunk
 
 def to_jsonld(data, options=None):
     """Parse JSON-LD data.
 
     Args:
-        data: string in JSON-LD format.
+        data: string or spool.MappedFile in JSON-LD format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -95,12 +109,7 @@ def to_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    encoding = options.get('encoding')
-
-    if encoding is None:
-        jsonld = json.loads(data)
-    else:
-        jsonld = json.loads(data, encoding=encoding)
+    jsonld = jsoncodec.loads(data, options.get('encoding'))
 
     # TODO: expand
     return jsonld
@@ -43,7 +43,7 @@ def to_jsonld(data, options=None):
     """Parse N3 data into JSON-LD.
 
     Args:
-        data: string in N3 format.
+        data: string or spool.MappedFile in N3 format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -5,7 +5,7 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
-from pyld import jsonld
+import nquadstools
 
 # Short name for this format.
 format_name = 'nquads'
@@ -30,13 +30,27 @@ def from_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    return jsonld.to_rdf(data, { 'format': 'application/nquads' })
+    return nquadstools.from_jsonld(data)
+
+def stream_from_jsonld(data, options=None):
+    """Render JSON-LD data into N-Quads.
+
+    Streaming version of from_jsonld(), see there for arguments.
+
+    Returns:
+        Iterator over strings representing consecutive parts of the
+        rendered data.
+    """
+    if options is None:
+        options = {}
+
+    return nquadstools.serialize(data)
 
 def to_jsonld(data, options=None):
     """Parse N-Quads data into JSON-LD.
 
     Args:
-        data: string in N-Quads format.
+        data: string or spool.MappedFile in N-Quads format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -46,4 +60,4 @@ def to_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    return jsonld.from_rdf(data, { 'format': 'application/nquads' })
+    return nquadstools.to_jsonld(data)
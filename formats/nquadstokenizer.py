@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+"""Single-pass N-Quads and N-Triples tokenizer.
+
+Matches the statements of the input (a string or buffer such as an
+mmap) in blocks of many lines with a single regular expression, instead
+of splitting the input into lines and matching each separately, and
+decodes and unescapes only the term values. As terms are matched one
+after the other, literals may contain text that looks like terms
+(e.g. "see _:b1 <x> .").
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import re
+
+from pyld import jsonld
+
+# Term types, as in the pyld RDF dataset format.
+IRI = 'IRI'
+BLANK_NODE = 'blank node'
+LITERAL = 'literal'
+
+# Graph name of triples without a graph label.
+DEFAULT_GRAPH = '@default'
+
+# Approximate number of bytes of input to tokenize at a time.
+BLOCK_SIZE = 1 << 20
+
+# Maximum number of decoded IRIs and blank nodes to cache. Predicates,
+# graph names and datatypes, and often subjects and objects, repeat.
+TERM_CACHE_SIZE = 10000
+
+# Regular expression for statements. N-Triples statements are N-Quads
+# statements without a graph label. Whitespace and comments between
+# statements match without groups, and anything else matches the last
+# group, so that all of the input is matched.
+_iri = r'<([^>\r\n]+)>'
+# Blank node labels may contain but not end with '.'.
+_bnode = r'(_:[^\s.]+(?:\.+[^\s.]+)*)'
+_literal = r'"([^"\\\r\n]*(?:\\.[^"\\\r\n]*)*)"(?:\^\^<([^>\r\n]+)>|@([a-zA-Z]+(?:-[a-zA-Z0-9]+)*))?'
+_statement_re = re.compile(
+    r'(?:' + _iri + '|' + _bnode + r')[ \t]+' +
+    _iri + r'[ \t]*' +
+    r'(?:' + _iri + '|' + _bnode + '|' + _literal + r')[ \t]*' +
+    r'(?:(?:' + _iri + '|' + _bnode + r')[ \t]*)?' +
+    r'\.[ \t]*(?:#[^\r\n]*)?(?:\r\n|\r|\n|\Z)' +
+    r'|[ \t\r\n]+|#[^\r\n]*' +
+    r'|([^\r\n]+)')
+_ERROR_GROUP = 11
+
+_escape_re = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+
+_escapes = {
+    't': u'\t', 'b': u'\b', 'n': u'\n', 'r': u'\r', 'f': u'\f',
+    '"': u'"', "'": u"'", '\\': u'\\',
+}
+
+# Characters of ASCII strings.
+_ascii = ''.join(chr(i) for i in range(128))
+
+def _unescape_match(m):
+    if m.group(3) is not None:
+        return _escapes.get(m.group(3), m.group(0))
+    return unichr(int(m.group(1) or m.group(2), 16))
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+    return _escape_re.sub(_unescape_match, value)
+
+def _decode(value):
+    return _unescape(value.decode('utf-8'))
+
+class _Terms(dict):
+    """Cache of decoded values of IRIs and blank nodes."""
+
+    def __init__(self, decode):
+        self.decode = decode
+
+    def __missing__(self, value):
+        if len(self) >= TERM_CACHE_SIZE:
+            self.clear()
+        decoded = self[value] = self.decode(value)
+        return decoded
+
+def _decoders(block):
+    """Return functions decoding literals and other values of block.
+
+    Returns:
+        (function, _Terms) pair, either of which is None if the values
+        can be used as they are.
+    """
+    if isinstance(block, unicode) or not block.translate(None, _ascii):
+        literals = _unescape if '\\' in block else None
+        # Values other than literals can only have \u and \U escapes.
+        if '\\u' in block or '\\U' in block:
+            terms = _Terms(_unescape)
+        else:
+            terms = None
+        return literals, terms
+    else:
+        return _decode, _Terms(_decode)
+
+def _decode_terms(statement, terms):
+    """Return statement with values other than literals decoded."""
+    (s_type, subject, predicate, o_type, object_, datatype, language,
+     graph_name) = statement
+    if o_type != LITERAL:
+        object_ = terms[object_]
+    if datatype is not None:
+        datatype = terms[datatype]
+    return (s_type, terms[subject], terms[predicate], o_type, object_,
+            datatype, language, terms[graph_name])
+
+def _blocks(data, size):
+    """Generate strings of blocks of whole lines in data."""
+    start, end = 0, len(data)
+    while start < end:
+        stop = min(start + size, end)
+        while True:
+            block = data[start:stop]
+            if isinstance(block, memoryview):
+                block = block.tobytes()
+            elif isinstance(block, bytearray):
+                block = str(block)
+            if stop == end:
+                break
+            cut = block.rfind('\n') + 1
+            if cut:
+                block = block[:cut]
+                break
+            stop = min(stop + size, end)    # line longer than block
+        yield block
+        start += len(block)
+
+def _error_line(block, first_line):
+    """Return number of the line with the first error in block."""
+    for m in _statement_re.finditer(block):
+        if m.group(_ERROR_GROUP):
+            return first_line + block.count('\n', 0, m.start())
+    return first_line
+
+def tokenize(data, first_line=1):
+    """Tokenize N-Quads or N-Triples, generating statements one at a time.
+
+    Args:
+        data: string or object supporting len() and slicing into
+            strings or buffers (e.g. mmap, bytearray, memoryview or
+            spool.MappedFile) in N-Quads or N-Triples format, UTF-8
+            encoded unless unicode.
+        first_line: line number of the start of data, for errors.
+
+    Yields:
+        (subject type, subject, predicate, object type, object,
+        datatype, language, graph name) tuples, where types are IRI,
+        BLANK_NODE or LITERAL, values are given with escapes resolved,
+        blank nodes with the '_:' prefix, datatype and language are
+        None for non-literals and language for literals without a
+        language tag, and graph name is DEFAULT_GRAPH for triples.
+
+    Raises:
+        jsonld.JsonLdError: on invalid input.
+    """
+    findall = _statement_re.findall
+    line = first_line
+    for block in _blocks(data, BLOCK_SIZE):
+        decode, terms = _decoders(block)
+        # Groups that did not match are empty strings; terms and
+        # datatypes cannot be empty, but literals can.
+        for (s_iri, s_bnode, p_iri, o_iri, o_bnode, o_value, o_datatype,
+             o_language, g_iri, g_bnode, error) in findall(block):
+            if not p_iri:
+                if error:
+                    raise jsonld.JsonLdError(
+                        'Error while parsing N-Quads invalid quad.',
+                        'jsonld.ParseError',
+                        {'line': _error_line(block, line)})
+                continue    # whitespace or comment
+
+            if s_iri:
+                s_type, subject = IRI, s_iri
+            else:
+                s_type, subject = BLANK_NODE, s_bnode
+            if o_iri:
+                o_type, object_, datatype, o_language = \
+                    IRI, o_iri, None, None
+            elif o_bnode:
+                o_type, object_, datatype, o_language = \
+                    BLANK_NODE, o_bnode, None, None
+            else:
+                o_type, object_ = LITERAL, o_value
+                if decode is not None:
+                    object_ = decode(object_)
+                if o_datatype:
+                    datatype, o_language = o_datatype, None
+                elif o_language:
+                    datatype = jsonld.RDF_LANGSTRING
+                else:
+                    datatype, o_language = jsonld.XSD_STRING, None
+            if g_iri:
+                graph_name = g_iri
+            elif g_bnode:
+                graph_name = g_bnode
+            else:
+                graph_name = DEFAULT_GRAPH
+
+            statement = (s_type, subject, p_iri, o_type, object_, datatype,
+                         o_language, graph_name)
+            if terms is not None:
+                statement = _decode_terms(statement, terms)
+            yield statement
+        line += block.count('\n')
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+"""Streaming N-Quads and N-Triples processing support.
+
+The parser tokenizes its input in blocks of many lines (see
+nquadstokenizer.py), reading files a block at a time, and the
+serializer converts JSON-LD to N-Quads one top-level node at a time,
+so neither needs to hold the complete input or output as a single
+string.
+"""
+
+import gc
+import mmap
+import itertools
+
+from pyld import jsonld
+
+import spool
+import nquadstokenizer
+
+from nquadstokenizer import LITERAL
+
+# Number of top-level nodes to serialize at a time.
+CHUNK_SIZE = 100
+
+# Types of data given to the tokenizer as they are. Spooled request
+# bodies are sliced rather than read, so that they can be parsed again.
+_BUFFER_TYPES = (basestring, buffer, bytearray, memoryview, mmap.mmap,
+                 spool.MappedFile)
+
+def _file_blocks(file_):
+    """Generate (first line number, text) for blocks of lines in file."""
+    line_number = 1
+    while True:
+        block = file_.read(nquadstokenizer.BLOCK_SIZE)
+        if not block:
+            break
+        block += file_.readline()
+        yield line_number, block
+        line_number += block.count('\n')
+
+def _statements(data):
+    """Return iterator over statements of given data.
+
+    Args:
+        data: string, buffer (including spool.MappedFile), file or
+            iterable of lines.
+    """
+    if isinstance(data, _BUFFER_TYPES):
+        return nquadstokenizer.tokenize(data)
+    elif hasattr(data, 'read'):
+        return itertools.chain.from_iterable(
+            nquadstokenizer.tokenize(block, line_number)
+            for line_number, block in _file_blocks(data))
+    else:
+        return itertools.chain.from_iterable(
+            nquadstokenizer.tokenize(line, line_number)
+            for line_number, line in enumerate(data, 1))
+
+def _triple(statement):
+    """Return (triple, graph name) for nquadstokenizer statement."""
+    (s_type, subject, predicate, o_type, object_, datatype, language,
+     graph_name) = statement
+    o = {'type': o_type, 'value': object_}
+    if o_type == LITERAL:
+        o['datatype'] = datatype
+        if language is not None:
+            o['language'] = language
+    triple = {'subject': {'type': s_type, 'value': subject},
+              'predicate': {'type': 'IRI', 'value': predicate},
+              'object': o}
+    return triple, graph_name
+
+def parse(data):
+    """Parse N-Quads or N-Triples, generating triples one at a time.
+
+    Args:
+        data: string, buffer or iterable of lines (e.g. file) in
+            N-Quads or N-Triples format.
+
+    Yields:
+        (triple, graph name) pairs, where triple is in the pyld RDF
+        dataset format and graph name is '@default' for the default
+        graph.
+
+    Raises:
+        jsonld.JsonLdError: on invalid input.
+    """
+    for statement in _statements(data):
+        yield _triple(statement)
+
+def to_dataset(data):
+    """Return pyld RDF dataset for N-Quads or N-Triples data.
+
+    Duplicate triples within a graph are included only once.
+
+    Args:
+        data: string, buffer or iterable of lines (e.g. file) in
+            N-Quads or N-Triples format.
+    """
+    dataset, seen = {}, set()
+    # The triples do not form reference cycles, so pause the garbage
+    # collector, which would otherwise repeatedly scan them while they
+    # are being created.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for statement in _statements(data):
+            if statement in seen:
+                continue
+            seen.add(statement)
+            triple, graph_name = _triple(statement)
+            dataset.setdefault(graph_name, []).append(triple)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return dataset
+
+def to_jsonld(data):
+    """Return JSON-LD data from N-Quads or N-Triples data.
+
+    Args:
+        data: string, buffer or iterable of lines (e.g. file) in
+            N-Quads or N-Triples format.
+
+    Returns:
+        data: dict containing JSON-LD data in expanded JSON-LD form
+            (see http://www.w3.org/TR/json-ld/#expanded-document-form).
+    """
+    return jsonld.from_rdf(to_dataset(data))
+
+def serialize(data, graphs=True, chunk_size=None):
+    """Serialize JSON-LD data as N-Quads, generating text in chunks.
+
+    Args:
+        data: dict or list containing JSON-LD data in expanded JSON-LD
+            form (see http://www.w3.org/TR/json-ld/#expanded-document-form).
+        graphs: if False, omit graph names, giving N-Triples. Triples
+            in several graphs are then output once, which requires
+            remembering the lines output so far.
+        chunk_size: number of top-level nodes to convert at a time, or
+            None for default.
+
+    Yields:
+        strings in N-Quads (or N-Triples) format.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    if not isinstance(data, list):
+        data = [data]
+    if _has_blank_node_ids(data):
+        # Blank node identifiers are only consistent within a single
+        # pyld conversion; convert everything at once.
+        chunks = [(data, None)]
+    else:
+        chunks = ((data[i:i+chunk_size], 'c%d' % i)
+                  for i in range(0, len(data), chunk_size))
+    seen = set() if not graphs else None
+    for chunk, prefix in chunks:
+        dataset = jsonld.to_rdf(chunk)
+        lines = []
+        for graph_name, triples in sorted(dataset.items()):
+            if graph_name == '@default' or not graphs:
+                graph_name = None
+            elif prefix is not None and graph_name.startswith('_:'):
+                graph_name = '_:' + prefix + graph_name[2:]
+            for triple in triples:
+                if prefix is not None:
+                    _prefix_blank_nodes(triple, prefix)
+                line = jsonld.JsonLdProcessor.to_nquad(triple, graph_name)
+                if seen is not None:
+                    if line in seen:
+                        continue
+                    seen.add(line)
+                lines.append(line)
+        if lines:
+            yield ''.join(lines)
+
+def from_jsonld(data, graphs=True):
+    """Return N-Quads (or N-Triples) string for JSON-LD data.
+
+    See serialize().
+    """
+    return ''.join(serialize(data, graphs))
+
+def _prefix_blank_nodes(triple, prefix):
+    """Add prefix to blank node labels generated by pyld in triple."""
+    for node in (triple['subject'], triple['object']):
+        if node['type'] == 'blank node':
+            node['value'] = '_:' + prefix + node['value'][2:]
+
+def _has_blank_node_ids(data):
+    """Return True if given JSON-LD data has blank node identifiers."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            id_ = value.get('@id')
+            if isinstance(id_, basestring) and id_.startswith('_:'):
+                return True
+            stack.extend(value.itervalues())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return False
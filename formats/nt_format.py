@@ -5,7 +5,7 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
-import rdftools
+import nquadstools
 
 # Short name for this format.
 format_name = 'nt'
@@ -30,16 +30,30 @@ def from_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    # TODO: rdflib N-Triples serialization silently discards the
-    # fourth value in any quad. Check for quads and at least warn if
-    # any found.
-    return rdftools.from_jsonld(data, format='nt')
+    # TODO: N-Triples serialization silently discards the fourth
+    # value in any quad. Check for quads and at least warn if any
+    # found.
+    return nquadstools.from_jsonld(data, graphs=False)
+
+def stream_from_jsonld(data, options=None):
+    """Render JSON-LD data into N-Triples.
+
+    Streaming version of from_jsonld(), see there for arguments.
+
+    Returns:
+        Iterator over strings representing consecutive parts of the
+        rendered data.
+    """
+    if options is None:
+        options = {}
+
+    return nquadstools.serialize(data, graphs=False)
 
 def to_jsonld(data, options=None):
     """Parse N-Triples data into JSON-LD.
 
     Args:
-        data: string in N-Triples format.
+        data: string or spool.MappedFile in N-Triples format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -49,4 +63,5 @@ def to_jsonld(data, options=None):
     if options is None:
         options = {}
 
-    return rdftools.to_jsonld(data, 'nt')
+    # N-Triples is a subset of N-Quads.
+    return nquadstools.to_jsonld(data)
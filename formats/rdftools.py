@@ -6,9 +6,16 @@ __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
 import rdflib
+import rdflib.parser
 
 from pyld import jsonld
 
+import nquadstools
+
+# Datatype IRIs given special treatment in conversion.
+XSD_STRING = 'http://www.w3.org/2001/XMLSchema#string'
+RDF_LANGSTRING = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#langString'
+
 def from_jsonld(data, format):
     """Return string in given RDF format from JSON-LD data.
 
@@ -19,21 +26,66 @@ def from_jsonld(data, format):
             'nt' or 'application/n-triples' for N-Triples.
 
     Returns:
-        instance of rdflib.Graph.
+        string in the given format.
     """
-    # As of this writing, 'application/nquads' is the only RDF format
-    # (other than JSON-LD) supported by pyld. Convert via that.
-    quads = jsonld.to_rdf(data, { 'format': 'application/nquads' })
-    # Using ConjunctiveGraph instead of Graph for nquads support.
+    return to_graph(data).serialize(format=format)
+
+def to_graph(data):
+    """Return RDF graph from JSON-LD data.
+
+    Args:
+        data: dict containing JSON-LD data in expanded JSON-LD form
+            (see http://www.w3.org/TR/json-ld/#expanded-document-form).
+
+    Returns:
+        instance of rdflib.ConjunctiveGraph.
+    """
+    # Build the graph directly from the pyld RDF dataset instead of
+    # serializing it as N-Quads for rdflib to parse.
+    dataset = jsonld.to_rdf(data)
+    # Using ConjunctiveGraph instead of Graph for quad support.
     graph = rdflib.ConjunctiveGraph()
-    graph.parse(data=quads, format='nquads')
-    return graph.serialize(format=format)
+    for graph_name, triples in dataset.iteritems():
+        if graph_name == '@default':
+            context = graph.default_context
+        else:
+            context = graph.get_context(_graph_name_to_term(graph_name))
+        graph.addN((_to_term(t['subject']),
+                    _to_term(t['predicate']),
+                    _to_term(t['object']),
+                    context) for t in triples)
+    return graph
+
+def _graph_name_to_term(name):
+    """Return rdflib term for pyld RDF dataset graph name."""
+    if _is_blank(name):
+        return rdflib.BNode(name[2:])
+    else:
+        return rdflib.URIRef(name)
+
+def _to_term(node):
+    """Return rdflib term for pyld RDF dataset node."""
+    type_, value = node['type'], node['value']
+    if type_ == 'IRI':
+        return rdflib.URIRef(value)
+    elif type_ == 'blank node':
+        return rdflib.BNode(value[2:])
+    language = node.get('language')
+    if language is not None:
+        return rdflib.Literal(value, lang=language)
+    datatype = node.get('datatype')
+    if datatype is None or datatype == XSD_STRING:
+        # Match rdflib parsing of the N-Quads pyld would generate.
+        return rdflib.Literal(value)
+    else:
+        return rdflib.Literal(value, datatype=rdflib.URIRef(datatype))
 
 def from_string(data, format):
     """Return RDF graph from string in RDF format.
 
     Args:
-        data: string in given RDF format.
+        data: string in given RDF format, or file-like object (e.g.
+            spool.MappedFile) to read it from.
         format: short name or MIME type of an RDF format. For example
             'nt' or 'application/n-triples' for N-Triples.
     Returns:
@@ -41,39 +93,89 @@ def from_string(data, format):
     """
     # Using ConjunctiveGraph instead of Graph for nquads support.
     graph = rdflib.ConjunctiveGraph()
-    graph.parse(data=data, format=format)
+    _parse(graph, data, format)
     return graph
 
+def _parse(graph, data, format):
+    """Parse string in RDF format into graph.
+
+    Returns:
+        rdflib.Graph for the context holding the triples parsed into
+        the default graph.
+    """
+    if isinstance(data, basestring):
+        return graph.parse(data=data, format=format)
+    else:
+        # Let the parser read the data, which the XML parser does
+        # incrementally.
+        source = rdflib.parser.InputSource()
+        source.setByteStream(data)
+        return graph.parse(source=source, format=format)
+
 def _is_blank(i):
     """Return True if given a blank node identifier, False otherwise."""
     return i.startswith('_:')
 
-def _remove_blank_graph_labels(data):
-    """Remove blank node graph labels from N-Quads data.
+def to_dataset(graph, default=None):
+    """Return pyld RDF dataset from RDF graph.
 
-    >>> _remove_blank_graph_label('<ex:1> <ex:2> <ex:3> _:b0 .')
-    '<ex:1> <ex:2> <ex:3> .'
+    Graphs identified by blank nodes other than the default graph are
+    named graphs with blank node names in the dataset.
 
     Args:
-        data: string in N-Quads format.
+        graph: instance of rdflib.ConjunctiveGraph.
+        default: identifiers of the contexts whose triples are placed
+            in the default graph of the dataset, or None for the
+            default context of the graph. rdflib parses the default
+            graph of a document into a context of its own, identified
+            by a blank node.
 
     Returns:
-        data: string in N-Quads format.
+        dict in the pyld RDF dataset format, as returned by
+        jsonld.to_rdf() and accepted by jsonld.from_rdf().
     """
-    # TODO: parse properly
-    processed = []
-    for line in data.split('\n'):
-        fields = line.split()
-        if len(fields) >= 4 and _is_blank(fields[3]):
-            fields = fields[:3] + fields[4:]
-        processed.append(' '.join(fields))
-    return '\n'.join(processed)
+    if default is None:
+        default = [graph.default_context.identifier]
+    dataset = {}
+    for context in graph.contexts():
+        identifier = context.identifier
+        if identifier in default:
+            name = '@default'
+        elif isinstance(identifier, rdflib.BNode):
+            name = '_:' + identifier
+        else:
+            name = unicode(identifier)
+        triples = dataset.setdefault(name, [])
+        for s, p, o in context:
+            triples.append({
+                'subject': _from_term(s),
+                'predicate': _from_term(p),
+                'object': _from_term(o),
+            })
+    return dataset
+
+def _from_term(term):
+    """Return pyld RDF dataset node for rdflib term."""
+    if isinstance(term, rdflib.URIRef):
+        return {'type': 'IRI', 'value': unicode(term)}
+    elif isinstance(term, rdflib.BNode):
+        return {'type': 'blank node', 'value': '_:' + term}
+    node = {'type': 'literal', 'value': unicode(term)}
+    if term.language is not None:
+        node['datatype'] = RDF_LANGSTRING
+        node['language'] = term.language
+    elif term.datatype is not None:
+        node['datatype'] = unicode(term.datatype)
+    else:
+        node['datatype'] = XSD_STRING
+    return node
 
 def to_jsonld(data, format):
     """Return JSON-LD data from string in RDF format.
 
     Args:
-        data: string in given RDF format.
+        data: string in given RDF format, or file-like object to read
+            it from.
         format: short name or MIME type of an RDF format. For example
             'nt' or 'application/n-triples' for N-Triples.
 
@@ -81,16 +183,18 @@ def to_jsonld(data, format):
         data: dict containing JSON-LD data in expanded JSON-LD form
             (see http://www.w3.org/TR/json-ld/#expanded-document-form).
     """
-    # pyld only supports parsing of nquads. Other formats are first
-    # converted into nquads via rdflib.Graph.
-    if format != 'nquads':
-        graph = from_string(data, format)
-        data = graph.serialize(format='nquads')
-        # The above conversion introduces blank node identifiers for
-        # triples that have no graph label (the fourth value).
-        # Remove these to avoid modifying the data.
-        data = _remove_blank_graph_labels(data)
-
-    # Note: the N-Quads mime type is "application/n-quads"
-    # (http://www.w3.org/TR/n-quads/), but pyld drops the dash.
-    return jsonld.from_rdf(data, { 'format': 'application/nquads' })
+    if format in ('nquads', 'nt'):
+        # Tokenize directly instead of using the line-based pyld or
+        # rdflib N-Quads parsers.
+        return nquadstools.to_jsonld(data)
+    else:
+        # pyld only supports parsing of nquads. Parse other formats
+        # with rdflib and pass the triples to pyld as a dataset.
+        graph = rdflib.ConjunctiveGraph()
+        default = [_parse(graph, data, format).identifier]
+        if format == 'trix':
+            # TriX has no blank node graph names, and rdflib parses
+            # each graph without a name into a context of its own.
+            default = [c.identifier for c in graph.contexts()
+                       if isinstance(c.identifier, rdflib.BNode)]
+        return jsonld.from_rdf(to_dataset(graph, default))
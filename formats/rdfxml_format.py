@@ -51,7 +51,7 @@ def to_jsonld(data, options=None):
     """Parse RDF/XML data into JSON-LD.
 
     Args:
-        data: string in RDF/XML format.
+        data: string or spool.MappedFile in RDF/XML format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
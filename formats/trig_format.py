@@ -36,7 +36,7 @@ def to_jsonld(data, options=None):
     """Parse Trig data into JSON-LD.
 
     Args:
-        data: string in Trig format.
+        data: string or spool.MappedFile in Trig format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
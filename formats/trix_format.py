@@ -36,7 +36,7 @@ def to_jsonld(data, options=None):
     """Parse TriX data into JSON-LD.
 
     Args:
-        data: string in TriX format.
+        data: string or spool.MappedFile in TriX format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -43,7 +43,7 @@ def to_jsonld(data, options=None):
     """Parse Turtle data into JSON-LD.
 
     Args:
-        data: string in Turtle format.
+        data: string or spool.MappedFile in Turtle format.
         options: dict of parsing options, or None for defaults.
 
     Returns:
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+
+"""JSON encoding and decoding using the fastest available library.
+
+Optional C-accelerated JSON libraries are used when installed, falling
+back to the standard library json module otherwise:
+
+* ujson decodes fastest, but differs from the standard library: it
+  rounds floats unless called with precise_float, rejects integers
+  that do not fit in 64 bits, numbers out of the range of doubles
+  and NaN and Infinity, and drops unpaired UTF-16 surrogates given
+  as \u escapes. Input that ujson rejects or that contains surrogate
+  escapes is therefore decoded with the standard library instead. It
+  also formats indented output differently, so it is only used for
+  decoding;
+* simplejson has a C-accelerated encoder also for indented output,
+  which the standard library encodes in pure Python;
+* the standard library C encoder is fastest for compact output.
+
+Set the preference lists below and call select() to change the
+libraries used. The libraries decode the same data, except that
+simplejson decodes ASCII strings into str rather than unicode, and
+(from version 3.19) rejects NaN and Infinity.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import re
+import codecs
+import importlib
+import json
+
+import flask
+
+import mediatype
+
+# Libraries for decoding and pretty-printing, in order of preference.
+# The first one that can be imported is used.
+DECODERS = ['ujson', 'simplejson', 'json']
+PRETTY_ENCODERS = ['simplejson', 'json']
+
+# Default for pretty-printing: True, False, or None to pretty-print
+# only for clients accepting HTML (i.e. browsers), with compact output
+# for other (machine) clients.
+PRETTYPRINT_DEFAULT = None
+
+# Query parameter that can be used to override pretty-printing.
+PRETTYPRINT_PARAMETER = 'prettyprint'
+
+# Size of chunks read by iterload() from file-like objects.
+CHUNK_SIZE = 64 * 1024
+
+_COMPACT_SEPARATORS = (',', ':')
+_PRETTY_SEPARATORS = (',', ': ')
+
+decoder = None
+pretty_encoder = None
+_raw_decoder = None
+_decode = None
+
+# \u escapes of UTF-16 surrogates.
+_surrogate_escape_re = re.compile(r'\\u[dD][89a-fA-F]')
+
+def _import_first(names):
+    for name in names:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    return json
+
+def select(decoders=None, pretty_encoders=None):
+    """Select the libraries to use from the given or default preferences."""
+    global decoder, pretty_encoder, _raw_decoder, _decode
+    decoder = _import_first(decoders if decoders is not None else DECODERS)
+    if decoder.__name__ == 'ujson':
+        _decode = _ujson_loads
+    else:
+        _decode = decoder.loads
+    # iterload() needs raw_decode(), which ujson does not have.
+    _raw_decoder = getattr(decoder, 'JSONDecoder', json.JSONDecoder)()
+    pretty_encoder = _import_first(pretty_encoders
+                                   if pretty_encoders is not None
+                                   else PRETTY_ENCODERS)
+
+def _ujson_loads(data):
+    """Decode with ujson, or json where the results would differ."""
+    if _surrogate_escape_re.search(data) is None:
+        try:
+            return decoder.loads(data, precise_float=True)
+        except ValueError:
+            pass    # e.g. big integer or NaN; json fails if invalid
+    return json.loads(data)
+
+select()
+
+def loads(data, encoding=None):
+    """Decode JSON string.
+
+    Args:
+        data: str or unicode containing JSON, or a buffer or file-like
+            object (see load()).
+        encoding: character encoding of str data, or None for UTF-8.
+    """
+    if not isinstance(data, basestring):
+        return load(data, encoding)
+    if encoding is not None and isinstance(data, str):
+        data = data.decode(encoding)
+    return _decode(data)
+
+def dumps(data, pretty=False):
+    """Encode data as JSON string.
+
+    Pretty-printed output is indented and ends in a newline.
+    """
+    if pretty:
+        return pretty_encoder.dumps(data, indent=2,
+                                    separators=_PRETTY_SEPARATORS) + '\n'
+    else:
+        return json.dumps(data, separators=_COMPACT_SEPARATORS)
+
+def iterencode(data, pretty=False):
+    """Encode data as JSON, yielding strings.
+
+    See dumps(). Compact output is encoded in one piece, as the C
+    encoder of the standard library is only used for one-shot encoding.
+    """
+    if pretty:
+        encoder = pretty_encoder.JSONEncoder(indent=2,
+                                             separators=_PRETTY_SEPARATORS)
+        for chunk in encoder.iterencode(data):
+            yield chunk
+        yield '\n'
+    else:
+        yield dumps(data)
+
+def iterload(source, encoding=None, chunk_size=None):
+    """Decode JSON incrementally, yielding the items of a top-level array.
+
+    Only the text of the item being decoded is held in memory in
+    addition to the source, so large arrays can be processed item by
+    item. If the top-level value is not an array, yields that value.
+
+    Args:
+        source: str, unicode, buffer, or file-like object with read().
+        encoding: character encoding of source, or None for UTF-8.
+        chunk_size: number of bytes to decode at a time.
+
+    Raises:
+        ValueError: if source is not valid JSON.
+    """
+    reader = _IncrementalReader(source, encoding, chunk_size)
+    if reader.skip_whitespace() != '[':
+        yield loads(reader.rest())
+        return
+    for item in _array_items(reader):
+        yield item
+
+def load(source, encoding=None):
+    """Decode JSON from a buffer or file-like object.
+
+    A top-level array is decoded one item at a time (see iterload()),
+    so that its text is not held in memory all at once.
+
+    Args:
+        source: str, unicode, buffer, or file-like object with read().
+        encoding: character encoding of source, or None for UTF-8.
+
+    Raises:
+        ValueError: if source is not valid JSON.
+    """
+    reader = _IncrementalReader(source, encoding)
+    if reader.skip_whitespace() != '[':
+        return loads(reader.rest())
+    return list(_array_items(reader))
+
+def _array_items(reader):
+    """Generate the items of the array at the position of reader."""
+    reader.pos += 1
+    # Array syntax: after '[' expect item or ']', after ',' expect item,
+    # and after item expect ',' or ']'.
+    start, after_comma, after_item = range(3)
+    state = start
+    while True:
+        c = reader.skip_whitespace()
+        if c is None:
+            raise ValueError('unterminated array')
+        if state == after_item:
+            if c not in ',]':
+                raise ValueError('expected , or ] at offset %d' %
+                                 reader.offset())
+            reader.pos += 1
+            if c == ']':
+                break
+            state = after_comma
+            continue
+        if c == ']' and state == start:
+            reader.pos += 1
+            break
+        yield reader.decode()
+        state = after_item
+    if reader.skip_whitespace() is not None:
+        raise ValueError('extra data at offset %d' % reader.offset())
+
+_NUMBER_TYPES = (int, long, float)
+_number_tail_re = re.compile(r'[0-9.eE+-]*\Z')
+
+class _IncrementalReader(object):
+    """Buffer of text decoded incrementally from a byte source."""
+
+    def __init__(self, source, encoding=None, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = CHUNK_SIZE
+        if not hasattr(source, 'read'):
+            source = _BufferReader(source)
+        self.source = source
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder(encoding or 'utf-8')()
+        self.buffer = u''
+        self.pos = 0
+        self.consumed = 0
+
+    def read(self):
+        """Append next chunk to buffer, return False at end of input."""
+        data = self.source.read(self.chunk_size)
+        final = not data
+        if isinstance(data, unicode):
+            text = data
+        else:
+            text = self.decoder.decode(data, final)
+        # Drop the text that has been decoded already.
+        self.consumed += self.pos
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return not final
+
+    def read_more(self):
+        """Read until the unprocessed part of the buffer doubles in size
+        (so that decoding large items is not quadratic), return False
+        if there was nothing more to read."""
+        available = len(self.buffer) - self.pos
+        target = max(2 * available, self.chunk_size)
+        while len(self.buffer) - self.pos < target:
+            if not self.read():
+                break
+        return len(self.buffer) - self.pos > available
+
+    def decode(self):
+        """Decode and return the JSON value at the current position."""
+        while True:
+            try:
+                value, end = _raw_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # Incomplete value; read more unless at end of input.
+                if not self.read_more():
+                    raise
+                continue
+            if (type(value) in _NUMBER_TYPES and
+                _number_tail_re.match(self.buffer, end) and
+                self.read_more()):
+                # The number may continue in the next chunk.
+                continue
+            self.pos = end
+            return value
+
+    def skip_whitespace(self):
+        """Skip whitespace, return next character or None at end."""
+        while True:
+            buffer, pos = self.buffer, self.pos
+            while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self.read():
+                return None
+
+    def rest(self):
+        """Return the rest of the input."""
+        while self.read():
+            pass
+        return self.buffer[self.pos:]
+
+    def offset(self):
+        return self.consumed + self.pos
+
+class _BufferReader(object):
+    """File-like reader for str, unicode or buffer."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, size):
+        data = self.data[self.pos:self.pos+size]
+        self.pos += size
+        if isinstance(data, unicode):
+            return data
+        return str(data)
+
+def prettyprint(options=None, default=None):
+    """Return whether to pretty-print JSON output.
+
+    Uses options['prettyprint'] if given, then the query parameter
+    PRETTYPRINT_PARAMETER of the current request, then default (or
+    PRETTYPRINT_DEFAULT if None). If that is also None, pretty-prints
+    if the Accept header of the current request accepts HTML.
+    """
+    if options and options.get('prettyprint') is not None:
+        return options['prettyprint']
+    if default is None:
+        default = PRETTYPRINT_DEFAULT
+    if not flask.has_request_context():
+        return bool(default)
+    request = flask.request
+    value = request.args.get(PRETTYPRINT_PARAMETER)
+    if value is not None:
+        return value.lower() not in ('0', 'false', 'no', 'off')
+    if default is not None:
+        return default
+    return _accepts_html(request.headers.get('Accept', ''))
+
+def _accepts_html(accept):
+    for r in mediatype.parse_accept(accept):
+        if r.type == 'text' and r.subtype == 'html' and r.q > 0:
+            return True
+    return False
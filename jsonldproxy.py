@@ -6,27 +6,88 @@ __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
 import urllib
+import urlparse
 
-def rewrite_urls(data, proxy_url):
-    """Rewrite URLs in JSON-LD data to pass through proxy."""
-    if isinstance(data, dict):
-        data = _rewrite_dict_urls(data, proxy_url)
-    elif isinstance(data, list):
-        data = _rewrite_list_urls(data, proxy_url)
-    else:
-        pass
-    return data
-
-def _rewrite_dict_urls(dict_, proxy_url):
-    if '@id' in dict_:
-        dict_['@id'] = proxy_url + urllib.quote(dict_['@id'])
-    for key, value in dict_.iteritems():
-        if key == '@id':
-            continue
-        rewrite_urls(value, proxy_url)
-    return dict_
-
-def _rewrite_list_urls(list_, proxy_url):
-    for item in list_:
-        rewrite_urls(item, proxy_url)
-    return list_
+class Rewriter(object):
+    """Rewrites URLs in JSON-LD data to pass through proxy.
+
+    Each distinct URL is quoted only once per Rewriter, so the same
+    Rewriter should be used for all URLs in a document.
+    """
+
+    def __init__(self, proxy_url, origin=None):
+        """Initialize Rewriter.
+
+        Args:
+            proxy_url: URL to prefix to quoted URLs.
+            origin: if not None, only rewrite URLs with this origin
+                (see origin()), leaving e.g. URLs of other servers and
+                blank node identifiers as they are.
+        """
+        self.proxy_url = proxy_url
+        self.origin = origin
+        self._rewritten = {}
+
+    def rewrite_url(self, url):
+        """Return URL rewritten to pass through proxy."""
+        try:
+            return self._rewritten[url]
+        except KeyError:
+            pass
+        if self.origin is None or _has_origin(url, self.origin):
+            if isinstance(url, unicode):
+                quoted = urllib.quote(url.encode('utf-8'))
+            else:
+                quoted = urllib.quote(url)
+            rewritten = self.proxy_url + quoted
+        else:
+            rewritten = url
+        self._rewritten[url] = rewritten
+        return rewritten
+
+    def __call__(self, data):
+        """Rewrite URLs in JSON-LD data in place.
+
+        Returns:
+            the given data.
+        """
+        # Traverse with an explicit stack to avoid hitting the recursion
+        # limit on deeply nested data. Only containers are stacked.
+        # Note: types are compared directly instead of using isinstance()
+        # for speed, which is fine for JSON data from json and PyLD.
+        rewrite_url = self.rewrite_url
+        stack = [data]
+        pop, push = stack.pop, stack.append
+        while stack:
+            value = pop()
+            if type(value) is dict:
+                for key, item in value.iteritems():
+                    type_ = type(item)
+                    if type_ is list or type_ is dict:
+                        push(item)
+                    elif key == '@id' and isinstance(item, basestring):
+                        value[key] = rewrite_url(item)
+            else:
+                for item in value:
+                    type_ = type(item)
+                    if type_ is list or type_ is dict:
+                        push(item)
+        return data
+
+def origin(url):
+    """Return the origin (scheme, host and port) of URL as a string."""
+    parsed = urlparse.urlsplit(url)
+    return '%s://%s' % (parsed.scheme, parsed.netloc)
+
+def _has_origin(url, origin):
+    return (url.startswith(origin) and
+            url[len(origin):len(origin)+1] in ('', '/', '?', '#'))
+
+def rewrite_urls(data, proxy_url, origin=None):
+    """Rewrite URLs in JSON-LD data to pass through proxy.
+
+    See Rewriter for arguments.
+    """
+    if type(data) not in (dict, list):
+        return data
+    return Rewriter(proxy_url, origin)(data)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""Materialization of rendered annotations.
+
+Stores renditions of the annotations in an annotation store in output
+formats, so that requests for single annotations are served by
+copying stored bytes instead of converting the annotation again.
+
+Each format has a policy: EAGER formats are rendered by a pool of
+background threads when annotations are written, LAZY formats are
+rendered on the first request and stored for later requests, and
+formats with policy NEVER are always rendered on request. Stored
+renditions are removed when their annotation is replaced or deleted.
+
+Renditions are identified by the format, the JSON-LD profile (for
+JSON-LD) and whether the output is pretty-printed. Eager renditions
+use the default profile without pretty-printing, the representation
+requested by machine clients by default.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import logging
+import traceback
+
+from multiprocessing.pool import ThreadPool
+
+import flask
+
+import jsoncodec
+
+from formats import jsonld_format
+
+EAGER = 'eager'
+LAZY = 'lazy'
+NEVER = 'never'
+
+# Policy for each format, by format name. Other formats have policy
+# DEFAULT_POLICY.
+POLICY = {
+    'jsonld': EAGER,
+    'nquads': EAGER,
+    'turtle': EAGER,
+}
+DEFAULT_POLICY = LAZY
+
+# Number of threads rendering eager formats in the background.
+THREADS = 2
+
+# Application providing request contexts for rendering, as the format
+# modules read e.g. the JSON-LD profile from the request.
+_app = flask.Flask(__name__)
+
+def rendition_key(format_name, profile=None, pretty=False):
+    """Return key identifying a rendition of an annotation."""
+    if format_name != jsonld_format.format_name:
+        profile = None
+    elif profile is None:
+        profile = jsonld_format.DEFAULT_PROFILE
+    return '%s %s %s' % (format_name, profile or '-',
+                         'pretty' if pretty else 'compact')
+
+class Materializer(object):
+    """Renders annotations of an annotationstore.AnnotationStore."""
+
+    def __init__(self, store, formats, policy=None, default_policy=None,
+                 threads=None):
+        """Initialize materializer.
+
+        Args:
+            store: annotationstore.AnnotationStore.
+            formats: format modules (see formatloader.load()).
+            policy: dict mapping format names to EAGER, LAZY or NEVER
+                (default POLICY).
+            default_policy: policy of formats not in policy (default
+                DEFAULT_POLICY).
+            threads: number of background threads (default THREADS).
+        """
+        self.store = store
+        self.formats = dict((f.format_name, f) for f in formats)
+        self._policy = policy if policy is not None else POLICY
+        self._default_policy = default_policy if default_policy is not None \
+            else DEFAULT_POLICY
+        self.threads = threads if threads is not None else THREADS
+        self.eager = sorted(name for name in self.formats
+                            if self.policy(name) == EAGER)
+        self._pool = None
+
+    def policy(self, format_name):
+        return self._policy.get(format_name, self._default_policy)
+
+    def start(self):
+        """Start background threads."""
+        if self._pool is None and self.eager:
+            self._pool = ThreadPool(self.threads)
+
+    def close(self):
+        """Stop background threads once pending renditions are done."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def written(self, ids):
+        """Schedule eager renditions of annotations with given @ids."""
+        if not self.eager:
+            return
+        self.start()
+        for id_ in ids:
+            self._pool.apply_async(self._materialize, (id_,))
+
+    def get(self, id_, format_name, profile=None, pretty=False):
+        """Return (content type, body) rendition of annotation, or None.
+
+        Renders and stores the rendition if the format has policy LAZY
+        (or EAGER but the rendition is not done yet). Returns None if
+        the format has policy NEVER or the annotation is not found.
+        """
+        if (format_name not in self.formats or
+            self.policy(format_name) == NEVER):
+            return None
+        key = rendition_key(format_name, profile, pretty)
+        rendition = self.store.get_rendition(id_, key)
+        if rendition is not None:
+            return rendition
+        serialized = self.store.get_serialized(id_)
+        if serialized is None:
+            return None
+        rendition = self.render(format_name, serialized, profile, pretty)
+        self.store.set_rendition(id_, key, rendition[0], rendition[1],
+                                 serialized)
+        return rendition
+
+    def render(self, format_name, serialized, profile=None, pretty=False):
+        """Return (content type, body) of annotation given as JSON string.
+
+        The annotation is rendered as a list of one node, as it would
+        be in a response to a query for it.
+        """
+        format_ = self.formats[format_name]
+        mimetype = format_.mimetypes[0]
+        accept = mimetype
+        if profile is not None and format_name == jsonld_format.format_name:
+            accept = '%s; profile="%s"' % (mimetype, profile)
+        query_string = { jsoncodec.PRETTYPRINT_PARAMETER: int(pretty) }
+        # Decode for each rendition, as rendering may modify the data.
+        data = [jsoncodec.loads(serialized)]
+        with _app.test_request_context(query_string=query_string,
+                                       headers={ 'Accept': accept }):
+            body = format_.from_jsonld(data, { 'offset': 0, 'limit': None })
+        if isinstance(body, unicode):
+            body = body.encode('utf-8')
+        return mimetype, body
+
+    def _materialize(self, id_):
+        """Render and store eager renditions of annotation."""
+        try:
+            serialized = self.store.get_serialized(id_)
+            if serialized is None:
+                return
+            for format_name in self.eager:
+                content_type, body = self.render(format_name, serialized)
+                key = rendition_key(format_name)
+                if not self.store.set_rendition(id_, key, content_type, body,
+                                                serialized):
+                    return    # annotation replaced or deleted
+        except Exception:
+            # Nothing to report the error to; the rendition is made
+            # on request instead.
+            logging.error('Materializing %s failed:\n%s', id_,
+                          traceback.format_exc())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+"""Parsing and matching of media types (MIME types).
+
+Media types are parsed once into (type, subtype, parameters) and
+matched on type and subtype, ignoring case, with parameters compared
+only where both sides give them. The charset parameter is ignored in
+matching and the profile parameter is treated as a space-separated
+list of URIs, as in JSON-LD
+(http://www.w3.org/TR/json-ld/#iana-considerations).
+
+DispatchTable maps media types to values (e.g. parse functions) and
+caches the results of lookups by Content-Type and negotiation by
+Accept header, as clients tend to send the same few headers.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+# Maximum number of distinct headers to cache results for. Caches are
+# cleared when full.
+CACHE_SIZE = 1024
+
+# Parameters ignored when matching media types.
+IGNORED_PARAMETERS = ('charset', 'q')
+
+class MediaType(object):
+    """Parsed media type or media range."""
+
+    __slots__ = ('type', 'subtype', 'params', 'q')
+
+    def __init__(self, type_, subtype, params=None, q=1.0):
+        self.type = type_
+        self.subtype = subtype
+        self.params = params if params is not None else {}
+        self.q = q
+
+    @property
+    def essence(self):
+        """Return 'type/subtype' without parameters."""
+        return '%s/%s' % (self.type, self.subtype)
+
+    def profiles(self):
+        """Return list of URIs in profile parameter."""
+        return self.params.get('profile', '').split()
+
+    def __repr__(self):
+        return 'MediaType(%r, %r, %r, %r)' % (self.type, self.subtype,
+                                             self.params, self.q)
+
+def _split_parameters(value):
+    """Split value on semicolons outside quoted strings."""
+    parts, current, quoted, escaped = [], [], False, False
+    for c in value:
+        if escaped:
+            escaped = False
+        elif c == '\\' and quoted:
+            escaped = True
+        elif c == '"':
+            quoted = not quoted
+        elif c == ';' and not quoted:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(c)
+    parts.append(''.join(current))
+    return parts
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+def _parse(value):
+    parts = _split_parameters(value)
+    type_, _, subtype = parts[0].strip().lower().partition('/')
+    if not type_ or not subtype or (type_ == '*' and subtype != '*'):
+        raise ValueError('invalid media type: %r' % value)
+    params, q = {}, 1.0
+    for part in parts[1:]:
+        name, sep, v = part.partition('=')
+        name = name.strip().lower()
+        if not name or not sep:
+            continue
+        v = _unquote(v.strip())
+        if name == 'q':
+            try:
+                q = min(max(float(v), 0.0), 1.0)
+            except ValueError:
+                raise ValueError('invalid quality value: %r' % value)
+        else:
+            if name == 'charset':
+                v = v.lower()
+            params[name] = v
+    return MediaType(type_, subtype, params, q)
+
+_parse_cache = {}
+
+def parse(value):
+    """Parse media type string, e.g. a Content-Type header value.
+
+    Type, subtype, parameter names and charset are lowercased. Results
+    are cached and shared, and should not be modified.
+
+    Raises:
+        ValueError if value is not a valid media type.
+    """
+    mediatype = _parse_cache.get(value)
+    if mediatype is None:
+        mediatype = _parse(value)
+        if len(_parse_cache) >= CACHE_SIZE:
+            _parse_cache.clear()
+        _parse_cache[value] = mediatype
+    return mediatype
+
+_accept_cache = {}
+
+def parse_accept(header):
+    """Parse Accept header value into list of MediaType objects.
+
+    Invalid media ranges are skipped. Results are cached and shared,
+    and should not be modified.
+    """
+    ranges = _accept_cache.get(header)
+    if ranges is None:
+        ranges = []
+        for value in _split_ranges(header):
+            try:
+                ranges.append(_parse(value))
+            except ValueError:
+                pass
+        if len(_accept_cache) >= CACHE_SIZE:
+            _accept_cache.clear()
+        _accept_cache[header] = ranges
+    return ranges
+
+def _split_ranges(header):
+    """Split header on commas outside quoted strings."""
+    ranges, current, quoted = [], [], False
+    for c in header:
+        if c == '"':
+            quoted = not quoted
+        elif c == ',' and not quoted:
+            ranges.append(''.join(current))
+            current = []
+            continue
+        current.append(c)
+    ranges.append(''.join(current))
+    return [r for r in ranges if r.strip()]
+
+def match(pattern, mediatype):
+    """Return specificity of match of pattern to mediatype, or -1 if no match.
+
+    The pattern can be a media range with wildcards. Parameters given
+    in both must match, except for charset and q, which are ignored;
+    for profile, the profiles of mediatype must all be given in pattern.
+    Specificity is 0 for */*, 1 for type/*, 2 for type/subtype, plus
+    the number of matching parameters.
+    """
+    if pattern.type == '*':
+        specificity = 0
+    elif pattern.type != mediatype.type:
+        return -1
+    elif pattern.subtype == '*':
+        specificity = 1
+    elif pattern.subtype != mediatype.subtype:
+        return -1
+    else:
+        specificity = 2
+    for name, value in pattern.params.iteritems():
+        if name in IGNORED_PARAMETERS or name not in mediatype.params:
+            continue
+        if name == 'profile':
+            if not set(mediatype.profiles()) <= set(pattern.profiles()):
+                return -1
+        elif value != mediatype.params[name]:
+            return -1
+        specificity += 1
+    return specificity
+
+class DispatchTable(object):
+    """Mapping from media types to values with parameter-aware matching."""
+
+    def __init__(self, items=()):
+        """Initialize table with (media type string, value) pairs.
+
+        Media types that are equivalent after parsing (e.g. 'text/n3'
+        and 'text/n3; charset=utf-8') are only added once.
+        """
+        self.entries = []    # (media type string, MediaType, value)
+        self._by_type = {}   # (type, subtype) -> list of entries
+        self._lookup_cache = {}
+        self._negotiate_cache = {}
+        for mimetype, value in items:
+            self.add(mimetype, value)
+
+    def add(self, mimetype, value):
+        mediatype = parse(mimetype)
+        candidates = self._by_type.setdefault(
+            (mediatype.type, mediatype.subtype), [])
+        key = _without_ignored(mediatype.params)
+        for _, m, _ in candidates:
+            if _without_ignored(m.params) == key:
+                return
+        entry = (mimetype, mediatype, value)
+        candidates.append(entry)
+        self.entries.append(entry)
+        self._lookup_cache.clear()
+        self._negotiate_cache.clear()
+
+    def lookup(self, content_type):
+        """Return value for the media type given in content_type, or None.
+
+        Of the entries with the same type and subtype whose parameters
+        match those in content_type, the most specific one is chosen.
+        """
+        try:
+            return self._lookup_cache[content_type]
+        except KeyError:
+            pass
+        try:
+            mediatype = parse(content_type)
+        except ValueError:
+            value = None
+        else:
+            value = _best(self._by_type.get(
+                    (mediatype.type, mediatype.subtype), ()), mediatype)
+        if len(self._lookup_cache) >= CACHE_SIZE:
+            self._lookup_cache.clear()
+        self._lookup_cache[content_type] = value
+        return value
+
+    def negotiate(self, accept):
+        """Return (media type string, value) best matching Accept header.
+
+        Each entry gets the quality value of the most specific media
+        range matching it; the entry with the highest quality value is
+        chosen, ties going to the entry added first. Returns None if no
+        entry is acceptable.
+        """
+        try:
+            return self._negotiate_cache[accept]
+        except KeyError:
+            pass
+        ranges = parse_accept(accept)
+        best, best_q = None, 0.0
+        for mimetype, mediatype, value in self.entries:
+            specificity, q = -1, 0.0
+            for r in ranges:
+                s = match(r, mediatype)
+                if s > specificity:
+                    specificity, q = s, r.q
+            if q > best_q:
+                best, best_q = (mimetype, value), q
+        if len(self._negotiate_cache) >= CACHE_SIZE:
+            self._negotiate_cache.clear()
+        self._negotiate_cache[accept] = best
+        return best
+
+def _without_ignored(params):
+    return dict((k, v) for k, v in params.iteritems()
+                if k not in IGNORED_PARAMETERS)
+
+def _best(entries, mediatype):
+    best, best_specificity = None, -1
+    for _, m, value in entries:
+        specificity = match(mediatype, m)
+        if specificity > best_specificity:
+            best, best_specificity = value, specificity
+    return best
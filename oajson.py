@@ -16,10 +16,18 @@ See:
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
+import timing
 import contexts
+import contextcache
 
 from pyld import jsonld
 
+# Have PyLD reuse processed contexts across documents and requests.
+contextcache.install()
+
+# Have PyLD resolve known context URLs without network access.
+jsonld.set_document_loader(contexts.load_document)
+
 def default_context():
     return contexts.roaa_context_20150317
 
@@ -42,8 +50,10 @@ def expand(document, context=None, base=None):
     See http://www.w3.org/TR/json-ld-api/#expansion.
     """
     # Try to avoid GETting URL contexts
-    document = contexts.context_urls_to_objects(document)
-    return jsonld.expand(document, _make_options(context, base))
+    with timing.stage('contexts'):
+        document = contexts.context_urls_to_objects(document)
+    with timing.stage('expand'):
+        return jsonld.expand(document, _make_options(context, base))
 
 def compact(document, context=None, base=None, remove_context=False):
     """Compact OA JSON-LD, shortening forms according to context.
@@ -60,9 +70,11 @@ def compact(document, context=None, base=None, remove_context=False):
     if base is not None:
         options['base'] = base
 
-    compacted = jsonld.compact(document, context, options)
+    with timing.stage('compact'):
+        compacted = jsonld.compact(document, context, options)
     # Replace known context objects with URLs.
-    compacted = contexts.context_objects_to_urls(compacted)
+    with timing.stage('contexts'):
+        compacted = contexts.context_objects_to_urls(compacted)
 
     if remove_context:
         try:
@@ -77,7 +89,8 @@ def flatten(document):
 
     # See http://www.w3.org/TR/json-ld-api/#flattening
 
-    return jsonld.flatten(document)
+    with timing.stage('flatten'):
+        return jsonld.flatten(document)
 
 def to_rdf(document, context=None, base=None):
     """Deserialize OA JSON-LD to RDF, return N-Quads as string."""
@@ -5,20 +5,33 @@
 __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
-def make_parser(formats):
-    """Return a function for parsing data into JSON-LD."""
+import mediatype
 
-    mimetype_to_parse_function = {}
-    for f in formats:
-        for m in f.mimetypes:
-            mimetype_to_parse_function[m] = f.to_jsonld
+def make_parser(formats, pool=None):
+    """Return a function for parsing data into JSON-LD.
+
+    If pool is given, large data is parsed using the given
+    convpool.ConversionPool.
+
+    The MIME type given to the parse function is matched to those of
+    the formats ignoring case and parameters that the format does not
+    specify, so e.g. 'Text/Turtle; charset=UTF-8' is parsed as Turtle.
+    """
+
+    dispatch = mediatype.DispatchTable((m, f.to_jsonld)
+                                       for f in formats for m in f.mimetypes)
 
     def parse_data(data, mimetype=None, charset=None):
         """Parse data into JSON-LD."""
         options = { 'encoding': charset }
-        parse_function = mimetype_to_parse_function.get(mimetype)
+        if mimetype is None:
+            parse_function = None
+        else:
+            parse_function = dispatch.lookup(mimetype)
         if not parse_function:
             raise NotImplementedError('not implemented: parsing %s' % mimetype)
+        elif pool is not None:
+            return pool.run(parse_function, data, options)
         else:
             return parse_function(data, options)
 
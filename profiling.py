@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+"""Profiling of slow requests.
+
+ProfilingMiddleware runs a sample of requests under cProfile and
+writes the profiles of those that take longer than a threshold to a
+directory, keeping only the most recent ones. Clients can also ask
+for a request to be profiled with a request header, if HEADER is set.
+
+cProfile profiles the thread it is enabled in, so with the gevent
+server (asyncserver.py) profiles may include other concurrent requests.
+
+The profiles can be inspected with pstats, e.g.
+
+    python -c "import pstats; pstats.Stats('FILE').sort_stats('cumulative').print_stats(30)"
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import os
+import re
+import time
+import random
+import cProfile
+import tempfile
+import threading
+
+# Fraction of requests to profile.
+SAMPLE_RATE = 0.01
+
+# Minimum duration of a profiled request, in seconds, for its profile
+# to be saved.
+THRESHOLD = 1.0
+
+# Request header asking for a request to be profiled and its profile
+# saved regardless of duration, or None to ignore the header. Any
+# client can send the header, so only set this where clients are
+# trusted (e.g. in development).
+HEADER = None
+
+# Response header giving the name of the profile file, if saved.
+FILE_HEADER = 'X-Profile-File'
+
+# Maximum number of profiles to keep in the directory.
+MAX_FILES = 100
+
+_unsafe_re = re.compile(r'[^A-Za-z0-9_.-]+')
+
+def _environ_key(header):
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+class ProfilingMiddleware(object):
+    """WSGI middleware profiling requests."""
+
+    def __init__(self, app, directory, sample_rate=None, threshold=None,
+                 header=None, max_files=None):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate if sample_rate is not None \
+            else SAMPLE_RATE
+        self.threshold = threshold if threshold is not None else THRESHOLD
+        if header is None:
+            header = HEADER
+        self.header_key = _environ_key(header) if header is not None else None
+        self.max_files = max_files if max_files is not None else MAX_FILES
+        self._counter = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __call__(self, environ, start_response):
+        forced = (self.header_key is not None and
+                  environ.get(self.header_key, '').lower() in
+                  ('1', 'true', 'yes'))
+        if not forced and random.random() >= self.sample_rate:
+            return self.app(environ, start_response)
+
+        filename = self._filename(environ)
+        if forced:
+            def start_response(status, headers, exc_info=None,
+                               start_response=start_response):
+                headers = headers + [(FILE_HEADER, filename)]
+                return start_response(status, headers, exc_info)
+
+        profile = cProfile.Profile()
+        start = time.time()
+        profile.enable()
+        try:
+            app_iter = self.app(environ, start_response)
+        except:
+            profile.disable()
+            raise
+        profile.disable()
+        def finish():
+            if forced or time.time() - start >= self.threshold:
+                self._save(profile, filename)
+        return _ProfiledIterable(app_iter, profile, finish)
+
+    def _filename(self, environ):
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        path = _unsafe_re.sub('_', environ.get('PATH_INFO', ''))[:80]
+        return '%s-%d-%d-%s%s.prof' % (
+            time.strftime('%Y%m%dT%H%M%S'), os.getpid(), counter,
+            environ.get('REQUEST_METHOD', ''), path)
+
+    def _save(self, profile, filename):
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        profile.dump_stats(tmpname)
+        os.rename(tmpname, os.path.join(self.directory, filename))
+        self._rotate()
+
+    def _rotate(self):
+        """Remove the oldest profiles beyond the maximum number."""
+        with self._lock:
+            paths = [os.path.join(self.directory, fn)
+                     for fn in os.listdir(self.directory)
+                     if fn.endswith('.prof')]
+            if len(paths) <= self.max_files:
+                return
+            paths.sort(key=lambda p: (os.path.getmtime(p), p))
+            for path in paths[:len(paths) - self.max_files]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+class _ProfiledIterable(object):
+    """Response iterable profiling the generation of the response."""
+
+    def __init__(self, iterable, profile, finish):
+        self.iterable = iterable
+        self.profile = profile
+        self.finish = finish
+
+    def __iter__(self):
+        iterator = iter(self.iterable)
+        while True:
+            self.profile.enable()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.profile.disable()
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.profile.enable()
+                try:
+                    self.iterable.close()
+                finally:
+                    self.profile.disable()
+        finally:
+            self.finish()
@@ -6,10 +6,18 @@ __author__ = 'Sampo Pyysalo'
 __license__ = 'MIT'
 
 import json
+import itertools
 
+import flask
+import mimeparse
 import mimerender
+
+import timing
 flaskmimerender = mimerender.FlaskMimeRender()
 
+# Minimum size of chunks in streamed responses, in characters.
+STREAM_CHUNK_SIZE = 64 * 1024
+
 def no_mimetype_callback(accept_header, supported):
     """Callback for mimeparser when no acceptable MIME type is found."""
     # Expected return value is (content-type, data).
@@ -29,8 +37,71 @@ def register_types(formats):
             # assume already registered
             pass
 
-def make_renderer(formats, default='jsonld'):
-    format_args = { f.format_name: f.from_jsonld for f in formats }
+def _buffered(chunks, size=None):
+    """Combine chunks of given iterable into chunks of at least given size."""
+    if size is None:
+        size = STREAM_CHUNK_SIZE
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _make_streaming_render_function(stream_function):
+    """Return render function giving a streamed response."""
+    def render(data, options=None):
+        chunks = stream_function(data, options)
+        chunks = _buffered(timing.timed_iter('render', chunks))
+        # Render the first chunk before responding so that errors
+        # in starting the conversion give an error response.
+        try:
+            first = [next(chunks)]
+        except StopIteration:
+            first = []
+        chunks = itertools.chain(first, chunks)
+        response = flask.Response(flask.stream_with_context(chunks))
+        # mimerender adds the negotiated content type to the response
+        # headers, remove the default to avoid a duplicate.
+        del response.headers['Content-Type']
+        return response
+    return render
+
+def _make_pool_render_function(format_, render_function, pool):
+    """Return render function rendering large data in process pool."""
+    def render(data, options=None):
+        if pool.is_large(data):
+            with timing.stage('render'):
+                return pool.run(format_.from_jsonld, data, options)
+        else:
+            return render_function(data, options)
+    return render
+
+def _render_function(format_, stream, pool=None):
+    """Return render function for format module."""
+    stream_function = getattr(format_, 'stream_from_jsonld', None)
+    if stream and stream_function is not None:
+        render = _make_streaming_render_function(stream_function)
+    else:
+        def render(data, options=None):
+            with timing.stage('render'):
+                return format_.from_jsonld(data, options)
+    if pool is not None:
+        render = _make_pool_render_function(format_, render, pool)
+    return render
+
+def make_renderer(formats, default='jsonld', stream=True, pool=None):
+    """Return decorator rendering data in format negotiated for request.
+
+    If stream is True, responses are streamed for formats that provide
+    a stream_from_jsonld() generator function. If pool is given, large
+    data is rendered using the given convpool.ConversionPool.
+    """
+    format_args = { f.format_name: _render_function(f, stream, pool)
+                    for f in formats }
     assert default in format_args, 'Default format %s not available' % default
 
     register_types(formats)
@@ -41,3 +112,36 @@ def make_renderer(formats, default='jsonld'):
                                not_acceptable_callback=no_mimetype_callback,
                                **format_args)(f)
     return render_resource
+
+def make_negotiator(formats, default='jsonld'):
+    """Return a function giving the MIME type of the response to the
+    current request, as negotiated by the renderer from make_renderer().
+
+    The returned function returns None if no acceptable MIME type is
+    found or the Accept header is invalid.
+    """
+    register_types(formats)
+    supported, default_mimes = [], []
+    for f in formats:
+        if f.format_name == default:
+            default_mimes = list(f.mimetypes)
+        else:
+            supported.extend(f.mimetypes)
+    # As in mimerender, default types are last (highest priority).
+    supported.extend(default_mimes)
+
+    def negotiate():
+        shortname = flask.request.values.get('format')
+        if shortname:
+            try:
+                return mimerender._get_mime_types(shortname)[0]
+            except mimerender.MimeRenderException:
+                return None
+        accept_header = flask.request.headers.get('Accept')
+        if not accept_header:
+            return default_mimes[0] if default_mimes else None
+        try:
+            return mimeparse.best_match(supported, accept_header) or None
+        except mimeparse.MimeTypeParseException:
+            return None
+    return negotiate
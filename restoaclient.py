@@ -2,19 +2,247 @@
 
 """RESTful Open Annotation client."""
 
+import re
+import copy
+import time
+import threading
+
+from email.utils import parsedate_tz, mktime_tz
+from collections import OrderedDict
+
 import requests
 
+from requests.structures import CaseInsensitiveDict
+
 from server import parse_data
 
-def get(url):
+# Connection pool settings. POOL_CONNECTIONS is the number of hosts
+# to keep pools for, POOL_MAXSIZE the number of connections per host.
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 50
+
+# Seconds to wait for the upstream server, or None for no limit.
+TIMEOUT = 60
+
+# Maximum total size of responses in the HTTP cache, in bytes.
+# Zero disables caching.
+HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Accept header of requests to upstream servers.
+ACCEPT = 'application/ld+json'
+
+# Headers of cached responses replaced by those of 304 (Not Modified)
+# responses to revalidation requests.
+REVALIDATED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Expires',
+                       'Date')
+
+_max_age_re = re.compile(r'max-age\s*=\s*(\d+)')
+
+class _CacheEntry(object):
+    """Cached response and its freshness.
+
+    Entries are shared by threads and not modified after creation;
+    revalidation replaces an entry with a new one.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.stored = time.time()
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        self.revalidate = 'no-cache' in cache_control
+        self.max_age = _freshness_lifetime(response.headers, self.stored)
+
+    def is_fresh(self):
+        return (not self.revalidate and
+                time.time() - self.stored < self.max_age)
+
+    def validators(self):
+        """Return headers for revalidating the entry."""
+        headers = {}
+        etag = self.response.headers.get('ETag')
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        last_modified = self.response.headers.get('Last-Modified')
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+class HttpCache(object):
+    """Cache of upstream responses following HTTP caching headers.
+
+    Responses are reused without contacting the upstream server while
+    fresh according to Cache-Control max-age or Expires, and
+    revalidated with conditional requests using their ETag and
+    Last-Modified headers otherwise. Responses are cached separately
+    for each Accept header, and responses with Vary: * not at all.
+    """
+
+    def __init__(self, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, accept=None):
+        """Return cache entry for url and Accept header, or None."""
+        key = (url, accept)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry    # mark most recently used
+            return entry
+
+    def store(self, url, response, accept=None):
+        """Store response to request for url with given Accept header."""
+        if not _is_cacheable(response):
+            return
+        size = len(response.content)
+        if not self.max_bytes or size > self.max_bytes:
+            return
+        key = (url, accept)
+        entry = _CacheEntry(response)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.response.content)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.response.content)
+
+    def revalidated(self, url, entry, headers, accept=None):
+        """Return entry updated with headers of a 304 response.
+
+        The returned entry has a copy of the cached response with the
+        REVALIDATED_HEADERS of the 304 response, and replaces the
+        given entry in the cache unless it has been replaced already.
+        """
+        updated = _CacheEntry(_updated_response(entry.response, headers))
+        key = (url, accept)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._entries[key] = updated
+        return updated
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+def _updated_response(response, headers):
+    """Return copy of response with REVALIDATED_HEADERS from headers."""
+    updated = copy.copy(response)
+    updated.headers = CaseInsensitiveDict(response.headers)
+    for header in REVALIDATED_HEADERS:
+        if header in headers:
+            updated.headers[header] = headers[header]
+    return updated
+
+def _http_date(value):
+    """Return seconds since the epoch for HTTP date, or None if invalid."""
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
+
+def _freshness_lifetime(headers, stored):
+    """Return seconds for which a response with headers stays fresh.
+
+    Uses Cache-Control max-age if given, and the Expires header
+    relative to the Date header (or the time the response was stored)
+    otherwise. Invalid Expires values mean already expired.
+    """
+    cache_control = headers.get('Cache-Control', '').lower()
+    m = _max_age_re.search(cache_control)
+    if m:
+        return int(m.group(1))
+    expires = _http_date(headers.get('Expires'))
+    if expires is None:
+        return 0
+    date = _http_date(headers.get('Date'))
+    if date is None:
+        date = stored
+    return max(0, expires - date)
+
+def _is_cacheable(response):
+    """Return True if response can be stored in a shared cache."""
+    if response.status_code != 200:
+        return False
+    cache_control = response.headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'private' in cache_control:
+        return False
+    # The response depends on request headers not known to the cache.
+    if response.headers.get('Vary', '').strip() == '*':
+        return False
+    # Responses that cannot be revalidated are only useful while fresh.
+    return ('ETag' in response.headers or
+            'Last-Modified' in response.headers or
+            _max_age_re.search(cache_control) is not None or
+            'Expires' in response.headers)
+
+def make_session(pool_connections=None, pool_maxsize=None):
+    """Return requests.Session with given connection pool sizes."""
+    if pool_connections is None:
+        pool_connections = POOL_CONNECTIONS
+    if pool_maxsize is None:
+        pool_maxsize = POOL_MAXSIZE
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections,
+                                            pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Session and cache shared by all requests to upstream servers.
+session = make_session()
+http_cache = HttpCache()
+
+def fetch(url, accept=None):
+    """Get response for RESTful annotations from given URL.
+
+    Args:
+        url: URL to get annotations from.
+        accept: Accept header of the request (default ACCEPT).
+
+    Returns:
+        requests.Response, which may be shared with other threads and
+        should not be modified.
+    """
+    if accept is None:
+        accept = ACCEPT
+    entry = http_cache.get(url, accept)
+    if entry is not None and entry.is_fresh():
+        return entry.response
+    headers = { 'Accept': accept }
+    if entry is not None:
+        headers.update(entry.validators())
+    response = session.get(url, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 304 and entry is not None:
+        return http_cache.revalidated(url, entry, response.headers,
+                                      accept).response
+    response.raise_for_status()
+    http_cache.store(url, response, accept)
+    return response
+
+def get(url, response=None):
     """Get RESTful annotations from given URL.
 
+    Args:
+        url: URL to get annotations from.
+        response: response previously returned by fetch(url), or None
+            to get the annotations.
+
     Returns:
         response data in JSON-LD format.
     """
-    headers = { 'Accept': 'application/ld+json' }
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
+    if response is None:
+        response = fetch(url)
     # Note: Requests resolves encoding when response.text is accessed,
     # so parse_data doesn't need to address encoding.
     data, mimetype = response.text, response.headers.get('Content-Type')
@@ -7,55 +7,408 @@ __license__ = 'MIT'
 
 import sys
 import json
+import time
 
 import flask
 
+from pyld import jsonld
+from werkzeug.exceptions import ServiceUnavailable, InternalServerError
+
 import oajson
+import timing
+import profiling
+import batch
+import annotationstore
+import materialize
+import convcache
+import convpool
 import formatloader
 import restoaclient
 import jsonldproxy
+import jsoncodec
+import mediatype
 import tools
+import admission
 
 from parse import make_parser
-from render import make_renderer
+from render import make_renderer, make_negotiator
+from formats import jsonld_format
 
 DEBUG = True
 
+# Cache for conversion results: None for no caching, 'memory' for an
+# in-process cache, or the name of a directory for a file-based cache.
+CONVERSION_CACHE = None
+
+# If True, only rewrite URLs in proxied data that have the same origin
+# as the proxied URL, leaving e.g. URLs of other servers unchanged.
+PROXY_SAME_ORIGIN_ONLY = False
+
+# If True, time request processing stages, reporting the times in
+# Server-Timing headers and as histograms at /metrics.
+TIMING = False
+
+# Directory to write profiles of slow requests to, or None to disable
+# profiling (see profiling.py for sampling and threshold settings).
+PROFILE_DIRECTORY = None
+
+# Number of worker processes for converting large documents: 0 to
+# convert in the server process, or None for the number of CPUs.
+CONVERSION_PROCESSES = 0
+
+# SQLite database file of the annotation store served at /annotations/,
+# ':memory:' for an in-memory store, or None to disable the store.
+ANNOTATION_STORE = None
+
+# If True, store rendered representations of annotations in the
+# annotation store, rendering them in the background when annotations
+# are written or on first request (see materialize.py for policies).
+MATERIALIZE = True
+
+# If True, limit the sizes of request bodies to convert and the number
+# and estimated cost of conversions running at once, rejecting other
+# requests with 413 or 503 (see admission.py for the limits).
+ADMISSION_CONTROL = True
+
 app = flask.Flask(__name__)
 
+timing.enable(TIMING)
+
+if PROFILE_DIRECTORY is not None:
+    app.wsgi_app = profiling.ProfilingMiddleware(app.wsgi_app,
+                                                 PROFILE_DIRECTORY)
+
+def _make_conversion_pool(processes):
+    if processes == 0:
+        return None
+    else:
+        return convpool.ConversionPool(processes)
+
+conversion_pool = _make_conversion_pool(CONVERSION_PROCESSES)
+
 # Create functions for parsing received data and rendering output data
 # dynamically based on the available format modules.
 formats = formatloader.load()
-parse_data = make_parser(formats)
-render_resource = make_renderer(formats)
+parse_data = make_parser(formats, conversion_pool)
+render_resource = make_renderer(formats, pool=conversion_pool)
+negotiate_mimetype = make_negotiator(formats)
+
+def _make_conversion_cache(setting):
+    if setting is None:
+        return None
+    elif setting == 'memory':
+        return convcache.ConversionCache(convcache.MemoryBackend())
+    else:
+        return convcache.ConversionCache(convcache.FileBackend(setting))
+
+conversion_cache = _make_conversion_cache(CONVERSION_CACHE)
+
+def _make_annotation_store(setting):
+    if setting is None:
+        return None
+    else:
+        return annotationstore.AnnotationStore(setting)
+
+annotation_store = _make_annotation_store(ANNOTATION_STORE)
+
+def _make_materializer(store, setting):
+    if store is None or not setting:
+        return None
+    else:
+        return materialize.Materializer(store, formats)
+
+materializer = _make_materializer(annotation_store, MATERIALIZE)
+
+def _make_admission_control(setting):
+    if not setting:
+        return None
+    else:
+        return admission.AdmissionControl()
+
+admission_control = _make_admission_control(ADMISSION_CONTROL)
+
+_mimetype_to_format_name = dict((m, f.format_name) for f in formats
+                                for m in f.mimetypes)
+
+def _response_key():
+    """Return key identifying the representation of the response."""
+    mimetype = negotiate_mimetype()
+    if mimetype is None:
+        return None
+    # The query string can select e.g. a page of HTML output.
+    return '%s %s %s %s' % (mimetype, jsonld_format._select_response_form(),
+                            jsoncodec.prettyprint(),
+                            flask.request.query_string)
+
+def cache_conversion(input_digest):
+    """Cache responses of view if conversion cache is enabled."""
+    if conversion_cache is None:
+        return lambda view: view
+    return conversion_cache.cached(input_digest, _response_key)
+
+def admission_controlled(view):
+    """Limit conversions by view if admission control is enabled."""
+    if admission_control is None:
+        return view
+    return admission_control.controlled(view)
+
+def _echo_digest():
+    request = flask.request
+    if (admission_control is not None and
+        admission_control.declared_too_large(request)):
+        # Rejected by admission control without reading the body.
+        return None
+    data, mimetype, charset = tools.get_request_data(request)
+    return convcache.digest(data, mimetype, charset, request.base_url)
+
+def _proxy_digest(url):
+    # Keep the upstream response for proxy() to avoid getting it twice.
+    with timing.stage('fetch'):
+        response = restoaclient.fetch(url)
+    flask.g.upstream_response = response
+    version = response.headers.get('ETag')
+    if version is None:
+        version = response.content
+    return convcache.digest(url, version, flask.request.url_root)
 
 @app.route('/echo/', methods=['PUT', 'POST'])
+@cache_conversion(_echo_digest)
+@admission_controlled
 @render_resource
 def echo():
     """Echo back received data, possibly in a different representation."""
-    data, mimetype, charset = tools.get_request_data(flask.request)
-    data = parse_data(data, mimetype, charset)
+    with timing.stage('read'):
+        data, mimetype, charset = tools.get_request_data(flask.request)
+    try:
+        with timing.stage('parse'):
+            data = parse_data(data, mimetype, charset)
+    except NotImplementedError, e:
+        flask.abort(415, str(e))
+    except (ValueError, jsonld.JsonLdError), e:
+        flask.abort(400, str(e))
     # TODO: check in which cases expansion is required.
     data = oajson.expand(data, base=flask.request.base_url)
     return { 'data': data }
 
+@render_resource
+def _render_batch(data):
+    return { 'data': data }
+
+@app.route('/batch/', methods=['PUT', 'POST'])
+@admission_controlled
+def convert_batch():
+    """Convert a batch of annotations given as NDJSON or a JSON array.
+
+    Items that are strings are parsed as the MIME type given by the
+    "type" query parameter (default JSON-LD).
+    """
+    start = time.time()
+    with timing.stage('read'):
+        data, mimetype, charset = tools.get_request_data(flask.request)
+    if not batch.is_batch_mimetype(mimetype):
+        flask.abort(415)
+    item_mimetype = flask.request.args.get('type', 'application/ld+json')
+    items = batch.read_items(data, mimetype, charset)
+    try:
+        data, count = batch.convert(items, parse_data, item_mimetype,
+                                    base=flask.request.base_url)
+    except (ValueError, jsonld.JsonLdError), e:
+        flask.abort(400, str(e))
+    except NotImplementedError, e:
+        flask.abort(415, str(e))
+    elapsed = time.time() - start
+    response = flask.make_response(_render_batch(data))
+    response.headers[batch.SIZE_HEADER] = str(count)
+    response.headers[batch.TIME_HEADER] = '%.6f' % elapsed
+    if elapsed > 0:
+        response.headers[batch.RATE_HEADER] = '%.1f' % (count / elapsed)
+    return response
+
+@render_resource
+def _render_annotations(data):
+    # The annotations are already a page, don't paginate HTML further.
+    return { 'data': data, 'options': { 'offset': 0, 'limit': None } }
+
+def _int_arg(name, default):
+    value = flask.request.args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        value = -1
+    if value < 0:
+        flask.abort(400, '%s must be a non-negative integer' % name)
+    return value
+
+def _iri_arg(name):
+    # Allow e.g. motivation=commenting for Open Annotation terms.
+    value = flask.request.args.get(name)
+    if value is not None and ':' not in value:
+        value = annotationstore.OA + value
+    return value
+
+@app.route('/annotations/', methods=['GET'])
+def get_annotations():
+    """Return annotations in the store.
+
+    The query parameters "target", "body" and "motivation" restrict
+    the annotations to those with the given IRIs, "id" to the one with
+    the given @id, and "offset" and "limit" select a page. A Link
+    header gives the next page, if any.
+    """
+    if annotation_store is None:
+        flask.abort(404)
+    offset = _int_arg('offset', 0)
+    limit = min(_int_arg('limit', annotationstore.PAGE_SIZE),
+                annotationstore.MAX_PAGE_SIZE)
+    id_ = flask.request.args.get('id')
+    if id_ is not None and materializer is not None:
+        response = _rendition_response(id_)
+        if response is not None:
+            return response
+    with timing.stage('query'):
+        if id_ is not None:
+            data = [annotation_store.get(id_)] if offset == 0 else []
+            data = [d for d in data if d is not None]
+        else:
+            # Get one extra to know if there is a next page.
+            data = annotation_store.query(_iri_arg('target'),
+                                          _iri_arg('body'),
+                                          _iri_arg('motivation'),
+                                          offset, limit + 1)
+    has_next = len(data) > limit
+    response = flask.make_response(_render_annotations(data[:limit]))
+    if has_next:
+        args = flask.request.args.to_dict()
+        args.update(offset=offset + limit, limit=limit)
+        response.headers['Link'] = '<%s>; rel="next"' % (
+            flask.url_for('get_annotations', **args))
+    return response
+
+# Query parameters that do not prevent serving stored renditions.
+_RENDITION_ARGS = set(['id', 'format', jsoncodec.PRETTYPRINT_PARAMETER])
+
+def _rendition_response(id_):
+    """Return response with stored rendition of annotation, or None."""
+    if not set(flask.request.args) <= _RENDITION_ARGS:
+        return None
+    mimetype = negotiate_mimetype()
+    format_name = _mimetype_to_format_name.get(mimetype)
+    if format_name is None:
+        return None
+    with timing.stage('rendition'):
+        rendition = materializer.get(id_, format_name,
+                                     jsonld_format._select_response_form(),
+                                     jsoncodec.prettyprint())
+    if rendition is None:
+        return None
+    return flask.Response(rendition[1], content_type=mimetype)
+
+@app.route('/annotations/', methods=['POST'])
+@admission_controlled
+def add_annotations():
+    """Add annotations to the store, returning the stored annotations."""
+    if annotation_store is None:
+        flask.abort(404)
+    with timing.stage('read'):
+        data, mimetype, charset = tools.get_request_data(flask.request)
+    try:
+        with timing.stage('parse'):
+            data = parse_data(data, mimetype, charset)
+    except NotImplementedError, e:
+        flask.abort(415, str(e))
+    except (ValueError, jsonld.JsonLdError), e:
+        flask.abort(400, str(e))
+    data = oajson.expand(data, base=flask.request.base_url)
+    with timing.stage('store'):
+        ids = annotation_store.add(data)
+    if materializer is not None:
+        materializer.written(ids)
+    response = flask.make_response(_render_annotations(data))
+    response.status_code = 201
+    if len(ids) == 1:
+        response.headers['Location'] = flask.url_for('get_annotations',
+                                                     id=ids[0])
+    return response
+
+def _is_html(mimetype):
+    if mimetype is None:
+        return False
+    try:
+        return mediatype.parse(mimetype).essence == 'text/html'
+    except ValueError:
+        return False
+
 @app.route('/proxy/<path:url>')
+@cache_conversion(_proxy_digest)
 @render_resource
 def proxy(url):
     """Mediate communication with other server."""
-    data, mimetype = restoaclient.get(url)
-    # TODO: parse mimetype properly
-    if 'text/html' in mimetype:
+    upstream_response = flask.g.pop('upstream_response', None)
+    with timing.stage('fetch'):
+        data, mimetype = restoaclient.get(url, upstream_response)
+    if _is_html(mimetype):
         # Don't try to parse HTLM, but just pass it through.
         return { 'data': data, 'options': { 'passthrough': True } }
     else:
         data = oajson.expand(data, base=tools.base_url(url))
         # rewrite URLs in data so that they pass through this proxy.
         proxyurl = flask.url_for('proxy', url='')
-        data = jsonldproxy.rewrite_urls(data, proxyurl)
-        return { 'data': data }
+        if PROXY_SAME_ORIGIN_ONLY:
+            origin = jsonldproxy.origin(url)
+        else:
+            origin = None
+        rewriter = jsonldproxy.Rewriter(proxyurl, origin)
+        with timing.stage('rewrite'):
+            return { 'data': rewriter(data) }
+
+@app.errorhandler(convpool.ConversionTimeout)
+def _conversion_timeout(error):
+    # Reported as overload, as for requests rejected by admission control.
+    return ServiceUnavailable(str(error),
+                              retry_after=admission.RETRY_AFTER).get_response()
+
+@app.errorhandler(convpool.ConversionError)
+def _conversion_error(error):
+    app.logger.error('Conversion failed in worker:\n%s', error)
+    return InternalServerError('conversion failed in worker: %s' %
+                               error).get_response()
+
+@app.route('/metrics')
+def metrics():
+    """Return stage timing histograms in Prometheus text format."""
+    return flask.Response(timing.metrics(),
+                          content_type=timing.METRICS_CONTENT_TYPE)
+
+@app.before_request
+def _start_timing():
+    if timing.ENABLED:
+        flask.g.request_start = time.time()
+
+@app.after_request
+def _add_server_timing(response):
+    start = flask.g.get('request_start')
+    if start is not None:
+        timings = flask.g.get('stage_timings', [])
+        timings = timings + [('total', time.time() - start)]
+        response.headers['Server-Timing'] = \
+            timing.server_timing_header(timings)
+    return response
+
+@app.teardown_request
+def _record_request_time(exception=None):
+    start = flask.g.get('request_start')
+    if start is not None:
+        # Includes the time to generate streamed responses.
+        timing.record('request', time.time() - start)
 
 def main(argv):
+    if conversion_pool is not None:
+        # Start workers before the server starts threads.
+        conversion_pool.start()
+    if materializer is not None:
+        materializer.start()
     app.run(debug=DEBUG)
 
 if __name__ == '__main__':
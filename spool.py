@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+"""Spooling of large request bodies to memory-mapped temporary files.
+
+Request bodies larger than MAX_MEMORY_SIZE are copied to a temporary
+file instead of being read into a string, and given to the parsers as
+a MappedFile. A MappedFile supports both the file interface (read(),
+readline() and iteration over lines) and slicing, and maps only a
+window of WINDOW_SIZE bytes of the file into memory at a time, so that
+the memory used for reading a body is bounded by these settings
+instead of growing with its size.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import os
+import mmap
+import tempfile
+
+# Request bodies up to this size, in bytes, are read into memory.
+MAX_MEMORY_SIZE = 16 * 1024 * 1024
+
+# Size of the part of a spooled body mapped into memory at a time, in
+# bytes. Larger reads are copied from the file without mapping.
+WINDOW_SIZE = 16 * 1024 * 1024
+
+# Directory for temporary files, or None for the system default.
+DIRECTORY = None
+
+# Number of bytes to copy from the request at a time.
+CHUNK_SIZE = 64 * 1024
+
+class TooLargeError(Exception):
+    """Raised when a body exceeds the maximum size given for it."""
+
+    def __init__(self, max_size):
+        Exception.__init__(self, 'body larger than %d bytes' % max_size)
+        self.max_size = max_size
+
+class MappedFile(object):
+    """Read-only file accessed through a memory-mapped window.
+
+    Not safe for use by multiple threads at once.
+    """
+
+    def __init__(self, file_, window_size=None):
+        """Initialize mapped file.
+
+        Args:
+            file_: file object opened for reading. Closed by close().
+            window_size: maximum number of bytes to map into memory at
+                a time, or None for WINDOW_SIZE.
+        """
+        if window_size is None:
+            window_size = WINDOW_SIZE
+        self.file = file_
+        self.size = os.fstat(file_.fileno()).st_size
+        self.window_size = max(window_size, mmap.ALLOCATIONGRANULARITY)
+        self.pos = 0
+        self._map = None
+        self._map_start = 0
+
+    def __len__(self):
+        return self.size
+
+    def _mapped(self, start, stop):
+        """Return (mmap, offset of start in it) covering start:stop."""
+        m = self._map
+        if (m is None or start < self._map_start or
+            stop > self._map_start + len(m)):
+            if m is not None:
+                m.close()
+            offset = start - start % mmap.ALLOCATIONGRANULARITY
+            length = min(max(self.window_size, stop - offset),
+                         self.size - offset)
+            m = self._map = mmap.mmap(self.file.fileno(), length,
+                                      access=mmap.ACCESS_READ, offset=offset)
+            self._map_start = offset
+        return m, start - self._map_start
+
+    def _slice(self, start, stop):
+        """Return string of bytes start:stop of file."""
+        if stop <= start:
+            return ''
+        if stop - start > self.window_size:
+            self.file.seek(start)
+            return self.file.read(stop - start)
+        m, offset = self._mapped(start, stop)
+        return m[offset:offset + stop - start]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step != 1:
+                raise ValueError('slice step not supported')
+            return self._slice(start, stop)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('index out of range')
+        return self._slice(index, index + 1)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            stop = self.size
+        else:
+            stop = min(self.pos + size, self.size)
+        data = self._slice(self.pos, stop)
+        self.pos += len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size is None or size < 0:
+            end = self.size
+        else:
+            end = min(self.pos + size, self.size)
+        start = self.pos
+        while start < end:
+            stop = min(start + self.window_size, end)
+            m, offset = self._mapped(start, stop)
+            found = m.find('\n', offset, offset + stop - start)
+            if found >= 0:
+                end = self._map_start + found + 1
+                break
+            start = stop
+        return self.read(end - self.pos)
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.file.close()
+
+def spool(stream, max_memory_size=None, max_size=None):
+    """Read stream into a string, or a MappedFile if it is large.
+
+    Args:
+        stream: file-like object to read.
+        max_memory_size: maximum size of data to return as a string,
+            or None for MAX_MEMORY_SIZE.
+        max_size: maximum size of data to read, or None for no limit.
+
+    Raises:
+        TooLargeError: if the stream has more than max_size bytes.
+            Reading stops as soon as this is known.
+    """
+    if max_memory_size is None:
+        max_memory_size = MAX_MEMORY_SIZE
+    chunks, size = [], 0
+    while size <= max_memory_size:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return ''.join(chunks)
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise TooLargeError(max_size)
+        chunks.append(chunk)
+    # The file is deleted when closed, at the latest when the
+    # MappedFile is garbage collected.
+    file_ = tempfile.TemporaryFile(dir=DIRECTORY)
+    try:
+        file_.writelines(chunks)
+        del chunks
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise TooLargeError(max_size)
+            file_.write(chunk)
+        file_.flush()
+    except:
+        file_.close()
+        raise
+    return MappedFile(file_)
+
+def request_body(request, max_size=None):
+    """Return body of Flask request as a string or a MappedFile.
+
+    The body is read once per request; further calls return the same
+    object, positioned at the start.
+
+    Args:
+        request: Flask request.
+        max_size: maximum size of the body, or None for no limit.
+
+    Raises:
+        TooLargeError: if the body is larger than max_size. Bodies
+            without a Content-Length are read only until this is known.
+    """
+    body = getattr(request, '_spooled_body', None)
+    if body is None:
+        length = request.content_length
+        if max_size is not None and length is not None and length > max_size:
+            raise TooLargeError(max_size)
+        if length is not None and length <= MAX_MEMORY_SIZE:
+            body = request.get_data()
+        else:
+            body = spool(request.stream, max_size=max_size)
+        request._spooled_body = body
+    else:
+        if max_size is not None and len(body) > max_size:
+            raise TooLargeError(max_size)
+        if isinstance(body, MappedFile):
+            body.seek(0)
+    return body
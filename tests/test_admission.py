@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import spool
+import admission
+
+NQUADS = 'application/n-quads'
+
+class _Chunked(object):
+    """Sliceable non-string data, as spool.MappedFile."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+class _Endless(object):
+    """Request stream of endless data, counting the bytes read."""
+
+    def __init__(self):
+        self.size = 0
+
+    def read(self, size=-1):
+        self.size += size
+        return 'x' * size
+
+class EstimateCostTest(unittest.TestCase):
+
+    def test_markers(self):
+        self.assertEqual(admission.estimate_cost('a\nb\nc', NQUADS), 2)
+        self.assertEqual(admission.estimate_cost('<a> ; <b> , <c> .\n',
+                                                 'text/turtle'), 3)
+
+    def test_other_mimetype(self):
+        cost = admission.estimate_cost('x' * 1000, 'text/plain')
+        self.assertEqual(cost, 1000 // admission.DEFAULT_BYTES_PER_COST)
+
+    def test_chunks(self):
+        data = '<a> .\n<b> ; <c> , <d> .\n' * 7
+        chunk_size = admission.SCAN_CHUNK_SIZE
+        try:
+            for size in (1, 2, 3, 5, 100):
+                admission.SCAN_CHUNK_SIZE = size
+                for mimetype in (NQUADS, 'text/turtle',
+                                 'application/rdf+xml'):
+                    self.assertEqual(
+                        admission.estimate_cost(_Chunked(data), mimetype),
+                        admission.estimate_cost(data, mimetype),
+                        (size, mimetype))
+        finally:
+            admission.SCAN_CHUNK_SIZE = chunk_size
+
+class WorkQueueTest(unittest.TestCase):
+
+    def _acquire_later(self, queue, cost, results):
+        """Start thread acquiring cost, appending (cost, result), and
+        wait for it to queue."""
+        waiting = len(queue._waiting)
+        thread = threading.Thread(
+            target=lambda: results.append((cost, queue.acquire(cost))))
+        thread.start()
+        while len(queue._waiting) == waiting:
+            time.sleep(0.001)
+        return thread
+
+    def test_acquire_release(self):
+        queue = admission.WorkQueue(2, 10, 1, 1.0)
+        self.assertTrue(queue.acquire(4))
+        self.assertTrue(queue.acquire(6))
+        self.assertEqual((queue.in_flight, queue.in_flight_cost), (2, 10))
+        queue.release(4)
+        queue.release(6)
+        self.assertEqual((queue.in_flight, queue.in_flight_cost), (0, 0))
+
+    def test_cost_over_capacity_when_idle(self):
+        queue = admission.WorkQueue(2, 10, 1, 0.01)
+        self.assertTrue(queue.acquire(100))
+        self.assertFalse(queue.acquire(1))
+
+    def test_max_in_flight(self):
+        queue = admission.WorkQueue(2, 10, 0, 0.01)
+        self.assertTrue(queue.acquire(0))
+        self.assertTrue(queue.acquire(0))
+        self.assertFalse(queue.acquire(0))
+
+    def test_timeout(self):
+        queue = admission.WorkQueue(1, 10, 1, 0.05)
+        queue.acquire(1)
+        start = time.time()
+        self.assertFalse(queue.acquire(1))
+        self.assertGreaterEqual(time.time() - start, 0.05)
+        self.assertEqual(len(queue._waiting), 0)
+
+    def test_queue_full(self):
+        queue = admission.WorkQueue(1, 10, 1, 1.0)
+        queue.acquire(1)
+        results = []
+        thread = self._acquire_later(queue, 1, results)
+        start = time.time()
+        self.assertFalse(queue.acquire(1))
+        self.assertLess(time.time() - start, 0.5)
+        queue.release(1)
+        thread.join()
+        self.assertEqual(results, [(1, True)])
+
+    def test_release_wakes_waiter(self):
+        queue = admission.WorkQueue(1, 10, 1, 5.0)
+        queue.acquire(1)
+        results = []
+        thread = self._acquire_later(queue, 2, results)
+        self.assertEqual(results, [])
+        queue.release(1)
+        thread.join()
+        self.assertEqual(results, [(2, True)])
+        self.assertEqual(queue.in_flight_cost, 2)
+
+    def test_arrival_order(self):
+        # A small request does not overtake a large one waiting first.
+        queue = admission.WorkQueue(3, 10, 2, 5.0)
+        queue.acquire(5)
+        results = []
+        threads = [self._acquire_later(queue, 8, results),
+                   self._acquire_later(queue, 1, results)]
+        self.assertEqual(results, [])
+        queue.release(5)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(8, True), (1, True)])
+
+class AdmissionControlTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = admission.WorkQueue(1, 100, 0, 0.01)
+        self.control = admission.AdmissionControl(
+            self.queue, {NQUADS: 20}, 10, 3)
+        self.app = flask.Flask(__name__)
+
+        @self.app.route('/', methods=['POST'])
+        @self.control.controlled
+        def view():
+            return 'ok'
+
+    def _post(self, data, mimetype=NQUADS, **kwargs):
+        return self.app.test_client().post('/', data=data,
+                                           content_type=mimetype, **kwargs)
+
+    def test_admitted(self):
+        response = self._post('<s:> <p:> <o:> .\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.queue.in_flight, 0)
+
+    def test_too_large(self):
+        self.assertEqual(self._post('x' * 21).status_code, 413)
+        self.assertEqual(self._post('x' * 11, 'text/plain').status_code, 413)
+        self.assertEqual(self._post('x' * 20).status_code, 200)
+
+    def test_too_large_without_content_length(self):
+        stream = _Endless()
+        response = self._post(None, environ_overrides={
+            'wsgi.input': stream, 'wsgi.input_terminated': True,
+            'CONTENT_LENGTH': ''})
+        self.assertEqual(response.status_code, 413)
+        self.assertLessEqual(stream.size, 20 + spool.CHUNK_SIZE)
+        self.assertEqual(self.queue.in_flight, 0)
+
+    def test_too_costly(self):
+        self.assertEqual(self._post('\n' * 4).status_code, 413)
+        self.assertEqual(self.queue.in_flight, 0)
+
+    def test_busy(self):
+        self.queue.acquire(1)
+        response = self._post('\n')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'],
+                         str(admission.RETRY_AFTER))
+        self.queue.release(1)
+        self.assertEqual(self._post('\n').status_code, 200)
+
+    def test_declared_too_large(self):
+        with self.app.test_request_context(
+                method='POST', data='x', content_type=NQUADS,
+                environ_overrides={'CONTENT_LENGTH': '21'}):
+            self.assertTrue(self.control.declared_too_large(flask.request))
+        with self.app.test_request_context(
+                method='POST', data='x', content_type=NQUADS):
+            self.assertFalse(self.control.declared_too_large(flask.request))
+
+    def test_per_client(self):
+        control = admission.AdmissionControl(
+            admission.WorkQueue(2, 100, 0, 0.01), max_per_client=1,
+            client_header='X-Forwarded-For')
+        self.assertTrue(control._add_client('a'))
+        self.assertFalse(control._add_client('a'))
+        self.assertTrue(control._add_client('b'))
+        control._remove_client('a')
+        self.assertTrue(control._add_client('a'))
+
+    def test_client(self):
+        control = admission.AdmissionControl(client_header='X-Forwarded-For')
+        with self.app.test_request_context(
+                headers={'X-Forwarded-For': '1.2.3.4, 5.6.7.8'},
+                environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+            self.assertEqual(control.client(flask.request), '5.6.7.8')
+            self.assertEqual(self.control.client(flask.request), '10.0.0.1')
+        with self.app.test_request_context(
+                environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+            self.assertEqual(control.client(flask.request), '10.0.0.1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import annotationstore
+
+from annotationstore import (HAS_TARGET, HAS_BODY, HAS_SOURCE,
+                             MOTIVATED_BY, OA)
+
+EX = 'http://example.org/'
+
+def _annotation(id_, target, body=None, motivation=None, source=None):
+    node = {'@id': id_, '@type': [OA + 'Annotation']}
+    if source is not None:
+        node[HAS_TARGET] = [{'@id': target, HAS_SOURCE: [{'@id': source}]}]
+    else:
+        node[HAS_TARGET] = [{'@id': target}]
+    if body is not None:
+        node[HAS_BODY] = [{'@id': body}]
+    if motivation is not None:
+        node[MOTIVATED_BY] = [{'@id': motivation}]
+    return node
+
+def _ids(annotations):
+    return [a['@id'] for a in annotations]
+
+class IndexTermsTest(unittest.TestCase):
+
+    def test_terms(self):
+        node = _annotation(EX + 'a', EX + 't', EX + 'b', OA + 'commenting',
+                           source=EX + 'doc')
+        node[HAS_BODY].append({'@id': '_:b1'})
+        self.assertEqual(annotationstore.index_terms(node), [
+            ('body', EX + 'b'),
+            ('motivation', OA + 'commenting'),
+            ('target', EX + 'doc'),
+            ('target', EX + 't'),
+        ])
+
+class AnnotationStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = annotationstore.AnnotationStore()
+        self.store.add([
+            _annotation(EX + '1', EX + 't1', EX + 'b1', OA + 'commenting'),
+            _annotation(EX + '2', EX + 't2#p', EX + 'b1', OA + 'tagging',
+                        source=EX + 't2'),
+            _annotation(EX + '3', EX + 't2', EX + 'b2', OA + 'commenting'),
+        ])
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_get(self):
+        self.assertEqual(self.store.get(EX + '1')[HAS_BODY],
+                         [{'@id': EX + 'b1'}])
+        self.assertIsNone(self.store.get(EX + 'x'))
+        self.assertEqual(len(self.store), 3)
+
+    def test_query(self):
+        self.assertEqual(_ids(self.store.query()),
+                         [EX + '1', EX + '2', EX + '3'])
+        self.assertEqual(_ids(self.store.query(target=EX + 't2')),
+                         [EX + '2', EX + '3'])
+        self.assertEqual(_ids(self.store.query(body=EX + 'b1',
+                                               motivation=OA + 'commenting')),
+                         [EX + '1'])
+        self.assertEqual(self.store.query(target=EX + 't1', body=EX + 'b2'),
+                         [])
+
+    def test_paging(self):
+        self.assertEqual(_ids(self.store.query(offset=1, limit=1)),
+                         [EX + '2'])
+        self.assertEqual(_ids(self.store.query(target=EX + 't2', offset=1)),
+                         [EX + '3'])
+
+    def test_replace(self):
+        self.store.add(_annotation(EX + '1', EX + 't3'))
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.query(target=EX + 't1'), [])
+        self.assertEqual(_ids(self.store.query(target=EX + 't3')), [EX + '1'])
+
+    def test_new_ids(self):
+        ids = self.store.add({'@graph': [_annotation('_:a', EX + 't4'),
+                                         {HAS_TARGET: [{'@id': EX + 't4'}]}]})
+        self.assertEqual(len(set(ids)), 2)
+        self.assertTrue(all(i.startswith('urn:uuid:') for i in ids))
+        self.assertEqual(_ids(self.store.query(target=EX + 't4')), ids)
+
+    def test_delete(self):
+        self.assertTrue(self.store.delete(EX + '2'))
+        self.assertFalse(self.store.delete(EX + '2'))
+        self.assertEqual(_ids(self.store.query(target=EX + 't2')), [EX + '3'])
+
+    def test_renditions(self):
+        serialized = self.store.get_serialized(EX + '1')
+        self.assertTrue(self.store.set_rendition(EX + '1', 'k', 'text/plain',
+                                                 'x\0y', serialized))
+        self.assertEqual(self.store.get_rendition(EX + '1', 'k'),
+                         ('text/plain', 'x\0y'))
+        self.assertIsNone(self.store.get_rendition(EX + '1', 'j'))
+        # Not stored for changed annotations, and removed on change.
+        self.assertFalse(self.store.set_rendition(EX + '1', 'j', 'text/plain',
+                                                  'z', '{}'))
+        self.store.add(_annotation(EX + '1', EX + 't3'))
+        self.assertIsNone(self.store.get_rendition(EX + '1', 'k'))
+
+class FileStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persistent(self):
+        path = os.path.join(self.directory, 'annotations.db')
+        store = annotationstore.AnnotationStore(path)
+        store.add(_annotation(EX + '1', EX + 't1'))
+        store.close()
+        store = annotationstore.AnnotationStore(path)
+        self.assertEqual(_ids(store.query(target=EX + 't1')), [EX + '1'])
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import batch
+
+def _parse_data(data, mimetype=None):
+    raise ValueError('cannot parse %s' % data)
+
+class ReadItemsTest(unittest.TestCase):
+
+    def test_ndjson(self):
+        data = '{"a": 1}\n\n{"b": 2}\n'
+        self.assertEqual(list(batch.read_items(data, 'application/x-ndjson')),
+                         [{'a': 1}, {'b': 2}])
+
+    def test_ndjson_file(self):
+        lines = iter(['{"a": 1}\n', '\n', '{"b": 2}\n'])
+        self.assertEqual(list(batch.read_items(lines, 'application/x-ndjson')),
+                         [{'a': 1}, {'b': 2}])
+
+    def test_json_array(self):
+        data = '[{"a": 1}, "x"]'
+        self.assertEqual(list(batch.read_items(data, 'application/json')),
+                         [{'a': 1}, 'x'])
+
+    def test_other_mimetype(self):
+        with self.assertRaises(ValueError):
+            list(batch.read_items('', 'text/plain'))
+
+class ConvertTest(unittest.TestCase):
+
+    def test_blank_nodes_prefixed(self):
+        items = [{'@id': '_:x', 'http://example.org/p': 'a'},
+                 {'@id': '_:x', 'http://example.org/p': 'b'}]
+        data, count = batch.convert(items, _parse_data)
+        self.assertEqual(count, 2)
+        self.assertEqual([n['@id'] for n in data], ['_:b1_x', '_:b2_x'])
+
+    def test_invalid_item(self):
+        items = [{'@id': 'http://example.org/a'}, {'@id': 5}]
+        with self.assertRaises(batch.ItemError) as cm:
+            batch.convert(items, _parse_data)
+        self.assertEqual(cm.exception.index, 2)
+        self.assertTrue(str(cm.exception).startswith('item 2: '))
+
+    def test_unparseable_item(self):
+        with self.assertRaises(batch.ItemError) as cm:
+            batch.convert([{'@id': 'http://example.org/a'}, 'x'],
+                          _parse_data)
+        self.assertEqual(cm.exception.index, 2)
+        self.assertIsInstance(cm.exception, ValueError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyld import jsonld
+
+import contextcache
+
+CONTEXT = {'@context': {'ex': 'http://example.org/', 'p': 'ex:p'}}
+
+class ActiveContextCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = contextcache.ActiveContextCache(size=2)
+
+    def test_get_set(self):
+        active = {'mappings': {}}
+        self.assertIsNone(self.cache.get(active, {'a': 1}))
+        self.cache.set(active, {'a': 1}, {'result': 1})
+        # Keyed by content, not identity.
+        self.assertEqual(self.cache.get({'mappings': {}}, {'a': 1}),
+                         {'result': 1})
+        self.assertEqual(self.cache.stats(), {'size': 1, 'maxsize': 2,
+                                              'hits': 1, 'misses': 1})
+
+    def test_lru_eviction(self):
+        for i in range(2):
+            self.cache.set({}, {'a': i}, {'result': i})
+        self.cache.get({}, {'a': 0})
+        self.cache.set({}, {'a': 2}, {'result': 2})
+        self.assertIsNotNone(self.cache.get({}, {'a': 0}))
+        self.assertIsNone(self.cache.get({}, {'a': 1}))
+        self.assertIsNotNone(self.cache.get({}, {'a': 2}))
+
+    def test_cached_result_as_active_context(self):
+        result = {'mappings': {'p': 1}, 'inverse': None}
+        self.cache.set({}, {'a': 1}, result)
+        # PyLD adds the inverse context lazily; the key is unchanged.
+        result['inverse'] = {'x': 1}
+        self.cache.set(result, {'b': 1}, {'result': 2})
+        self.assertEqual(self.cache.get(dict(result, inverse=None),
+                                         {'b': 1}), {'result': 2})
+
+    def test_clear(self):
+        self.cache.set({}, {'a': 1}, {'result': 1})
+        self.cache.get({}, {'a': 1})
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), {'size': 0, 'maxsize': 2,
+                                              'hits': 0, 'misses': 0})
+
+    def test_install(self):
+        previous = jsonld._cache.get('activeCtx')
+        try:
+            self.assertIs(contextcache.install(self.cache), self.cache)
+            document = dict(CONTEXT, p='v')
+            expected = jsonld.expand(document)
+            self.assertEqual(jsonld.expand(document), expected)
+            self.assertGreater(self.cache.hits, 0)
+        finally:
+            jsonld._cache['activeCtx'] = previous
+
+if __name__ == '__main__':
+    unittest.main()
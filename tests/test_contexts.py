@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import copy
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyld import jsonld
+
+import contexts
+
+OA_URL = 'http://www.w3.org/ns/oa-context-20130208.json'
+RESTOA_URL = 'http://nlplab.org/ns/restoa-context-20150307.json'
+
+# Module-level registries changed by registering contexts.
+_REGISTRIES = ['url_to_context', '_fingerprint_to_url', '_canonical_to_url',
+               '_remembered_lookups']
+
+class RegistryTestCase(unittest.TestCase):
+    """Test case restoring the context registries after each test."""
+
+    def setUp(self):
+        self._registries = dict((name, dict(getattr(contexts, name)))
+                                for name in _REGISTRIES)
+
+    def tearDown(self):
+        for name, saved in self._registries.items():
+            registry = getattr(contexts, name)
+            registry.clear()
+            registry.update(saved)
+
+class GetUrlForContextTest(RegistryTestCase):
+
+    def test_url_unchanged(self):
+        self.assertEqual(contexts._get_url_for_context(RESTOA_URL),
+                         RESTOA_URL)
+
+    def test_known_context(self):
+        context = copy.deepcopy(contexts.url_to_context[RESTOA_URL])
+        self.assertEqual(contexts._get_url_for_context(context['@context']),
+                         RESTOA_URL)
+
+    def test_earlier_registration_takes_precedence(self):
+        # The OA context is registered under two URLs.
+        context = contexts.url_to_context[OA_URL]['@context']
+        url = contexts._get_url_for_context(copy.deepcopy(context))
+        self.assertIn(url, (OA_URL, 'http://www.w3.org/ns/oa.jsonld'))
+        self.assertEqual(contexts._get_url_for_context(copy.deepcopy(context)),
+                         url)
+
+    def test_key_order_ignored(self):
+        context = contexts.url_to_context[RESTOA_URL]['@context']
+        reordered = OrderedDict(reversed(sorted(context.items())))
+        self.assertEqual(contexts._get_url_for_context(reordered), RESTOA_URL)
+
+    def test_unknown_context_unchanged(self):
+        context = { 'ex': 'http://example.org/x#' }
+        self.assertIs(contexts._get_url_for_context(context), context)
+        # Also when the lookup is remembered.
+        self.assertIs(contexts._get_url_for_context(context), context)
+
+    def test_modified_context_unchanged(self):
+        context = copy.deepcopy(contexts.url_to_context[RESTOA_URL])
+        context = context['@context']
+        context['ex'] = 'http://example.org/x#'
+        self.assertIs(contexts._get_url_for_context(context), context)
+
+    def test_context_objects_to_urls_leaves_unknown_context(self):
+        document = { '@context': { 'ex': 'http://example.org/x#' },
+                     '@id': 'ex:a' }
+        expected = copy.deepcopy(document)
+        self.assertEqual(contexts.context_objects_to_urls(document), expected)
+
+    def test_registered_context(self):
+        url = 'http://example.org/test-context.jsonld'
+        context = { '@context': { 'test': 'http://example.org/test#' } }
+        contexts.register_context(url, context)
+        self.assertEqual(contexts._get_url_for_context(
+                { 'test': 'http://example.org/test#' }), url)
+
+class StoredContextTest(RegistryTestCase):
+
+    URL = 'http://example.org/stored-context.jsonld'
+    CONTEXT = { '@context': { 'stored': 'http://example.org/stored#' } }
+
+    def setUp(self):
+        RegistryTestCase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.settings = contexts.CONTEXT_DIRECTORY, contexts.OFFLINE
+        contexts.CONTEXT_DIRECTORY = self.directory
+        contexts.OFFLINE = True
+
+    def tearDown(self):
+        contexts.CONTEXT_DIRECTORY, contexts.OFFLINE = self.settings
+        shutil.rmtree(self.directory)
+        RegistryTestCase.tearDown(self)
+
+    def _write(self, url, data):
+        with open(contexts.context_filename(url), 'w') as f:
+            f.write(data)
+
+    def test_register_invalid_context(self):
+        self.assertRaises(ValueError, contexts.register_context, self.URL,
+                          { 'stored': 'http://example.org/stored#' })
+        self.assertNotIn(self.URL, contexts.url_to_context)
+
+    def test_load_document(self):
+        self._write(self.URL, json.dumps(self.CONTEXT))
+        document = contexts.load_document(self.URL)
+        self.assertEqual(document['document'], self.CONTEXT)
+        self.assertIn(self.URL, contexts.url_to_context)
+
+    def test_load_document_invalid(self):
+        # Retrieved again (here failing, as offline) instead of
+        # registering the file.
+        for data in ('{"stored": "http://example.org/stored#"}', '[1]',
+                     'invalid'):
+            self._write(self.URL, data)
+            self.assertRaises(jsonld.JsonLdError, contexts.load_document,
+                              self.URL)
+            self.assertNotIn(self.URL, contexts.url_to_context)
+
+    def test_load_context_directory(self):
+        other = 'http://example.org/other.jsonld'
+        self._write(self.URL, json.dumps(self.CONTEXT))
+        self._write(other, '{"other": "http://example.org/other#"}')
+        self.assertEqual(contexts.load_context_directory(), [self.URL])
+        self.assertNotIn(other, contexts.url_to_context)
+
+    def test_concurrent_store(self):
+        threads = [threading.Thread(target=contexts._store_context,
+                                    args=(self.URL, self.CONTEXT))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(contexts.context_filename(
+                             self.URL))])
+        with open(contexts.context_filename(self.URL)) as f:
+            self.assertEqual(json.load(f), self.CONTEXT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import convcache
+
+class _Chunked(object):
+    """Sliceable non-string data, as spool.MappedFile."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+class DigestTest(unittest.TestCase):
+
+    def test_parts(self):
+        self.assertEqual(convcache.digest('a', 'b'),
+                         convcache.digest('a', 'b'))
+        self.assertNotEqual(convcache.digest('ab', ''),
+                            convcache.digest('a', 'b'))
+        self.assertEqual(convcache.digest(u'\xe9', None),
+                         convcache.digest(u'\xe9'.encode('utf-8'), ''))
+
+    def test_chunked(self):
+        data = 'x' * 100 + 'y'
+        chunk_size = convcache.DIGEST_CHUNK_SIZE
+        try:
+            for size in (1, 7, 1000):
+                convcache.DIGEST_CHUNK_SIZE = size
+                self.assertEqual(convcache.digest(_Chunked(data), 'a'),
+                                 convcache.digest(data, 'a'))
+        finally:
+            convcache.DIGEST_CHUNK_SIZE = chunk_size
+
+class MemoryBackendTest(unittest.TestCase):
+
+    def test_eviction(self):
+        backend = convcache.MemoryBackend(max_bytes=10)
+        backend.set('a', ('text/plain', 'x' * 4))
+        backend.set('b', ('text/plain', 'y' * 4))
+        backend.get('a')
+        backend.set('c', ('text/plain', 'z' * 4))
+        self.assertEqual(backend.get('a'), ('text/plain', 'x' * 4))
+        self.assertIsNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('c'))
+
+    def test_replace(self):
+        backend = convcache.MemoryBackend(max_bytes=10)
+        backend.set('a', ('text/plain', 'x' * 8))
+        backend.set('a', ('text/plain', 'y' * 8))
+        self.assertEqual(backend.get('a'), ('text/plain', 'y' * 8))
+
+class FileBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_set(self):
+        backend = convcache.FileBackend(self.directory)
+        self.assertIsNone(backend.get('a'))
+        backend.set('a', ('text/turtle', 'x\ny\n'))
+        self.assertEqual(backend.get('a'), ('text/turtle', 'x\ny\n'))
+        # Entries persist across instances.
+        backend = convcache.FileBackend(self.directory)
+        self.assertEqual(backend.get('a'), ('text/turtle', 'x\ny\n'))
+
+    def test_eviction(self):
+        backend = convcache.FileBackend(self.directory, max_bytes=30)
+        backend.set('a', ('t', 'x' * 10))
+        os.utime(backend._path('a'), (0, 0))
+        backend.set('b', ('t', 'y' * 10))
+        backend.set('c', ('t', 'z' * 10))
+        self.assertIsNone(backend.get('a'))
+        self.assertIsNotNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('c'))
+
+class ConversionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+        self.cache = convcache.ConversionCache()
+        self.calls = []
+        input_digest = lambda: flask.request.args.get('input')
+        response_key = lambda: flask.request.args.get('key')
+
+        @self.app.route('/')
+        @self.cache.cached(input_digest, response_key)
+        def view():
+            self.calls.append(flask.request.args.get('input'))
+            if flask.request.args.get('status'):
+                return 'error', 500
+            return 'result %d' % len(self.calls)
+
+        @self.app.route('/stream')
+        @self.cache.cached(input_digest, response_key)
+        def stream():
+            self.calls.append(flask.request.args.get('input'))
+            return flask.Response(iter(['a', 'b']))
+
+    def _get(self, path):
+        response = self.app.test_client().get(path)
+        return (response.status_code, response.data,
+                response.headers.get(convcache.CACHE_HEADER))
+
+    def test_cached(self):
+        for path, expected in [('/?input=1&key=k', ('result 1', 'miss')),
+                               ('/?input=1&key=k', ('result 1', 'hit')),
+                               ('/?input=2&key=k', ('result 2', 'miss')),
+                               ('/?input=1&key=j', ('result 3', 'miss'))]:
+            self.assertEqual(self._get(path), (200,) + expected, path)
+
+    def test_not_cached(self):
+        self.assertEqual(self._get('/?key=k'), (200, 'result 1', None))
+        self.assertEqual(self._get('/?input=1'), (200, 'result 2', None))
+        self._get('/?input=1&key=k&status=1')
+        self.assertEqual(self._get('/?input=1&key=k&status=1')[2], 'miss')
+
+    def test_streamed(self):
+        self.assertEqual(self._get('/stream?input=1&key=k'),
+                         (200, 'ab', 'miss'))
+        self.assertEqual(self._get('/stream?input=1&key=k'),
+                         (200, 'ab', 'hit'))
+        self.assertEqual(len(self.calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
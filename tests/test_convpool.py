@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+import flask
+
+from pyld import jsonld
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import spool
+import convpool
+
+# Functions run in workers, which must be picklable.
+
+def _pid(data):
+    return os.getpid()
+
+def _request_path(data):
+    return flask.request.path, flask.request.args.get('a')
+
+def _fail(data):
+    raise ValueError('invalid data')
+
+class _Unpicklable(Exception):
+
+    def __init__(self, a, b):
+        Exception.__init__(self, a)
+
+def _fail_unpicklable(data):
+    raise _Unpicklable(1, 2)
+
+def _fail_input(data):
+    # Not picklable, as the constructor takes more than one argument.
+    raise jsonld.JsonLdError('invalid input', 'test.ParseError')
+
+def _sleep(data):
+    time.sleep(1)
+
+class IsLargeTest(unittest.TestCase):
+
+    def test_string(self):
+        self.assertFalse(convpool._is_large('x' * 9, 10, 2))
+        self.assertTrue(convpool._is_large('x' * 10, 10, 2))
+        self.assertTrue(convpool._is_large(u'x' * 10, 10, 2))
+
+    def test_objects(self):
+        self.assertFalse(convpool._is_large([{'a': [1, 2]}, 'x' * 20], 10, 2))
+        self.assertTrue(convpool._is_large([{'a': [{'b': 1}]}], 10, 2))
+        self.assertTrue(convpool._is_large({'a': {'b': {}}}, 10, 3))
+
+    def test_spooled(self):
+        f = tempfile.TemporaryFile()
+        f.write('x' * 100)
+        f.flush()
+        mapped = spool.MappedFile(f)
+        self.assertFalse(convpool._is_large(mapped, 10, 2))
+        mapped.close()
+
+class ConversionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = convpool.ConversionPool(processes=1, min_string_size=10,
+                                            timeout=0.5)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_small_in_process(self):
+        self.assertEqual(self.pool.run(_pid, 'x'), os.getpid())
+        self.assertIsNone(self.pool._pool)
+
+    def test_large_in_worker(self):
+        self.assertNotEqual(self.pool.run(_pid, 'x' * 10), os.getpid())
+
+    def test_arguments(self):
+        self.assertEqual(self.pool.run(max, 'x' * 10, 'y'), 'y')
+
+    def test_request_context(self):
+        app = flask.Flask(__name__)
+        with app.test_request_context('/echo/?a=1'):
+            self.assertEqual(self.pool.run(_request_path, 'x' * 10),
+                             ('/echo/', '1'))
+
+    def test_exception(self):
+        self.assertRaises(ValueError, self.pool.run, _fail, 'x' * 10)
+        with self.assertRaises(convpool.ConversionError) as cm:
+            self.pool.run(_fail_unpicklable, 'x' * 10)
+        self.assertIn('_Unpicklable', str(cm.exception))
+
+    def test_invalid_input(self):
+        with self.assertRaises(convpool.InvalidInputError) as cm:
+            self.pool.run(_fail_input, 'x' * 10)
+        self.assertIsInstance(cm.exception, ValueError)
+        self.assertIn('invalid input', str(cm.exception))
+        self.assertIn('JsonLdError', cm.exception.trace)
+
+    def test_timeout(self):
+        self.pool.start()
+        pool = self.pool._pool
+        try:
+            self.assertRaises(convpool.ConversionTimeout, self.pool.run,
+                              _sleep, 'x' * 10)
+            # A new pool is used for later conversions.
+            self.assertNotEqual(self.pool.run(_pid, 'x' * 10), os.getpid())
+            self.assertIsNot(self.pool._pool, pool)
+        finally:
+            # Stop the replaced pool now rather than at exit.
+            pool.terminate()
+            pool.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import formatloader
+
+# Name of the package of test format modules, made unique per test so
+# that modules imported by one test are not reused by others.
+PACKAGE = 'testformats%d'
+
+MODULE = '''
+format_name = 'test'
+mimetypes = ['text/x-test']
+
+def from_jsonld(data, options=None):
+    return 'rendered'
+
+def to_jsonld(data, options=None):
+    return [{'@id': data}]
+'''
+
+class LoadTest(unittest.TestCase):
+
+    count = 0
+
+    def setUp(self):
+        LoadTest.count += 1
+        self.package = PACKAGE % LoadTest.count
+        self.root = tempfile.mkdtemp()
+        self.directory = os.path.join(self.root, self.package)
+        os.mkdir(self.directory)
+        with open(os.path.join(self.directory, '__init__.py'), 'w') as f:
+            f.write('')
+        self.write(MODULE)
+        # The loader takes the directory as a package name.
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+        sys.path.insert(0, self.root)
+        self.stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+        sys.path.remove(self.root)
+        os.chdir(self.cwd)
+        for name in list(sys.modules):
+            if name.split('.')[0] == self.package:
+                del sys.modules[name]
+        shutil.rmtree(self.root)
+
+    def write(self, content, fn='test_format.py'):
+        path = os.path.join(self.directory, fn)
+        with open(path, 'w') as f:
+            f.write(content)
+        # Remove bytecode, which may have the same modification time.
+        if os.path.exists(path + 'c'):
+            os.remove(path + 'c')
+
+    def forget(self):
+        """Forget the imported test format module."""
+        del sys.modules[self.package + '.test_format']
+        delattr(sys.modules[self.package], 'test_format')
+
+    def imported(self):
+        return self.package + '.test_format' in sys.modules
+
+    def test_lazy(self):
+        formatloader.write_manifest(self.package)
+        self.forget()
+        formats = formatloader.load(self.package)
+        self.assertEqual(len(formats), 1)
+        self.assertIsInstance(formats[0], formatloader.LazyFormat)
+        self.assertEqual(formats[0].format_name, 'test')
+        self.assertEqual(formats[0].mimetypes, ['text/x-test'])
+        self.assertFalse(self.imported())
+        self.assertEqual(formats[0].to_jsonld('x'), [{'@id': 'x'}])
+        self.assertTrue(self.imported())
+
+    def test_file_times_ignored(self):
+        formatloader.write_manifest(self.package)
+        self.forget()
+        manifest = os.path.join(self.directory, formatloader.MANIFEST)
+        os.utime(manifest, (0, 0))
+        formats = formatloader.load(self.package)
+        self.assertIsInstance(formats[0], formatloader.LazyFormat)
+        self.assertEqual(sys.stderr.getvalue(), '')
+
+    def test_stale_manifest(self):
+        formatloader.write_manifest(self.package)
+        self.forget()
+        changed = MODULE.replace("'text/x-test'", "'text/x-changed'")
+        self.write(changed)
+        # Also when the module appears older than the manifest.
+        os.utime(os.path.join(self.directory, 'test_format.py'), (0, 0))
+        formats = formatloader.load(self.package)
+        self.assertNotIsInstance(formats[0], formatloader.LazyFormat)
+        self.assertEqual(formats[0].mimetypes, ['text/x-changed'])
+        self.assertIn('out of date for test_format.py',
+                      sys.stderr.getvalue())
+
+    def test_manifest_without_hashes(self):
+        with open(os.path.join(self.directory, formatloader.MANIFEST),
+                  'w') as f:
+            f.write('{"test_format.py": {"format_name": "test", '
+                    '"mimetypes": ["text/x-test"], '
+                    '"functions": ["from_jsonld", "to_jsonld"]}}')
+        formats = formatloader.load(self.package)
+        self.assertNotIsInstance(formats[0], formatloader.LazyFormat)
+
+    def test_missing_manifest(self):
+        formats = formatloader.load(self.package)
+        self.assertEqual(len(formats), 1)
+        self.assertNotIsInstance(formats[0], formatloader.LazyFormat)
+        self.assertTrue(self.imported())
+
+    def test_module_missing_from_manifest(self):
+        formatloader.write_manifest(self.package)
+        self.write(MODULE.replace("'test'", "'other'"), 'other_format.py')
+        formats = formatloader.load(self.package)
+        self.assertEqual(sorted((f.format_name,
+                                 isinstance(f, formatloader.LazyFormat))
+                                for f in formats),
+                         [('other', False), ('test', True)])
+
+    def test_not_lazy(self):
+        formatloader.write_manifest(self.package)
+        formats = formatloader.load(self.package, lazy=False)
+        self.assertNotIsInstance(formats[0], formatloader.LazyFormat)
+
+if __name__ == '__main__':
+    unittest.main()
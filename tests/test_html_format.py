@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import unittest
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import html_format
+
+def _lines(value, max_nodes=None):
+    return [line.strip() for line in
+            html_format._to_html(value, 0, max_nodes)]
+
+def _items(html):
+    return re.findall(r'<li>(.*?)</li>', html)
+
+def _navigation(html):
+    match = re.search(r'<nav[^>]*>\s*(.*?)\s*</nav>', html, re.S)
+    return match.group(1).splitlines()[0] if match else None
+
+class ToHtmlTest(unittest.TestCase):
+
+    def test_dict(self):
+        self.assertEqual(_lines({'@id': 'http://ex.org/a&b',
+                                 'http://ex.org/p': [{'@value': 'x<y'}]}),
+                         ['<dl>',
+                          '<a href="http://ex.org/a&amp;b">'
+                          'http://ex.org/a&amp;b</a>',
+                          '<dt>http://ex.org/p</dt>',
+                          '<dd>x&lt;y</dd>',
+                          '</dl>'])
+
+    def test_nested(self):
+        self.assertEqual(_lines({'p': [{'q': [1, 2]}, 3]}),
+                         ['<dl>', '<dt>p</dt>', '<dd>', '<ul>',
+                          '<li>', '<dl>', '<dt>q</dt>', '<dd>', '<ul>',
+                          '<li>1</li>', '<li>2</li>',
+                          '</ul>', '</dd>', '</dl>', '</li>',
+                          '<li>3</li>',
+                          '</ul>', '</dd>', '</dl>'])
+
+    def test_indent(self):
+        lines = list(html_format._to_html({'p': [1, 2]}, 1))
+        self.assertEqual(lines[:4], ['  <dl>\n', '    <dt>p</dt>\n',
+                                     '    <dd>\n', '      <ul>\n'])
+
+    def test_deep(self):
+        depth = sys.getrecursionlimit() * 2
+        value = 'x'
+        for _ in range(depth):
+            value = [{'p': value}, 1]
+        lines = _lines(value)
+        self.assertEqual(lines.count('<dl>'), depth)
+        self.assertEqual(lines.count('</dl>'), depth)
+
+    def test_bool(self):
+        self.assertEqual(_lines({'p': True, 'q': [{'@value': False}]}),
+                         ['<dl>', '<dt>p</dt>', '<dd>True</dd>',
+                          '<dt>q</dt>', '<dd>False</dd>', '</dl>'])
+        self.assertIn('<li>True</li>',
+                      html_format.from_jsonld([True, False, None]))
+
+    def test_non_ascii(self):
+        self.assertEqual(_lines(u'\xe4<'), ['\xc3\xa4&lt;'])
+
+    def test_max_nodes(self):
+        # The list and its three items are four nodes.
+        self.assertEqual(_lines([1, 2, 3], 4), _lines([1, 2, 3]))
+        self.assertEqual(_lines([1, 2, 3], 3),
+                         ['<ul>', '<li>1</li>', '<li>2</li>',
+                          '<p class="truncated">Output truncated after 3 '
+                          'nodes.</p>',
+                          '</ul>'])
+
+    def test_max_nodes_closes_elements(self):
+        lines = _lines({'p': [{'q': [1, 2, 3]}, 4]}, 7)
+        self.assertIn('<li>1</li>', lines)
+        self.assertNotIn('<li>2</li>', lines)
+        self.assertNotIn('<li>4</li>', lines)
+        for tag in ('dl', 'dd', 'ul', 'li'):
+            self.assertEqual(lines.count('<%s>' % tag),
+                             lines.count('</%s>' % tag), tag)
+
+    def test_max_nodes_option(self):
+        html = html_format.from_jsonld(range(10), {'max_nodes': 5})
+        self.assertEqual(_items(html), ['0', '1', '2', '3'])
+        self.assertIn('truncated after 5 nodes', html)
+
+class PaginationTest(unittest.TestCase):
+
+    data = [{'@value': str(i)} for i in range(5)]
+
+    def setUp(self):
+        self.page_size = html_format.PAGE_SIZE
+        self.app = flask.Flask(__name__)
+
+    def tearDown(self):
+        html_format.PAGE_SIZE = self.page_size
+
+    def test_page(self):
+        html = html_format.from_jsonld(self.data, {'offset': 1, 'limit': 2})
+        self.assertEqual(_items(html), ['1', '2'])
+        self.assertEqual(_navigation(html), 'Items 2-3 of 5')
+        self.assertIn('<a rel="prev" href="?limit=2&amp;offset=0">', html)
+        self.assertIn('<a rel="next" href="?limit=2&amp;offset=3">', html)
+
+    def test_last_page(self):
+        html = html_format.from_jsonld(self.data, {'offset': 3, 'limit': 3})
+        self.assertEqual(_items(html), ['3', '4'])
+        self.assertEqual(_navigation(html), 'Items 4-5 of 5')
+        self.assertNotIn('rel="next"', html)
+
+    def test_offset_past_end(self):
+        html = html_format.from_jsonld(self.data, {'offset': 9, 'limit': 2})
+        self.assertEqual(_items(html), [])
+        self.assertEqual(_navigation(html), 'No items (5 in total)')
+        self.assertIn('<a rel="prev" href="?limit=2&amp;offset=3">', html)
+        self.assertNotIn('rel="next"', html)
+        html = html_format.from_jsonld(self.data, {'offset': 9})
+        self.assertEqual(_items(html), [])
+        self.assertIn('<a rel="prev" href="?offset=0">', html)
+
+    def test_offset_without_limit(self):
+        html = html_format.from_jsonld(self.data, {'offset': 3})
+        self.assertEqual(_items(html), ['3', '4'])
+        self.assertEqual(_navigation(html), 'Items 4-5 of 5')
+
+    def test_no_pagination(self):
+        html = html_format.from_jsonld(self.data)
+        self.assertEqual(len(_items(html)), 5)
+        self.assertIsNone(_navigation(html))
+
+    def test_limit_none(self):
+        html_format.PAGE_SIZE = 2
+        self.assertEqual(len(_items(html_format.from_jsonld(self.data))), 2)
+        with self.app.test_request_context('/?limit=1'):
+            html = html_format.from_jsonld(self.data, {'limit': None})
+        self.assertEqual(len(_items(html)), 5)
+        self.assertIsNone(_navigation(html))
+
+    def test_request_args(self):
+        with self.app.test_request_context('/?offset=2&limit=2&x=y'):
+            html = html_format.from_jsonld(self.data)
+        self.assertEqual(_items(html), ['2', '3'])
+        self.assertIn('href="?limit=2&amp;offset=4&amp;x=y"', html)
+
+    def test_invalid_args(self):
+        with self.app.test_request_context('/?offset=-1&limit=x'):
+            html = html_format.from_jsonld(self.data)
+        self.assertEqual(len(_items(html)), 5)
+
+    def test_not_collection(self):
+        html = html_format.from_jsonld({'p': 'x'}, {'offset': 1, 'limit': 1})
+        self.assertIn('<dd>x</dd>', html)
+        self.assertIsNone(_navigation(html))
+
+if __name__ == '__main__':
+    unittest.main()
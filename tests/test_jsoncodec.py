@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import math
+import unittest
+
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import jsoncodec
+
+# Inputs decoded differently by ujson and the standard library unless
+# handled by jsoncodec.
+DOCUMENTS = [
+    '[12345678901234567890123]',
+    '[-9223372036854775809]',
+    '[0.1234567890123456789]',
+    '[123456789.123456789]',
+    '[1e400, 1.5e-320]',
+    '["\\ud800", "\\ud83dx", "\\udc00\\ud800", "\\ud83d\\ude00"]',
+    '{"a": [1, 2.5, "b\\u00e9", null, true, false, {}]}',
+]
+
+def _available(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+DECODERS = [d for d in ('ujson', 'simplejson', 'json') if _available(d)]
+
+def _same(a, b):
+    """Return True if values are equal, taking NaN equal to itself."""
+    if isinstance(a, float) and isinstance(b, float):
+        return repr(a) == repr(b) or (math.isnan(a) and math.isnan(b))
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return (sorted(a) == sorted(b) and
+                all(_same(a[k], b[k]) for k in a))
+    # simplejson decodes ASCII strings into str.
+    for types in ((str, unicode), (int, long)):
+        if isinstance(a, types) and isinstance(b, types):
+            return a == b
+    return type(a) == type(b) and a == b
+
+class LoadsTest(unittest.TestCase):
+
+    def tearDown(self):
+        jsoncodec.select()
+
+    def test_same_as_json(self):
+        for name in DECODERS:
+            jsoncodec.select(decoders=[name])
+            documents = DOCUMENTS
+            if name != 'simplejson':
+                documents = documents + ['[NaN, Infinity]']
+            for document in documents:
+                self.assertTrue(_same(jsoncodec.loads(document),
+                                      json.loads(document)),
+                                '%s: %s' % (name, document))
+
+    def test_invalid(self):
+        for name in DECODERS:
+            jsoncodec.select(decoders=[name])
+            for document in ['', '[1,', '{"a" 1}', '[1] x']:
+                self.assertRaises(ValueError, jsoncodec.loads, document)
+
+    def test_encoding(self):
+        data = u'["\xe9"]'.encode('latin-1')
+        self.assertEqual(jsoncodec.loads(data, 'latin-1'), [u'\xe9'])
+
+    def test_file(self):
+        self.assertEqual(jsoncodec.loads(StringIO('[1, {"a": 2}]')),
+                         [1, {'a': 2}])
+        self.assertEqual(jsoncodec.loads(StringIO(' {"a": 2} ')), {'a': 2})
+
+class IterloadTest(unittest.TestCase):
+
+    def _check(self, document, chunk_size=None):
+        expected = json.loads(document)
+        if not isinstance(expected, list):
+            expected = [expected]
+        for source in (document, StringIO(document), buffer(document)):
+            items = list(jsoncodec.iterload(source, chunk_size=chunk_size))
+            self.assertTrue(_same(items, expected), (document, chunk_size))
+
+    def test_documents(self):
+        for document in DOCUMENTS + ['[]', ' [ ] ', '"x"', '5', '{}']:
+            for chunk_size in (1, 2, 3, 7, None):
+                self._check(document, chunk_size)
+
+    def test_number_across_chunks(self):
+        for chunk_size in range(1, 12):
+            self._check('[1234567890, 0.125e2]', chunk_size)
+
+    def test_utf8_across_chunks(self):
+        document = u'["\xe9\u20ac\U0001f600"]'.encode('utf-8')
+        for chunk_size in range(1, 8):
+            self._check(document, chunk_size)
+
+    def test_unicode(self):
+        self.assertEqual(list(jsoncodec.iterload(u'[1, "\xe9"]')),
+                         [1, u'\xe9'])
+        self.assertEqual(list(jsoncodec.iterload(u'[1, "\xe9"]',
+                                                 chunk_size=1)),
+                         [1, u'\xe9'])
+
+    def test_encoding(self):
+        data = u'["\xe9", 1]'.encode('utf-16-le')
+        self.assertEqual(list(jsoncodec.iterload(data, 'utf-16-le', 3)),
+                         [u'\xe9', 1])
+
+    def test_invalid(self):
+        for document in ['[1,', '[1 2]', '[1,]', '[1] x', '[', '[{]']:
+            self.assertRaises(ValueError, list, jsoncodec.iterload(document))
+
+    def test_items_before_error(self):
+        items = jsoncodec.iterload('[1, 2, x]')
+        self.assertEqual(next(items), 1)
+        self.assertEqual(next(items), 2)
+        self.assertRaises(ValueError, next, items)
+
+class LoadTest(unittest.TestCase):
+
+    def test_array(self):
+        self.assertEqual(jsoncodec.load('[1, [2], {"a": 3}]'),
+                         [1, [2], {'a': 3}])
+
+    def test_other(self):
+        self.assertEqual(jsoncodec.load(StringIO('{"a": [1]}')),
+                         {'a': [1]})
+
+if __name__ == '__main__':
+    unittest.main()
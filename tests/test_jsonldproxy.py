@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import jsonldproxy
+
+PROXY = 'http://localhost/proxy/'
+
+class RewriterTest(unittest.TestCase):
+
+    def test_rewrite(self):
+        data = [{'@id': 'http://ex.org/a?b=c',
+                 'http://ex.org/p': [{'@id': 'http://ex.org/b'},
+                                     {'@value': 'http://ex.org/c'}],
+                 '@type': ['http://ex.org/T']}]
+        jsonldproxy.Rewriter(PROXY)(data)
+        self.assertEqual(data, [
+            {'@id': PROXY + 'http%3A//ex.org/a%3Fb%3Dc',
+             'http://ex.org/p': [{'@id': PROXY + 'http%3A//ex.org/b'},
+                                 {'@value': 'http://ex.org/c'}],
+             '@type': ['http://ex.org/T']}])
+
+    def test_non_ascii(self):
+        data = {'@id': u'http://ex.org/\xe9'}
+        jsonldproxy.Rewriter(PROXY)(data)
+        self.assertEqual(data['@id'], PROXY + 'http%3A//ex.org/%C3%A9')
+
+    def test_memo(self):
+        rewriter = jsonldproxy.Rewriter(PROXY)
+        data = [{'@id': 'http://ex.org/a'} for _ in range(3)]
+        rewriter(data)
+        self.assertEqual(rewriter._rewritten, {
+            'http://ex.org/a': PROXY + 'http%3A//ex.org/a'})
+        # Equal rewritten strings are shared.
+        self.assertIs(data[0]['@id'], data[2]['@id'])
+        # Memoized results are returned as they are.
+        rewriter._rewritten['http://ex.org/b'] = 'memoized'
+        self.assertEqual(rewriter.rewrite_url('http://ex.org/b'), 'memoized')
+
+    def test_origin(self):
+        rewriter = jsonldproxy.Rewriter(PROXY, 'http://ex.org')
+        for url, rewritten in [('http://ex.org', True),
+                               ('http://ex.org/a', True),
+                               ('http://ex.org?a', True),
+                               ('http://ex.org#a', True),
+                               ('http://ex.org.evil.com/a', False),
+                               ('http://ex.org:8080/a', False),
+                               ('https://ex.org/a', False),
+                               ('_:b1', False)]:
+            self.assertEqual(rewriter.rewrite_url(url).startswith(PROXY),
+                             rewritten, url)
+        self.assertEqual(rewriter.rewrite_url('_:b1'), '_:b1')
+
+    def test_origin_of_url(self):
+        self.assertEqual(jsonldproxy.origin('http://ex.org:80/a/b?c#d'),
+                         'http://ex.org:80')
+
+    def test_deeply_nested(self):
+        depth = 10 * sys.getrecursionlimit()
+        data = node = {}
+        for i in range(depth):
+            node['@id'] = 'http://ex.org/%d' % (i % 10)
+            node['http://ex.org/p'] = [{}]
+            node = node['http://ex.org/p'][0]
+        jsonldproxy.rewrite_urls(data, PROXY)
+        node = data
+        for i in range(depth):
+            self.assertEqual(node['@id'],
+                             PROXY + 'http%3A//ex.org/' + str(i % 10))
+            node = node['http://ex.org/p'][0]
+
+    def test_rewrite_urls_other_values(self):
+        self.assertEqual(jsonldproxy.rewrite_urls('http://ex.org/a', PROXY),
+                         'http://ex.org/a')
+        self.assertIsNone(jsonldproxy.rewrite_urls(None, PROXY))
+
+if __name__ == '__main__':
+    unittest.main()
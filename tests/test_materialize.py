@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import jsoncodec
+import materialize
+import annotationstore
+
+from formats import jsonld_format
+from materialize import EAGER, LAZY, NEVER
+
+ID = 'http://example.org/1'
+
+class _Format(object):
+    """Format module rendering the @ids of nodes."""
+
+    def __init__(self, format_name, mimetype):
+        self.format_name = format_name
+        self.mimetypes = [mimetype]
+        self.calls = 0
+
+    def from_jsonld(self, data, options=None):
+        self.calls += 1
+        return u' '.join(n['@id'] for n in data) + (
+            u' pretty' if jsoncodec.prettyprint() else u'')
+
+class RenditionKeyTest(unittest.TestCase):
+
+    def test_keys(self):
+        self.assertEqual(materialize.rendition_key('turtle'),
+                         'turtle - compact')
+        self.assertEqual(materialize.rendition_key('turtle', 'p', True),
+                         'turtle - pretty')
+        self.assertEqual(materialize.rendition_key(jsonld_format.format_name),
+                         materialize.rendition_key(
+                             jsonld_format.format_name,
+                             jsonld_format.DEFAULT_PROFILE))
+        self.assertNotEqual(
+            materialize.rendition_key(jsonld_format.format_name, 'p'),
+            materialize.rendition_key(jsonld_format.format_name))
+
+class MaterializerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = annotationstore.AnnotationStore()
+        self.store.add({'@id': ID})
+        self.formats = dict((name, _Format(name, 'text/x-' + name))
+                            for name in ('eager', 'lazy', 'never'))
+        self.materializer = materialize.Materializer(
+            self.store, self.formats.values(),
+            {'eager': EAGER, 'never': NEVER}, LAZY, 1)
+
+    def tearDown(self):
+        self.materializer.close()
+        self.store.close()
+
+    def test_policies(self):
+        self.assertEqual(self.materializer.eager, ['eager'])
+        self.assertEqual(self.materializer.policy('lazy'), LAZY)
+        self.assertIsNone(self.materializer.get(ID, 'never'))
+        self.assertIsNone(self.materializer.get(ID, 'unknown'))
+
+    def test_lazy(self):
+        for _ in range(2):
+            self.assertEqual(self.materializer.get(ID, 'lazy'),
+                             ('text/x-lazy', ID))
+        self.assertEqual(self.formats['lazy'].calls, 1)
+        self.assertEqual(self.materializer.get(ID, 'lazy', pretty=True),
+                         ('text/x-lazy', ID + ' pretty'))
+        self.assertIsNone(self.materializer.get('http://example.org/x',
+                                                'lazy'))
+
+    def test_eager(self):
+        self.materializer.written([ID])
+        self.materializer.close()
+        self.assertEqual(self.formats['eager'].calls, 1)
+        self.assertEqual(
+            self.store.get_rendition(ID, materialize.rendition_key('eager')),
+            ('text/x-eager', ID))
+        self.assertIsNone(self.store.get_rendition(
+            ID, materialize.rendition_key('lazy')))
+        self.assertEqual(self.materializer.get(ID, 'eager'),
+                         ('text/x-eager', ID))
+        self.assertEqual(self.formats['eager'].calls, 1)
+
+    def test_replaced(self):
+        self.materializer.get(ID, 'lazy')
+        self.store.add({'@id': ID, 'http://example.org/p': [{'@value': 1}]})
+        self.materializer.get(ID, 'lazy')
+        self.assertEqual(self.formats['lazy'].calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
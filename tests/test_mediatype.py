@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mediatype
+
+from formats import jsonld_format
+
+JSONLD = 'application/ld+json'
+EXPANDED = 'http://www.w3.org/ns/json-ld#expanded'
+COMPACTED = 'http://www.w3.org/ns/json-ld#compacted'
+
+class ParseTest(unittest.TestCase):
+
+    def test_parse(self):
+        m = mediatype.parse('Text/Turtle; Charset="UTF-8"; q=0.5')
+        self.assertEqual((m.type, m.subtype, m.essence), ('text', 'turtle',
+                                                          'text/turtle'))
+        self.assertEqual(m.params, {'charset': 'utf-8'})
+        self.assertEqual(m.q, 0.5)
+
+    def test_charset(self):
+        for value in ('text/plain;charset=ISO-8859-1',
+                      'text/plain ; charset = "iso-8859-1" ',
+                      'TEXT/PLAIN; CHARSET=iso-8859-1; format=flowed'):
+            self.assertEqual(mediatype.parse(value).params['charset'],
+                             'iso-8859-1', value)
+        self.assertNotIn('charset', mediatype.parse('text/plain').params)
+
+    def test_quoted_parameters(self):
+        m = mediatype.parse('%s; profile="%s %s"; x="a;b\\"c"' % (
+            JSONLD, EXPANDED, COMPACTED))
+        self.assertEqual(m.profiles(), [EXPANDED, COMPACTED])
+        self.assertEqual(m.params['x'], 'a;b"c')
+
+    def test_q_clamped(self):
+        self.assertEqual(mediatype.parse('text/plain; q=2').q, 1.0)
+        self.assertEqual(mediatype.parse('text/plain; q=-1').q, 0.0)
+
+    def test_invalid(self):
+        for value in ('', 'text', 'text/', '/plain', '*/plain',
+                      'text/plain; q=x'):
+            self.assertRaises(ValueError, mediatype.parse, value)
+
+    def test_parse_accept(self):
+        ranges = mediatype.parse_accept(
+            'text/html, application/xhtml+xml;q=0.9, invalid, '
+            'application/ld+json; profile="a, b", */*;q=0.1')
+        self.assertEqual([r.essence for r in ranges],
+                         ['text/html', 'application/xhtml+xml',
+                          JSONLD, '*/*'])
+        self.assertEqual([r.q for r in ranges], [1.0, 0.9, 1.0, 0.1])
+        self.assertEqual(ranges[2].params['profile'], 'a, b')
+
+class MatchTest(unittest.TestCase):
+
+    def _match(self, pattern, value):
+        return mediatype.match(mediatype.parse(pattern),
+                               mediatype.parse(value))
+
+    def test_wildcards(self):
+        self.assertEqual(self._match('*/*', 'text/plain'), 0)
+        self.assertEqual(self._match('text/*', 'text/plain'), 1)
+        self.assertEqual(self._match('text/plain', 'text/plain'), 2)
+        self.assertEqual(self._match('text/*', 'application/json'), -1)
+        self.assertEqual(self._match('text/html', 'text/plain'), -1)
+
+    def test_case_insensitive(self):
+        self.assertEqual(self._match('TEXT/Turtle', 'text/turtle'), 2)
+
+    def test_parameters(self):
+        self.assertEqual(self._match('text/plain; format=flowed',
+                                     'text/plain; format=flowed'), 3)
+        self.assertEqual(self._match('text/plain; format=fixed',
+                                     'text/plain; format=flowed'), -1)
+        # Ignored, or given on one side only.
+        self.assertEqual(self._match('text/plain; charset=utf-8; q=0.1',
+                                     'text/plain; charset=latin1'), 2)
+        self.assertEqual(self._match('text/plain; format=flowed',
+                                     'text/plain'), 2)
+
+    def test_profiles(self):
+        value = '%s; profile="%s"' % (JSONLD, EXPANDED)
+        self.assertEqual(self._match('%s; profile="%s %s"' % (
+            JSONLD, COMPACTED, EXPANDED), value), 3)
+        self.assertEqual(self._match('%s; profile="%s"' % (
+            JSONLD, COMPACTED), value), -1)
+
+class DispatchTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = mediatype.DispatchTable([
+            ('application/ld+json', 'jsonld'),
+            ('text/turtle', 'turtle'),
+            ('text/turtle; charset=utf-8', 'duplicate'),
+            ('text/html', 'html'),
+            ('application/n-quads', 'nquads'),
+        ])
+
+    def _negotiate(self, accept):
+        result = self.table.negotiate(accept)
+        return result[1] if result is not None else None
+
+    def test_duplicates_added_once(self):
+        self.assertEqual([e[2] for e in self.table.entries],
+                         ['jsonld', 'turtle', 'html', 'nquads'])
+
+    def test_lookup(self):
+        self.assertEqual(self.table.lookup('Text/Turtle; charset=UTF-8'),
+                         'turtle')
+        self.assertEqual(self.table.lookup('APPLICATION/LD+JSON'), 'jsonld')
+        self.assertIsNone(self.table.lookup('text/plain'))
+        self.assertIsNone(self.table.lookup('invalid'))
+
+    def test_q_ordering(self):
+        self.assertEqual(self._negotiate('text/turtle;q=0.5, text/html'),
+                         'html')
+        self.assertEqual(self._negotiate('text/turtle, text/html;q=0.5'),
+                         'turtle')
+        self.assertEqual(self._negotiate('text/html;q=0.5, text/turtle;q=0.9,'
+                                         ' application/n-quads;q=0.7'),
+                         'turtle')
+
+    def test_ties_to_first_added(self):
+        self.assertEqual(self._negotiate('text/html, text/turtle'), 'turtle')
+
+    def test_wildcards(self):
+        self.assertEqual(self._negotiate('*/*'), 'jsonld')
+        self.assertEqual(self._negotiate('text/*'), 'turtle')
+        self.assertEqual(self._negotiate('text/*;q=0.5, text/html'), 'html')
+        # The most specific range gives the quality value.
+        self.assertEqual(self._negotiate('*/*, application/ld+json;q=0'),
+                         'turtle')
+        self.assertEqual(self._negotiate('text/*, text/turtle;q=0'), 'html')
+
+    def test_not_acceptable(self):
+        self.assertIsNone(self._negotiate('image/png'))
+        self.assertIsNone(self._negotiate('text/turtle;q=0'))
+        self.assertIsNone(self._negotiate(''))
+
+    def test_mixed_case(self):
+        self.assertEqual(self._negotiate('Text/HTML'), 'html')
+        self.assertEqual(self._negotiate('TEXT/*;Q=0.5, text/html;q=0.1'),
+                         'turtle')
+
+class ProfileSelectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+
+    def _select(self, accept=None):
+        headers = {'Accept': accept} if accept is not None else {}
+        with self.app.test_request_context(headers=headers):
+            return jsonld_format._select_response_form()
+
+    def test_default(self):
+        self.assertEqual(self._select(), jsonld_format.DEFAULT_PROFILE)
+        self.assertEqual(self._select(JSONLD), jsonld_format.DEFAULT_PROFILE)
+        self.assertEqual(self._select('text/html'),
+                         jsonld_format.DEFAULT_PROFILE)
+
+    def test_profile(self):
+        self.assertEqual(self._select('%s; profile="%s"' % (JSONLD,
+                                                            EXPANDED)),
+                         EXPANDED)
+        self.assertEqual(self._select('Application/LD+JSON;Profile=%s' %
+                                      EXPANDED), EXPANDED)
+
+    def test_profile_q(self):
+        self.assertEqual(self._select(
+            '%s; profile="%s"; q=0.5, %s; profile="%s"' % (
+                JSONLD, COMPACTED, JSONLD, EXPANDED)), EXPANDED)
+
+if __name__ == '__main__':
+    unittest.main()
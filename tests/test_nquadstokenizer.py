@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import rdflib
+
+from pyld import jsonld
+
+import nquadstokenizer
+
+from nquadstokenizer import IRI, BLANK_NODE, LITERAL, DEFAULT_GRAPH
+
+XSD_INTEGER = 'http://www.w3.org/2001/XMLSchema#integer'
+
+def _tokenize(data, first_line=1):
+    return list(nquadstokenizer.tokenize(data, first_line))
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_terms(self):
+        data = ('<http://ex.org/s> <http://ex.org/p> <http://ex.org/o> .\n'
+                '_:b1 <http://ex.org/p> _:b.2 <http://ex.org/g> .\n'
+                '_:b1 <http://ex.org/p> "a"@en-GB _:g .\n'
+                '_:b1 <http://ex.org/p> "1"^^<%s> .\n'
+                '_:b1 <http://ex.org/p> "" .\n' % XSD_INTEGER)
+        self.assertEqual(_tokenize(data), [
+            (IRI, 'http://ex.org/s', 'http://ex.org/p', IRI,
+             'http://ex.org/o', None, None, DEFAULT_GRAPH),
+            (BLANK_NODE, '_:b1', 'http://ex.org/p', BLANK_NODE, '_:b.2',
+             None, None, 'http://ex.org/g'),
+            (BLANK_NODE, '_:b1', 'http://ex.org/p', LITERAL, 'a',
+             jsonld.RDF_LANGSTRING, 'en-GB', '_:g'),
+            (BLANK_NODE, '_:b1', 'http://ex.org/p', LITERAL, '1',
+             XSD_INTEGER, None, DEFAULT_GRAPH),
+            (BLANK_NODE, '_:b1', 'http://ex.org/p', LITERAL, '',
+             jsonld.XSD_STRING, None, DEFAULT_GRAPH),
+        ])
+
+    def test_literal_escapes(self):
+        data = r'<s:> <p:> "\t\b\n\r\f\"\'\\ \u00e9\U0001F600" .'
+        self.assertEqual(_tokenize(data)[0][4],
+                         u'\t\b\n\r\f"\'\\ \xe9\U0001F600')
+
+    def test_iri_escapes(self):
+        data = r'<http://ex.org/\u00e9> <p:> <o:\U0001F600> <g:\u00e9> .'
+        statement = _tokenize(data)[0]
+        self.assertEqual(statement[1], u'http://ex.org/\xe9')
+        self.assertEqual(statement[4], u'o:\U0001F600')
+        self.assertEqual(statement[7], u'g:\xe9')
+
+    def test_utf8(self):
+        data = u'<s:é> <p:> "中 é" <g:中> .\n'.encode('utf-8')
+        statement = _tokenize(data)[0]
+        self.assertEqual(statement[1], u's:é')
+        self.assertEqual(statement[4], u'中 é')
+        self.assertEqual(statement[7], u'g:中')
+
+    def test_literal_with_terms(self):
+        data = '<s:> <p:> "see _:b1 <x> . # no comment" .'
+        self.assertEqual(_tokenize(data)[0][4], 'see _:b1 <x> . # no comment')
+
+    def test_whitespace_and_comments(self):
+        data = ('# comment\r\n\r\n  <s:>\t<p:>  <o:>\t. # comment _:x .\r\n'
+                '\n<s:> <p:> <o:> .')
+        self.assertEqual(len(_tokenize(data)), 2)
+
+    def test_buffers(self):
+        data = u'<s:é> <p:> "a\\u00e9" .\n_:b <p:> _:c .\n'.encode('utf-8')
+        expected = _tokenize(data)
+        for buffer_ in (buffer(data), bytearray(data), memoryview(data),
+                        data.decode('utf-8')):
+            self.assertEqual(_tokenize(buffer_), expected)
+
+    def test_blocks(self):
+        data = ''.join('<s:%d> <p:> "%s" .\n' % (i, 'x' * (i % 7))
+                       for i in range(100))
+        expected = _tokenize(data)
+        block_size = nquadstokenizer.BLOCK_SIZE
+        try:
+            for size in (1, 10, 64):
+                nquadstokenizer.BLOCK_SIZE = size
+                self.assertEqual(_tokenize(data), expected)
+        finally:
+            nquadstokenizer.BLOCK_SIZE = block_size
+
+    def _error_line(self, data, first_line=1):
+        with self.assertRaises(jsonld.JsonLdError) as cm:
+            _tokenize(data, first_line)
+        return cm.exception.details['line']
+
+    def test_error_lines(self):
+        self.assertEqual(self._error_line('x\n'), 1)
+        self.assertEqual(self._error_line('<s:> <p:> <o:> .\n\n# c\nx .\n'),
+                         4)
+        self.assertEqual(self._error_line('<s:> <p:> <o:>\n'), 1)
+        self.assertEqual(self._error_line('<s:> <p:> "a\nb" .\n'), 1)
+        self.assertEqual(self._error_line('<s:> <p:> <o:> .\nx', 10), 11)
+
+    def test_error_lines_in_later_blocks(self):
+        data = '<s:> <p:> <o:> .\n' * 50 + '<s:> <p:> .\n'
+        block_size = nquadstokenizer.BLOCK_SIZE
+        try:
+            for size in (1, 17, 100):
+                nquadstokenizer.BLOCK_SIZE = size
+                self.assertEqual(self._error_line(data), 51)
+        finally:
+            nquadstokenizer.BLOCK_SIZE = block_size
+
+# Parts of random literals, including escapes and text resembling
+# other terms and comments.
+_LITERAL_PARTS = [u'a', u'b', u' ', u'é', u'中', u'_:x', u'<i>', u'.',
+                  u'#', u'\\"', u'\\\\', u'\\n', u'\\t', u'\\u00e9',
+                  u'\\U0001F600', u"'", u'@en', u'^^']
+
+class RdflibPropertyTest(unittest.TestCase):
+    """Compare the tokenizer with the rdflib N-Quads parser on random
+    documents."""
+
+    DOCUMENTS = 500
+
+    def setUp(self):
+        self.random = random.Random(1)
+
+    def _literal(self):
+        r = self.random
+        value = u'"%s"' % u''.join(r.choice(_LITERAL_PARTS)
+                                   for _ in range(r.randint(0, 8)))
+        return value + r.choice([u'', u'@en-GB', u'^^<%s>' % XSD_INTEGER])
+
+    def _iri(self):
+        return u'<http://ex.org/%s>' % self.random.choice(
+            [u'a', u'b', u'é', u'c\\u00e9', u'd#x'])
+
+    def _blank_node(self):
+        return u'_:b%d' % self.random.randint(0, 3)
+
+    def _statement(self):
+        r = self.random
+        space = lambda: r.choice([u' ', u'\t', u'  '])
+        subject = r.choice([self._iri, self._blank_node])()
+        object_ = r.choice([self._iri, self._blank_node, self._literal])()
+        graph = r.choice([u'', u' ' + self._iri(), u' ' + self._blank_node()])
+        return (subject + space() + self._iri() + space() + object_ + graph +
+                space() + u'.' + r.choice([u'', u' # c _:z .']))
+
+    def _document(self):
+        r = self.random
+        return (u'\n'.join(self._statement()
+                           for _ in range(r.randint(1, 6))) +
+                r.choice([u'', u'\n', u'\n# end\n\n']))
+
+    def _tokenized(self, data):
+        """Return set of statements, with blank nodes as 'B'."""
+        statements = set()
+        for (s_type, subject, predicate, o_type, object_, datatype,
+             language, graph_name) in nquadstokenizer.tokenize(data):
+            if s_type == BLANK_NODE:
+                subject = 'B'
+            if o_type == BLANK_NODE:
+                object_ = 'B'
+            if graph_name == DEFAULT_GRAPH or graph_name.startswith('_:'):
+                graph_name = 'B'
+            statements.add((graph_name, subject, predicate, o_type, object_,
+                            datatype, language))
+        return statements
+
+    def _parsed(self, data):
+        """Return set of statements parsed with rdflib, as _tokenized()."""
+        graph = rdflib.ConjunctiveGraph()
+        graph.parse(data=data, format='nquads')
+        statements = set()
+        for s, p, o, c in graph.quads():
+            if isinstance(o, rdflib.Literal):
+                if o.datatype:
+                    datatype = unicode(o.datatype)
+                elif o.language:
+                    datatype = jsonld.RDF_LANGSTRING
+                else:
+                    datatype = jsonld.XSD_STRING
+                object_ = (LITERAL, unicode(o), datatype, o.language)
+            elif isinstance(o, rdflib.BNode):
+                object_ = (BLANK_NODE, 'B', None, None)
+            else:
+                object_ = (IRI, unicode(o), None, None)
+            graph_name = c.identifier
+            graph_name = 'B' if isinstance(graph_name, rdflib.BNode) \
+                else unicode(graph_name)
+            subject = unicode(s) if isinstance(s, rdflib.URIRef) else 'B'
+            statements.add((graph_name, subject, unicode(p)) + object_)
+        return statements
+
+    def test_same_as_rdflib(self):
+        compared = 0
+        for _ in range(self.DOCUMENTS):
+            document = self._document()
+            data = document.encode('utf-8')
+            try:
+                expected = self._parsed(data)
+            except UnicodeDecodeError:
+                # The rdflib parser fails on some non-ASCII input on
+                # Python 2.
+                continue
+            self.assertEqual(self._tokenized(data), expected, document)
+            compared += 1
+        # Most documents can be compared.
+        self.assertGreater(compared, self.DOCUMENTS // 2)
+
+if __name__ == '__main__':
+    unittest.main()
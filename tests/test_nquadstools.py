@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+from pyld import jsonld
+
+import nquadstools
+import nquadstokenizer
+
+DATA = ('<http://ex.org/s> <http://ex.org/p> "a"@en .\n'
+        '<http://ex.org/s> <http://ex.org/p> _:o <http://ex.org/g> .\n'
+        '<http://ex.org/s> <http://ex.org/p> "a"@en .\n'
+        '_:o <http://ex.org/q> "1"^^<http://ex.org/t> <http://ex.org/g> .\n')
+
+def _nodes(count):
+    return [{'@id': 'http://ex.org/%d' % i,
+             'http://ex.org/p': [{'@value': 'v%d' % i}]}
+            for i in range(count)]
+
+class ParseTest(unittest.TestCase):
+
+    def test_dataset(self):
+        dataset = nquadstools.to_dataset(DATA)
+        self.assertEqual(sorted(dataset), ['@default', 'http://ex.org/g'])
+        # Duplicates are removed.
+        self.assertEqual(len(dataset['@default']), 1)
+        self.assertEqual(dataset['@default'][0]['object'],
+                         {'type': 'literal', 'value': 'a',
+                          'datatype': jsonld.RDF_LANGSTRING,
+                          'language': 'en'})
+        self.assertEqual(len(dataset['http://ex.org/g']), 2)
+
+    def test_same_as_pyld(self):
+        expected = jsonld.from_rdf(DATA, {'format': 'application/nquads'})
+        self.assertEqual(nquadstools.to_jsonld(DATA), expected)
+
+    def test_sources(self):
+        expected = list(nquadstools.parse(DATA))
+        self.assertEqual(list(nquadstools.parse(StringIO(DATA))), expected)
+        self.assertEqual(list(nquadstools.parse(DATA.splitlines(True))),
+                         expected)
+        self.assertEqual(list(nquadstools.parse(buffer(DATA))), expected)
+
+    def test_file_blocks(self):
+        block_size = nquadstokenizer.BLOCK_SIZE
+        data = DATA * 20 + 'x\n'
+        try:
+            nquadstokenizer.BLOCK_SIZE = 10
+            with self.assertRaises(jsonld.JsonLdError) as cm:
+                list(nquadstools.parse(StringIO(data)))
+        finally:
+            nquadstokenizer.BLOCK_SIZE = block_size
+        self.assertEqual(cm.exception.details['line'], 81)
+
+class SerializeTest(unittest.TestCase):
+
+    def test_chunks(self):
+        data = _nodes(5)
+        chunks = list(nquadstools.serialize(data, chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(''.join(chunks),
+                         jsonld.to_rdf(data, {'format': 'application/nquads'}))
+
+    def test_graphs(self):
+        data = [{'@id': 'http://ex.org/g', '@graph': _nodes(1)}]
+        self.assertIn('<http://ex.org/g> .', nquadstools.from_jsonld(data))
+        self.assertNotIn('<http://ex.org/g>',
+                         nquadstools.from_jsonld(data, graphs=False))
+
+    def test_triples_in_several_graphs(self):
+        node = _nodes(1)[0]
+        data = [node, {'@id': 'http://ex.org/g', '@graph': [node]},
+                {'@id': '_:g', '@graph': [node]}]
+        quads = nquadstools.from_jsonld(data).splitlines()
+        triples = nquadstools.from_jsonld(data, graphs=False).splitlines()
+        self.assertEqual(len(quads), 3 * len(triples))
+        self.assertEqual(len(set(triples)), len(triples))
+        # Also across chunks, given data without blank node identifiers.
+        chunks = nquadstools.serialize(data[:2] * 3, graphs=False,
+                                       chunk_size=1)
+        self.assertEqual(''.join(chunks).splitlines(), triples)
+
+    def test_generated_blank_nodes(self):
+        # Blank nodes generated by pyld in different chunks are distinct.
+        data = [{'@id': 'http://ex.org/%d' % i,
+                 'http://ex.org/p': [{'http://ex.org/q': [{'@value': 'x'}]}]}
+                for i in range(2)]
+        lines = nquadstools.from_jsonld(data).splitlines()
+        blank_nodes = set(l.split()[2] for l in lines if 'ex.org/p' in l)
+        self.assertEqual(len(blank_nodes), 2)
+        self.assertEqual(len(lines), 4)
+
+    def test_blank_node_ids(self):
+        data = [{'@id': '_:a', 'http://ex.org/p': [{'@id': '_:b'}]},
+                {'@id': '_:b', 'http://ex.org/p': [{'@id': '_:a'}]}]
+        self.assertEqual(nquadstools.from_jsonld(data),
+                         jsonld.to_rdf(data, {'format': 'application/nquads'}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import shutil
+import pstats
+import tempfile
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import profiling
+
+def _app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return ['ok']
+
+def _slow_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    def body():
+        time.sleep(0.02)
+        yield 'ok'
+    return body()
+
+class ProfilingMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _profiles(self):
+        return sorted(fn for fn in os.listdir(self.directory)
+                      if fn.endswith('.prof'))
+
+    def _get(self, middleware, path='/', headers=None):
+        client = Client(middleware, BaseResponse)
+        return client.get(path, headers=headers or {}, buffered=True)
+
+    def test_no_header(self):
+        self.assertIsNone(profiling.HEADER)
+        middleware = profiling.ProfilingMiddleware(_app, self.directory,
+                                                   sample_rate=0)
+        self.assertIsNone(middleware.header_key)
+        environ = {'HTTP_X_PROFILE': '1', 'PATH_INFO': '/'}
+        result = middleware(environ, lambda status, headers: None)
+        self.assertEqual(result, ['ok'])
+        response = self._get(middleware, headers={'X-Profile': '1'})
+        self.assertEqual(response.data, 'ok')
+        self.assertNotIn(profiling.FILE_HEADER, response.headers)
+        self.assertEqual(self._profiles(), [])
+
+    def test_header(self):
+        middleware = profiling.ProfilingMiddleware(
+            _app, self.directory, sample_rate=0, header='X-Profile')
+        response = self._get(middleware, '/echo/', {'X-Profile': 'true'})
+        self.assertEqual(response.data, 'ok')
+        filename = response.headers[profiling.FILE_HEADER]
+        self.assertTrue(filename.endswith('-GET_echo_.prof'))
+        self.assertEqual(self._profiles(), [filename])
+        pstats.Stats(os.path.join(self.directory, filename))
+        response = self._get(middleware, '/echo/', {'X-Profile': 'no'})
+        self.assertNotIn(profiling.FILE_HEADER, response.headers)
+        self.assertEqual(len(self._profiles()), 1)
+
+    def test_threshold(self):
+        middleware = profiling.ProfilingMiddleware(
+            _app, self.directory, sample_rate=1, threshold=10)
+        self._get(middleware)
+        self.assertEqual(self._profiles(), [])
+        middleware = profiling.ProfilingMiddleware(
+            _slow_app, self.directory, sample_rate=1, threshold=0.01)
+        response = self._get(middleware)
+        self.assertEqual(response.data, 'ok')
+        self.assertNotIn(profiling.FILE_HEADER, response.headers)
+        self.assertEqual(len(self._profiles()), 1)
+
+    def test_rotate(self):
+        middleware = profiling.ProfilingMiddleware(
+            _app, self.directory, sample_rate=0, header='X-Profile',
+            max_files=2)
+        filenames = [self._get(middleware, headers={'X-Profile': '1'})
+                     .headers[profiling.FILE_HEADER] for _ in range(3)]
+        self.assertEqual(self._profiles(), sorted(filenames[1:]))
+        self.assertEqual(
+            [fn for fn in os.listdir(self.directory)
+             if fn.endswith('.tmp')], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'formats'))
+
+import rdflib
+
+from pyld import jsonld
+
+import rdftools
+
+EX = 'http://ex.org/'
+
+def _node(id_, value):
+    return {'@id': id_, EX + 'p': [value]}
+
+# Expanded JSON-LD with default, named and blank node named graphs.
+DATA = [
+    _node(EX + 's', {'@value': 'a', '@language': 'en'}),
+    {'@id': EX + 'g',
+     '@graph': [_node(EX + 's', {'@id': '_:o'}),
+                _node('_:o', {'@value': '1', '@type': EX + 't'})]},
+    {'@id': '_:g',
+     '@graph': [_node(EX + 's', {'@value': 'b'})]},
+]
+
+def _normalized(data):
+    """Return canonical N-Quads for JSON-LD data."""
+    return jsonld.normalize(data, {'format': 'application/nquads'})
+
+class GraphTest(unittest.TestCase):
+
+    def _contexts(self, graph):
+        return dict((c.identifier, set(c)) for c in graph.contexts())
+
+    def test_to_graph(self):
+        graph = rdftools.to_graph(DATA)
+        contexts = self._contexts(graph)
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(len(contexts[graph.default_context.identifier]), 1)
+        self.assertEqual(len(contexts[rdflib.URIRef(EX + 'g')]), 2)
+        blank = [i for i in contexts if isinstance(i, rdflib.BNode) and
+                 i != graph.default_context.identifier]
+        self.assertEqual(len(blank), 1)
+        self.assertEqual(contexts[blank[0]],
+                         set([(rdflib.URIRef(EX + 's'),
+                               rdflib.URIRef(EX + 'p'),
+                               rdflib.Literal('b'))]))
+
+    def test_dataset_round_trip(self):
+        dataset = rdftools.to_dataset(rdftools.to_graph(DATA))
+        self.assertEqual(len(dataset), 3)
+        self.assertIn('@default', dataset)
+        self.assertIn(EX + 'g', dataset)
+        self.assertEqual(len([n for n in dataset if n.startswith('_:')]), 1)
+        self.assertEqual(_normalized(jsonld.from_rdf(dataset)),
+                         _normalized(DATA))
+
+    def test_default(self):
+        graph = rdflib.ConjunctiveGraph()
+        context = graph.get_context(rdflib.BNode('x'))
+        context.add((rdflib.URIRef(EX + 's'), rdflib.URIRef(EX + 'p'),
+                     rdflib.Literal('c')))
+        self.assertEqual(list(rdftools.to_dataset(graph)), ['_:x'])
+        self.assertEqual(
+            list(rdftools.to_dataset(graph, [context.identifier])),
+            ['@default'])
+
+class FormatRoundTripTest(unittest.TestCase):
+
+    def test_trig(self):
+        trig = rdftools.from_jsonld(DATA, 'trig')
+        self.assertEqual(_normalized(rdftools.to_jsonld(trig, 'trig')),
+                         _normalized(DATA))
+
+    def test_trix(self):
+        # TriX graphs cannot be named by blank nodes, and graphs
+        # without a name are read as the default graph.
+        trix = rdftools.from_jsonld(DATA, 'trix')
+        merged = [DATA[0], DATA[1]] + DATA[2]['@graph']
+        self.assertEqual(_normalized(rdftools.to_jsonld(trix, 'trix')),
+                         _normalized(merged))
+
+    def test_turtle(self):
+        # Turtle has no named graphs, so the triples are merged.
+        turtle = rdftools.from_jsonld(DATA, 'turtle')
+        data = rdftools.to_jsonld(turtle, 'turtle')
+        self.assertNotIn('@graph', str(data))
+        self.assertEqual(len(_normalized(data).splitlines()), 4)
+
+    def test_file(self):
+        from StringIO import StringIO
+        xml = rdftools.from_jsonld(DATA[0], 'xml')
+        self.assertEqual(_normalized(rdftools.to_jsonld(StringIO(xml), 'xml')),
+                         _normalized(DATA[0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import unittest
+
+from email.utils import formatdate
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import restoaclient
+
+URL = 'http://example.org/annotations/'
+
+def _response(status_code=200, content='{}', **headers):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.url = URL
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = value
+    return response
+
+class _Session(object):
+    """Session returning given responses, recording request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+class FreshnessTest(unittest.TestCase):
+
+    def _lifetime(self, **headers):
+        return restoaclient._CacheEntry(_response(**headers)).max_age
+
+    def test_max_age(self):
+        self.assertEqual(self._lifetime(Cache_Control='public, max-age=60'),
+                         60)
+        # max-age overrides Expires.
+        self.assertEqual(self._lifetime(Cache_Control='max-age=60',
+                                        Expires=formatdate(0, usegmt=True)),
+                         60)
+
+    def test_expires(self):
+        now = time.time()
+        self.assertEqual(self._lifetime(Date=formatdate(now, usegmt=True),
+                                        Expires=formatdate(now + 100,
+                                                           usegmt=True)),
+                         100)
+        lifetime = self._lifetime(Expires=formatdate(now + 100, usegmt=True))
+        self.assertTrue(98 <= lifetime <= 100, lifetime)
+        self.assertEqual(self._lifetime(Expires=formatdate(now - 100,
+                                                           usegmt=True)), 0)
+        self.assertEqual(self._lifetime(Expires='0'), 0)
+
+    def test_no_cache(self):
+        entry = restoaclient._CacheEntry(_response(
+            Cache_Control='no-cache, max-age=60'))
+        self.assertFalse(entry.is_fresh())
+
+class HttpCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = restoaclient.HttpCache(100)
+
+    def test_cacheable(self):
+        for headers in ({'ETag': '"1"'},
+                        {'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT'},
+                        {'Cache-Control': 'max-age=10'},
+                        {'Expires': 'Mon, 01 Jan 2018 00:00:00 GMT'}):
+            response = _response(**headers)
+            self.cache.store(URL, response)
+            self.assertIs(self.cache.get(URL).response, response, headers)
+        for response in (_response(), _response(404, ETag='"1"'),
+                         _response(ETag='"1"', Cache_Control='no-store'),
+                         _response(ETag='"1"', Cache_Control='private'),
+                         _response(ETag='"1"', Vary='*')):
+            self.cache.clear()
+            self.cache.store(URL, response)
+            self.assertIsNone(self.cache.get(URL))
+
+    def test_keyed_by_accept(self):
+        turtle = _response(ETag='"1"', Vary='Accept')
+        jsonld = _response(ETag='"2"', Vary='Accept')
+        self.cache.store(URL, turtle, 'text/turtle')
+        self.cache.store(URL, jsonld, 'application/ld+json')
+        self.assertIs(self.cache.get(URL, 'text/turtle').response, turtle)
+        self.assertIs(self.cache.get(URL, 'application/ld+json').response,
+                      jsonld)
+        self.assertIsNone(self.cache.get(URL))
+
+    def test_size_limit(self):
+        for i in range(3):
+            self.cache.store(URL + str(i), _response(content='x' * 40,
+                                                     ETag='"1"'))
+        self.assertIsNone(self.cache.get(URL + '0'))
+        self.assertIsNotNone(self.cache.get(URL + '1'))
+        self.assertIsNotNone(self.cache.get(URL + '2'))
+        self.cache.store(URL + '3', _response(content='x' * 101, ETag='"1"'))
+        self.assertIsNone(self.cache.get(URL + '3'))
+
+    def test_revalidated(self):
+        response = _response(ETag='"1"', Cache_Control='no-cache',
+                             Content_Type='application/ld+json')
+        self.cache.store(URL, response)
+        entry = self.cache.get(URL)
+        updated = self.cache.revalidated(URL, entry, {
+            'ETag': '"2"', 'Cache-Control': 'max-age=60',
+            'Content-Type': 'text/plain'})
+        # The shared response is not modified.
+        self.assertEqual(response.headers['ETag'], '"1"')
+        self.assertEqual(updated.response.headers['ETag'], '"2"')
+        self.assertEqual(updated.response.headers['Content-Type'],
+                         'application/ld+json')
+        self.assertEqual(updated.response.content, '{}')
+        self.assertTrue(updated.is_fresh())
+        self.assertIs(self.cache.get(URL), updated)
+        # Not replaced again by an outdated entry.
+        self.cache.revalidated(URL, entry, {'ETag': '"3"'})
+        self.assertIs(self.cache.get(URL), updated)
+
+class FetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = restoaclient.session
+        self.http_cache = restoaclient.http_cache
+        restoaclient.http_cache = restoaclient.HttpCache()
+
+    def tearDown(self):
+        restoaclient.session = self.session
+        restoaclient.http_cache = self.http_cache
+
+    def test_fresh(self):
+        response = _response(Cache_Control='max-age=60')
+        restoaclient.session = _Session(response)
+        self.assertIs(restoaclient.fetch(URL), response)
+        self.assertIs(restoaclient.fetch(URL), response)
+        self.assertEqual(restoaclient.session.requests,
+                         [{'Accept': restoaclient.ACCEPT}])
+
+    def test_revalidate(self):
+        response = _response(ETag='"1"', Last_Modified='Mon, 01 Jan 2018')
+        restoaclient.session = _Session(response,
+                                        _response(304, '', ETag='"2"'),
+                                        _response(304, '', ETag='"2"'))
+        self.assertIs(restoaclient.fetch(URL), response)
+        revalidated = restoaclient.fetch(URL)
+        self.assertEqual(revalidated.content, '{}')
+        self.assertEqual(revalidated.headers['ETag'], '"2"')
+        self.assertEqual(response.headers['ETag'], '"1"')
+        restoaclient.fetch(URL)
+        self.assertEqual(restoaclient.session.requests[1:], [
+            {'Accept': restoaclient.ACCEPT, 'If-None-Match': '"1"',
+             'If-Modified-Since': 'Mon, 01 Jan 2018'},
+            {'Accept': restoaclient.ACCEPT, 'If-None-Match': '"2"',
+             'If-Modified-Since': 'Mon, 01 Jan 2018'}])
+
+    def test_accept(self):
+        restoaclient.session = _Session(
+            _response(content='a', Cache_Control='max-age=60'),
+            _response(content='b', Cache_Control='max-age=60'))
+        self.assertEqual(restoaclient.fetch(URL).content, 'a')
+        self.assertEqual(restoaclient.fetch(URL, 'text/turtle').content, 'b')
+        self.assertEqual(restoaclient.fetch(URL).content, 'a')
+
+    def test_error(self):
+        restoaclient.session = _Session(_response(404, ETag='"1"'))
+        self.assertRaises(requests.HTTPError, restoaclient.fetch, URL)
+
+if __name__ == '__main__':
+    unittest.main()
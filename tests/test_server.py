@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import restoaclient
+import server
+import admission
+import convpool
+
+from pyld import jsonld
+
+from parse import make_parser
+
+MIMETYPE = 'text/x-test'
+
+# Parse functions of the test format, which must be picklable.
+
+def _sleep(data, options=None):
+    time.sleep(1)
+
+def _fail(data, options=None):
+    raise jsonld.JsonLdError('invalid test data', 'test.ParseError')
+
+class _TestFormat(object):
+
+    format_name = 'test'
+    mimetypes = [MIMETYPE]
+
+    def __init__(self, to_jsonld):
+        self.to_jsonld = to_jsonld
+
+class ConversionPoolErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = convpool.ConversionPool(processes=1, min_string_size=10,
+                                            timeout=0.01)
+        self.pool.start()
+        # Replaced on timeouts, stopped in tearDown rather than at exit.
+        self.first_pool = self.pool._pool
+        self.parse_data = server.parse_data
+        self.client = server.app.test_client()
+
+    def tearDown(self):
+        server.parse_data = self.parse_data
+        self.pool.close()
+        self.first_pool.terminate()
+        self.first_pool.join()
+
+    def _post(self, path, to_jsonld, data, pool=True, **kwargs):
+        server.parse_data = make_parser([_TestFormat(to_jsonld)],
+                                        self.pool if pool else None)
+        return self.client.post(path, data=data, **kwargs)
+
+    def test_timeout(self):
+        response = self._post('/echo/', _sleep, 'x' * 10,
+                              content_type=MIMETYPE)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'],
+                         str(admission.RETRY_AFTER))
+
+    def test_batch_timeout(self):
+        response = self._post('/batch/?type=' + MIMETYPE, _sleep,
+                              '["%s"]' % ('x' * 10),
+                              content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+
+    def test_invalid_input(self):
+        # The same response with and without the pool.
+        for data in ('x', 'x' * 10):
+            for pool in (True, False):
+                response = self._post('/echo/', _fail, data, pool,
+                                      content_type=MIMETYPE)
+                self.assertEqual(response.status_code, 400, (data, pool))
+                self.assertIn('invalid test data', response.data)
+
+    def test_conversion_error(self):
+        def fail():
+            raise convpool.ConversionError('Traceback: test')
+        server.parse_data = lambda *args: fail()
+        response = self.client.post('/echo/', data='x',
+                                    content_type=MIMETYPE)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('Traceback: test', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import mmap
+import tempfile
+import unittest
+
+from StringIO import StringIO
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import spool
+
+# Smallest window that can be mapped.
+WINDOW = mmap.ALLOCATIONGRANULARITY
+
+def _mapped_file(data, window_size=WINDOW):
+    f = tempfile.TemporaryFile()
+    f.write(data)
+    f.flush()
+    return spool.MappedFile(f, window_size)
+
+class _Endless(object):
+    """Stream of endless data, counting the bytes read."""
+
+    def __init__(self):
+        self.size = 0
+
+    def read(self, size=-1):
+        self.size += size
+        return 'x' * size
+
+def _lines(count):
+    # Lines of varying lengths, some longer than the window.
+    return ''.join('%d %s\n' % (i, 'x' * ((i * 997) % (3 * WINDOW)))
+                   for i in range(count))
+
+class MappedFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _lines(40)
+        self.mapped = _mapped_file(self.data)
+
+    def tearDown(self):
+        self.mapped.close()
+
+    def test_len(self):
+        self.assertEqual(len(self.mapped), len(self.data))
+
+    def test_slices(self):
+        size = len(self.data)
+        for start in (0, 1, WINDOW - 1, WINDOW, WINDOW + 1, size - 3):
+            for length in (0, 1, 2, WINDOW - 1, WINDOW, WINDOW + 1,
+                           3 * WINDOW):
+                self.assertEqual(self.mapped[start:start+length],
+                                 self.data[start:start+length],
+                                 (start, length))
+
+    def test_slice_bounds(self):
+        self.assertEqual(self.mapped[-5:], self.data[-5:])
+        self.assertEqual(self.mapped[:], self.data)
+        self.assertEqual(self.mapped[10:5], '')
+        self.assertEqual(self.mapped[len(self.data):], '')
+        self.assertRaises(ValueError, lambda: self.mapped[::2])
+
+    def test_index(self):
+        for i in (0, WINDOW - 1, WINDOW, len(self.data) - 1, -1):
+            self.assertEqual(self.mapped[i], self.data[i])
+        self.assertRaises(IndexError, lambda: self.mapped[len(self.data)])
+
+    def test_readline(self):
+        lines = []
+        while True:
+            line = self.mapped.readline()
+            if not line:
+                break
+            lines.append(line)
+        self.assertEqual(lines, self.data.splitlines(True))
+
+    def test_iteration(self):
+        self.assertEqual(list(self.mapped), self.data.splitlines(True))
+
+    def test_readline_size(self):
+        self.assertEqual(self.mapped.readline(3), self.data[:3])
+        expected = StringIO(self.data)
+        expected.read(3)
+        self.assertEqual(self.mapped.readline(), expected.readline())
+
+    def test_last_line_without_newline(self):
+        data = 'a\n' + 'b' * (2 * WINDOW + 5)
+        mapped = _mapped_file(data)
+        self.assertEqual(list(mapped), ['a\n', 'b' * (2 * WINDOW + 5)])
+        mapped.close()
+
+    def test_read(self):
+        expected = StringIO(self.data)
+        for size in (1, WINDOW, 5, 3 * WINDOW, 100):
+            self.assertEqual(self.mapped.read(size), expected.read(size))
+            self.assertEqual(self.mapped.tell(), expected.tell())
+        self.assertEqual(self.mapped.read(), expected.read())
+        self.assertEqual(self.mapped.read(), '')
+
+    def test_seek(self):
+        self.mapped.seek(WINDOW + 3)
+        self.assertEqual(self.mapped.read(10),
+                         self.data[WINDOW + 3:WINDOW + 13])
+        self.mapped.seek(-10, os.SEEK_CUR)
+        self.assertEqual(self.mapped.tell(), WINDOW + 3)
+        self.mapped.seek(-4, os.SEEK_END)
+        self.assertEqual(self.mapped.read(), self.data[-4:])
+
+    def test_empty(self):
+        mapped = _mapped_file('')
+        self.assertEqual(len(mapped), 0)
+        self.assertEqual(mapped[:], '')
+        self.assertEqual(list(mapped), [])
+        mapped.close()
+
+class SpoolTest(unittest.TestCase):
+
+    def test_small(self):
+        data = spool.spool(StringIO('abc'), 3)
+        self.assertEqual(data, 'abc')
+
+    def test_large(self):
+        data = _lines(5)
+        spooled = spool.spool(StringIO(data), 10)
+        self.assertIsInstance(spooled, spool.MappedFile)
+        self.assertEqual(spooled[:], data)
+        self.assertEqual(list(spooled), data.splitlines(True))
+        spooled.close()
+
+    def test_max_size(self):
+        data = _lines(5)
+        for max_memory_size in (10, len(data) + 1):
+            self.assertEqual(spool.spool(StringIO(data), max_memory_size,
+                                         len(data))[:], data)
+            with self.assertRaises(spool.TooLargeError):
+                spool.spool(StringIO(data), max_memory_size, len(data) - 1)
+
+    def test_max_size_stops_reading(self):
+        for max_memory_size in (10, 10 * spool.CHUNK_SIZE):
+            stream = _Endless()
+            with self.assertRaises(spool.TooLargeError):
+                spool.spool(stream, max_memory_size, 3 * spool.CHUNK_SIZE)
+            self.assertEqual(stream.size, 4 * spool.CHUNK_SIZE)
+
+class RequestBodyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+
+    def test_small(self):
+        with self.app.test_request_context(method='POST', data='abc'):
+            self.assertEqual(spool.request_body(flask.request), 'abc')
+
+    def test_large(self):
+        data = 'x' * (spool.MAX_MEMORY_SIZE + 1)
+        with self.app.test_request_context(method='POST', data=data):
+            body = spool.request_body(flask.request)
+            self.assertIsInstance(body, spool.MappedFile)
+            self.assertEqual(body.read(), data)
+            # Read once, returned again from the start.
+            self.assertIs(spool.request_body(flask.request), body)
+            self.assertEqual(body.tell(), 0)
+            body.close()
+
+    def test_max_size(self):
+        with self.app.test_request_context(method='POST', data='abc'):
+            self.assertEqual(spool.request_body(flask.request, 3), 'abc')
+            with self.assertRaises(spool.TooLargeError):
+                spool.request_body(flask.request, 2)
+
+    def test_declared_too_large(self):
+        with self.app.test_request_context(method='POST', data='abc'):
+            with self.assertRaises(spool.TooLargeError):
+                spool.request_body(flask.request, 2)
+            self.assertEqual(flask.request.stream.read(), 'abc')
+
+    def test_without_content_length(self):
+        stream = _Endless()
+        with self.app.test_request_context(
+                method='POST', environ_overrides={
+                    'wsgi.input': stream, 'wsgi.input_terminated': True,
+                    'CONTENT_LENGTH': ''}):
+            with self.assertRaises(spool.TooLargeError):
+                spool.request_body(flask.request, spool.CHUNK_SIZE)
+        self.assertEqual(stream.size, 2 * spool.CHUNK_SIZE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import time
+import unittest
+
+import flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import timing
+
+class TimingTestCase(unittest.TestCase):
+    """Test case with timing enabled and no recorded histograms."""
+
+    def setUp(self):
+        self.enabled = timing.ENABLED
+        timing.enable()
+        timing.reset()
+
+    def tearDown(self):
+        timing.enable(self.enabled)
+        timing.reset()
+
+def _histogram(name):
+    return timing._histograms[name]
+
+class ServerTimingHeaderTest(unittest.TestCase):
+
+    def test_format(self):
+        self.assertEqual(timing.server_timing_header(
+            [('parse', 0.0125), ('render', 0.5), ('parse', 0.001)]),
+            'parse;dur=13.500, render;dur=500.000')
+
+    def test_empty(self):
+        self.assertEqual(timing.server_timing_header([]), '')
+
+class StageTest(TimingTestCase):
+
+    def test_disabled(self):
+        timing.enable(False)
+        with timing.stage('parse'):
+            pass
+        items = [1, 2]
+        self.assertIs(timing.timed_iter('render', items), items)
+        self.assertEqual(timing._histograms, {})
+
+    def test_nested(self):
+        app = flask.Flask(__name__)
+        with app.test_request_context():
+            with timing.stage('outer'):
+                with timing.stage('inner'):
+                    time.sleep(0.01)
+                with timing.stage('inner'):
+                    pass
+            timings = flask.g.stage_timings
+        self.assertEqual([name for name, _ in timings],
+                         ['inner', 'inner', 'outer'])
+        self.assertGreaterEqual(timings[2][1], timings[0][1] + timings[1][1])
+        self.assertEqual(_histogram('inner').count, 2)
+        self.assertEqual(_histogram('outer').count, 1)
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            with timing.stage('parse'):
+                raise ValueError()
+        self.assertEqual(_histogram('parse').count, 1)
+
+    def test_timed_iter(self):
+        def items():
+            time.sleep(0.01)
+            yield 1
+            yield 2
+        self.assertEqual(list(timing.timed_iter('render', items())), [1, 2])
+        histogram = _histogram('render')
+        self.assertEqual(histogram.count, 1)
+        self.assertGreaterEqual(histogram.sum, 0.01)
+
+class HistogramTest(unittest.TestCase):
+
+    def test_observe(self):
+        histogram = timing.Histogram([0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+class MetricsTest(TimingTestCase):
+
+    def test_exposition(self):
+        timing.record('parse', 0.003)
+        timing.record('parse', 20.0)
+        lines = timing.metrics().splitlines()
+        name = timing.METRIC_NAME
+        self.assertEqual(lines[:2],
+                         ['# HELP %s %s' % (name, timing.METRIC_HELP),
+                          '# TYPE %s histogram' % name])
+        self.assertIn('%s_bucket{stage="parse",le="0.0025"} 0' % name, lines)
+        self.assertIn('%s_bucket{stage="parse",le="0.005"} 1' % name, lines)
+        self.assertIn('%s_bucket{stage="parse",le="10.0"} 1' % name, lines)
+        self.assertIn('%s_bucket{stage="parse",le="+Inf"} 2' % name, lines)
+        self.assertIn('%s_sum{stage="parse"} 20.003' % name, lines)
+        self.assertIn('%s_count{stage="parse"} 2' % name, lines)
+        line_re = re.compile(r'^%s_(bucket|sum|count)\{stage="\w+"'
+                             r'(,le="[^"]+")?\} [0-9.e+-]+$' % name)
+        for line in lines[2:]:
+            self.assertRegexpMatches(line, line_re)
+
+class ServerTest(TimingTestCase):
+
+    def setUp(self):
+        TimingTestCase.setUp(self)
+        import restoaclient
+        import server
+        self.client = server.app.test_client()
+
+    def test_server_timing(self):
+        response = self.client.post(
+            '/echo/', data='{"@id": "http://example.org/1"}',
+            content_type='application/ld+json',
+            headers={'Accept': 'application/n-quads'})
+        self.assertEqual(response.status_code, 200)
+        header = response.headers['Server-Timing']
+        names = [part.split(';')[0] for part in header.split(', ')]
+        self.assertIn('read', names)
+        self.assertIn('parse', names)
+        self.assertEqual(names[-1], 'total')
+        self.assertRegexpMatches(header, r'^(\w+;dur=\d+\.\d{3}(, )?)+$')
+
+    def test_metrics(self):
+        self.client.post('/echo/', data='{"@id": "http://example.org/1"}',
+                         content_type='application/ld+json').data
+        response = self.client.get('/metrics')
+        self.assertEqual(response.headers['Content-Type'],
+                         timing.METRICS_CONTENT_TYPE)
+        self.assertIn('%s_count{stage="parse"} 1' % timing.METRIC_NAME,
+                      response.data)
+        self.assertIn('%s_count{stage="request"} 1' % timing.METRIC_NAME,
+                      response.data)
+
+    def test_disabled(self):
+        timing.enable(False)
+        response = self.client.post('/echo/', data='{}',
+                                    content_type='application/ld+json')
+        self.assertNotIn('Server-Timing', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
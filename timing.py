@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""Timing of request processing stages.
+
+Records the time spent in stages such as parsing, expansion and
+rendering, for reporting in Server-Timing response headers and as
+histograms in the Prometheus text exposition format.
+
+Timing is disabled by default, in which case stage() returns a no-op
+context manager and timed_iter() returns its argument.
+"""
+
+__author__ = 'Sampo Pyysalo'
+__license__ = 'MIT'
+
+import time
+import threading
+
+import flask
+
+ENABLED = False
+
+# Upper bounds of histogram buckets, in seconds.
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0]
+
+METRIC_NAME = 'oaadapter_stage_seconds'
+METRIC_HELP = 'Time spent in request processing stages.'
+
+# Content type of the Prometheus text exposition format.
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Histogram(object):
+    """Cumulative histogram of durations."""
+
+    def __init__(self, buckets=None):
+        if buckets is None:
+            buckets = BUCKETS
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+_histograms = {}
+_lock = threading.Lock()
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+def record(name, duration):
+    """Record duration of stage, in seconds."""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(duration)
+    if flask.has_request_context():
+        timings = getattr(flask.g, 'stage_timings', None)
+        if timings is None:
+            timings = flask.g.stage_timings = []
+        timings.append((name, duration))
+
+class _Stage(object):
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.time() - self.start)
+        return False
+
+class _NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_null_stage = _NullStage()
+
+def stage(name):
+    """Return context manager timing a stage with the given name."""
+    if not ENABLED:
+        return _null_stage
+    return _Stage(name)
+
+def timed_iter(name, iterable):
+    """Return iterator timing the generation of items of iterable.
+
+    Only time spent generating items is included, not time spent by
+    the consumer between items (e.g. sending a streamed response).
+    """
+    if not ENABLED:
+        return iterable
+    return _timed_iter(name, iterable)
+
+def _timed_iter(name, iterable):
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                total += time.time() - start
+                break
+            total += time.time() - start
+            yield item
+    finally:
+        record(name, total)
+
+def server_timing_header(timings):
+    """Return Server-Timing header value for (name, seconds) pairs.
+
+    Durations of stages with the same name are summed.
+    """
+    totals, names = {}, []
+    for name, duration in timings:
+        if name not in totals:
+            names.append(name)
+            totals[name] = 0.0
+        totals[name] += duration
+    return ', '.join('%s;dur=%.3f' % (n, totals[n] * 1000) for n in names)
+
+def metrics():
+    """Return recorded histograms in Prometheus text format."""
+    lines = [
+        '# HELP %s %s' % (METRIC_NAME, METRIC_HELP),
+        '# TYPE %s histogram' % METRIC_NAME,
+    ]
+    with _lock:
+        for name in sorted(_histograms):
+            histogram = _histograms[name]
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append('%s_bucket{stage="%s",le="%s"} %d' % (
+                    METRIC_NAME, name, repr(bound), cumulative))
+            lines.append('%s_bucket{stage="%s",le="+Inf"} %d' % (
+                METRIC_NAME, name, histogram.count))
+            lines.append('%s_sum{stage="%s"} %s' % (
+                METRIC_NAME, name, repr(histogram.sum)))
+            lines.append('%s_count{stage="%s"} %d' % (
+                METRIC_NAME, name, histogram.count))
+    return '\n'.join(lines) + '\n'
+
+def reset():
+    """Remove all recorded histograms."""
+    with _lock:
+        _histograms.clear()
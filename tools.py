@@ -7,11 +7,20 @@ __license__ = 'MIT'
 
 import urlparse
 
-def get_request_data(request):
-    """Return (data, mimetype, charset) triple for Flask request."""
+import spool
+
+def get_request_data(request, max_size=None):
+    """Return (data, mimetype, charset) triple for Flask request.
+
+    Large request bodies are given as spool.MappedFile objects instead
+    of strings (see spool.py).
+
+    Raises:
+        spool.TooLargeError: if the body is larger than max_size.
+    """
     mimetype = request.mimetype
     charset = request.mimetype_params.get('charset')
-    data = request.get_data()
+    data = spool.request_body(request, max_size)
     return (data, mimetype, charset)
 
 def base_url(url):